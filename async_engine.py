@@ -0,0 +1,194 @@
+# Motor asyncio en un hilo propio para la interfaz: las llamadas de la
+# ventana (Api) se envían como tareas y vuelven al instante con un id, así
+# dos pedidos independientes (cargar archivos, miniaturas, consultas) no se
+# esperan uno al otro. Los procesos externos (exiftool, ffmpeg) se lanzan con
+# asyncio.create_subprocess_exec, con un semáforo y un tiempo máximo por
+# herramienta.
+import time
+import uuid
+import asyncio
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, CancelledError, TimeoutError as EsperaAgotada
+
+from metricas import agregar
+
+# Tiempo máximo por herramienta (segundos) si no se indica otro
+TIMEOUTS = {"exiftool": 120, "ffmpeg": 300}
+
+
+class TiempoAgotado(RuntimeError):
+    """Un proceso externo superó su tiempo máximo y se terminó."""
+
+
+class MotorAsync:
+    """
+    Bucle de eventos en un hilo aparte. `ejecutar` corre un proceso externo
+    respetando el límite de su herramienta; `enviar` lanza una función (o
+    corrutina) como tarea y `resultado` la consulta por id.
+    """
+
+    def __init__(self, limites=None, timeouts=None, workers=8, max_terminadas=100):
+        self.limites = dict(limites or {"exiftool": 4, "ffmpeg": 2})
+        self.timeouts = dict(TIMEOUTS, **(timeouts or {}))
+        self.max_terminadas = max_terminadas
+        # Las funciones bloqueantes de las tareas corren en este pool
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="solicitud")
+        self._tareas = {}
+        self._lock = threading.Lock()
+        self._listo = threading.Event()
+        self._hilo = threading.Thread(target=self._correr, name="motor-async", daemon=True)
+        self._hilo.start()
+        self._listo.wait()
+
+    def _correr(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.set_default_executor(self._executor)
+        # Los semáforos pertenecen al bucle: se crean en su hilo
+        self._semaforos = {h: asyncio.Semaphore(n) for h, n in self.limites.items()}
+        self._listo.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    def _semaforo(self, herramienta):
+        semaforo = self._semaforos.get(herramienta)
+        if semaforo is None:
+            semaforo = self._semaforos[herramienta] = asyncio.Semaphore(1)
+        return semaforo
+
+    async def ejecutar(self, herramienta, comando, timeout=None, entrada=None):
+        """
+        Corre `comando` (lista, con el ejecutable) esperando turno en el
+        semáforo de `herramienta`. Si supera el tiempo máximo el proceso se
+        termina y se lanza TiempoAgotado.
+        Returns:
+            subprocess.CompletedProcess: con stdout y stderr en bytes.
+        """
+        from media_utils import get_creationflags
+        if timeout is None:
+            timeout = self.timeouts.get(herramienta)
+        inicio = time.perf_counter()
+        async with self._semaforo(herramienta):
+            # Tiempo esperando turno: indica si el límite queda chico
+            agregar(f"{herramienta}_cola", time.perf_counter() - inicio)
+            proceso = await asyncio.create_subprocess_exec(
+                *comando, stdin=subprocess.PIPE if entrada is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                creationflags=get_creationflags())
+            try:
+                stdout, stderr = await asyncio.wait_for(proceso.communicate(entrada), timeout)
+            except asyncio.TimeoutError:
+                proceso.kill()
+                await proceso.wait()
+                raise TiempoAgotado(f"{herramienta} no terminó en {timeout} s")
+            except BaseException:
+                # Tarea cancelada: el proceso no queda huérfano
+                if proceso.returncode is None:
+                    proceso.kill()
+                    await proceso.wait()
+                raise
+        return subprocess.CompletedProcess(comando, proceso.returncode, stdout, stderr)
+
+    def ejecutar_sync(self, herramienta, comando, timeout=None, entrada=None):
+        """ejecutar() para llamar desde otro hilo (bloquea solo a ese hilo)."""
+        if threading.current_thread() is self._hilo:
+            raise RuntimeError("ejecutar_sync no se puede llamar desde el bucle del motor")
+        futuro = asyncio.run_coroutine_threadsafe(
+            self.ejecutar(herramienta, comando, timeout, entrada), self.loop)
+        return futuro.result()
+
+    # --- Tareas: pedidos de la interfaz que vuelven al instante ---
+
+    def enviar(self, funcion, *args):
+        """
+        Lanza `funcion(*args)` como tarea: si es una corrutina corre en el
+        bucle, si no en el pool de hilos del motor.
+        Returns:
+            str: id de la tarea (ver resultado).
+        """
+        async def correr():
+            if asyncio.iscoroutinefunction(funcion):
+                return await funcion(*args)
+            return await self.loop.run_in_executor(None, funcion, *args)
+        tarea_id = uuid.uuid4().hex[:12]
+        futuro = asyncio.run_coroutine_threadsafe(correr(), self.loop)
+        with self._lock:
+            self._tareas[tarea_id] = (futuro, time.monotonic())
+            self._purgar()
+        return tarea_id
+
+    def _purgar(self):
+        terminadas = [(inicio, tarea_id) for tarea_id, (futuro, inicio) in self._tareas.items()
+                      if futuro.done()]
+        terminadas.sort()
+        for _, tarea_id in terminadas[:max(0, len(terminadas) - self.max_terminadas)]:
+            del self._tareas[tarea_id]
+
+    def resultado(self, tarea_id, espera=0.0):
+        """
+        Estado de una tarea; espera hasta `espera` segundos a que termine.
+        Una tarea terminada se entrega una sola vez y se olvida.
+        Returns:
+            dict: {terminado, resultado, error}
+        """
+        with self._lock:
+            tarea = self._tareas.get(tarea_id)
+        if tarea is None:
+            return {"terminado": True, "resultado": None, "error": "Tarea no encontrada"}
+        futuro = tarea[0]
+        try:
+            # exception() espera sin relanzar: un TimeoutError de la propia
+            # tarea no se confunde con que todavía no terminó
+            excepcion = futuro.exception(timeout=espera or 0)
+        except EsperaAgotada:
+            return {"terminado": False, "resultado": None, "error": None}
+        except CancelledError:
+            excepcion = CancelledError("Tarea cancelada")
+        if excepcion is None:
+            resultado, error = futuro.result(), None
+        else:
+            resultado, error = None, str(excepcion) or type(excepcion).__name__
+        with self._lock:
+            self._tareas.pop(tarea_id, None)
+        return {"terminado": True, "resultado": resultado, "error": error}
+
+    def cancelar(self, tarea_id):
+        with self._lock:
+            tarea = self._tareas.get(tarea_id)
+        return tarea is not None and tarea[0].cancel()
+
+    def cerrar(self):
+        with self._lock:
+            tareas = [futuro for futuro, _ in self._tareas.values()]
+            self._tareas.clear()
+        for futuro in tareas:
+            futuro.cancel()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._hilo.join(timeout=5)
+        self._executor.shutdown(wait=False)
+
+
+_motor = None
+_motor_lock = threading.Lock()
+
+
+def iniciar_motor(limites=None, timeouts=None):
+    """Activa (o reutiliza) el motor global que usan las funciones de media_utils."""
+    global _motor
+    with _motor_lock:
+        if _motor is None:
+            _motor = MotorAsync(limites, timeouts)
+        return _motor
+
+
+def motor_activo():
+    return _motor
+
+
+def cerrar_motor():
+    global _motor
+    with _motor_lock:
+        motor, _motor = _motor, None
+    if motor is not None:
+        motor.cerrar()
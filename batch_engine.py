@@ -0,0 +1,283 @@
+import os
+import time
+import heapq
+import random
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from metricas import agregar, contar
+
+
+def _workers_por_defecto(variable, por_defecto):
+    try:
+        valor = int(os.environ.get(variable, 0))
+    except ValueError:
+        valor = 0
+    return valor if valor > 0 else por_defecto
+
+
+class Diferir(Exception):
+    """
+    Un trabajo no se puede hacer ahora (archivo bloqueado por otro proceso,
+    todavía no existe...) pero probablemente sí más tarde. Dentro de
+    PlanificadorBatch.mapear el item vuelve a una cola diferida con espera
+    exponencial mientras los demás siguen.
+    Args:
+        item: lo que hay que reintentar si no es el item completo (p. ej.
+            solo los archivos bloqueados de un lote).
+        parcial: resultado de la parte que sí se hizo; se entrega ya.
+    """
+
+    def __init__(self, mensaje, item=None, parcial=None):
+        super().__init__(mensaje)
+        self.item = item
+        self.parcial = parcial
+
+
+class PoliticaReintentos:
+    """
+    Espera exponencial con jitter: el intento n espera entre la mitad y el
+    total de min(maximo, base * factor**n) segundos, así los archivos
+    bloqueados a la vez no se reintentan todos juntos.
+    """
+
+    def __init__(self, intentos=6, base=0.2, factor=2.0, maximo=10.0, semilla=None):
+        self.intentos = max(1, intentos)
+        self.base = base
+        self.factor = factor
+        self.maximo = maximo
+        self._rng = random.Random(semilla)
+
+    def espera(self, intento):
+        tope = min(self.maximo, self.base * self.factor ** intento)
+        return tope / 2 + self._rng.uniform(0, tope / 2)
+
+
+class PlanificadorBatch:
+    """
+    Ejecuta trabajos por archivo en un pool de hilos con concurrencia acotada.
+    Hay dos límites independientes: 'metadata' para las escrituras con
+    exiftool (limitadas por disco) y 'ffmpeg' para la extracción de frames
+    (limitada por CPU). Los trabajos toman el límite que necesitan con
+    `limite(tipo)` justo alrededor de la llamada al subproceso.
+    Los trabajos que lanzan Diferir se reintentan más tarde según `politica`
+    sin ocupar un hilo mientras esperan.
+    """
+
+    def __init__(self, workers_metadata=None, workers_ffmpeg=None, politica=None):
+        cpus = os.cpu_count() or 1
+        if workers_metadata is None:
+            workers_metadata = _workers_por_defecto("METADATA_WORKERS", min(4, cpus))
+        if workers_ffmpeg is None:
+            workers_ffmpeg = _workers_por_defecto("FFMPEG_WORKERS", max(1, cpus // 2))
+        self.workers_metadata = max(1, int(workers_metadata))
+        self.workers_ffmpeg = max(1, int(workers_ffmpeg))
+        self._limites = {
+            "metadata": threading.BoundedSemaphore(self.workers_metadata),
+            "ffmpeg": threading.BoundedSemaphore(self.workers_ffmpeg),
+        }
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers_metadata + self.workers_ffmpeg,
+            thread_name_prefix="batch")
+        self.politica = politica or PoliticaReintentos()
+        self._lock_reintentos = threading.Lock()
+        self._reintentos = {"diferidos": 0, "recuperados": 0, "agotados": 0, "espera_s": 0.0}
+        # mapear en curso; cerrar(drenar=True) espera a que terminen
+        self._lock_activos = threading.Lock()
+        self._activos = 0
+        self._cerrar_al_terminar = False
+
+    def _anotar_reintento(self, clave, espera=None):
+        with self._lock_reintentos:
+            self._reintentos[clave] += 1
+            if espera is not None:
+                self._reintentos["espera_s"] += espera
+        contar(f"reintentos_{clave}")
+        if espera is not None:
+            agregar("espera_reintento", espera)
+
+    def estadisticas_reintentos(self):
+        """Cuántos trabajos se difirieron, se recuperaron o agotaron los intentos."""
+        with self._lock_reintentos:
+            return dict(self._reintentos, espera_s=round(self._reintentos["espera_s"], 3))
+
+    @contextmanager
+    def limite(self, tipo):
+        with self._limites[tipo]:
+            yield
+
+    def mapear(self, fn, items, en_error=None, ventana=None, cancelado=None):
+        """
+        Aplica `fn` a cada item en paralelo y entrega los resultados como
+        generador. `items` puede ser cualquier iterable; solo se mantienen
+        `ventana` trabajos en vuelo a la vez.
+        El orden de entrada solo se garantiza si ningún item se difiere: un
+        item que lanza Diferir se entrega más tarde, cuando por fin termina,
+        después de otros que entraron detrás de él. Por eso cada resultado
+        (también los de `en_error`) tiene que llevar su id o path para
+        asociarlo a su entrada, en vez de depender de la posición.
+        Args:
+            fn (callable): función por archivo; si lanza Diferir el item se
+                reintenta más tarde (hasta politica.intentos veces en total).
+            items (iterable): entradas a procesar.
+            en_error (callable, opcional): en_error(item, excepcion) construye
+                el resultado de un archivo que falló; si no se da, se relanza.
+            cancelado (threading.Event, opcional): al activarse no se inician
+                más archivos (ni reintentos); solo se entregan los que ya
+                estaban en curso.
+        """
+        with self._lock_activos:
+            self._activos += 1
+        try:
+            yield from self._mapear(fn, items, en_error, ventana, cancelado)
+        finally:
+            with self._lock_activos:
+                self._activos -= 1
+                cerrar = self._activos == 0 and self._cerrar_al_terminar
+            if cerrar:
+                self._executor.shutdown(wait=False)
+
+    def _mapear(self, fn, items, en_error, ventana, cancelado):
+        if ventana is None:
+            ventana = 4 * (self.workers_metadata + self.workers_ffmpeg)
+        politica = self.politica
+        pendientes = deque()   # (item, futuro, intento)
+        diferidos = []         # heap de (listo_en, orden, item, intento)
+        orden = itertools.count()
+
+        def lanzar_listos():
+            ahora = time.monotonic()
+            while diferidos and diferidos[0][0] <= ahora:
+                _, _, item, intento = heapq.heappop(diferidos)
+                pendientes.append((item, self._executor.submit(fn, item), intento))
+
+        def cancelar_pendientes():
+            diferidos.clear()
+            for _, futuro, _ in pendientes:
+                futuro.cancel()
+            en_curso = [p for p in pendientes if not p[1].cancelled()]
+            pendientes.clear()
+            pendientes.extend(en_curso)
+
+        def entregar():
+            item, futuro, intento = pendientes.popleft()
+            # Mientras se espera este resultado se relanzan los diferidos a tiempo
+            while diferidos and not futuro.done():
+                wait([futuro], timeout=max(0, diferidos[0][0] - time.monotonic()))
+                lanzar_listos()
+            try:
+                resultado = futuro.result()
+            except Diferir as e:
+                siguiente = item if e.item is None else e.item
+                if e.parcial is not None:
+                    yield e.parcial
+                if intento + 1 < politica.intentos and not (cancelado and cancelado.is_set()):
+                    espera = politica.espera(intento)
+                    heapq.heappush(diferidos, (time.monotonic() + espera, next(orden),
+                                               siguiente, intento + 1))
+                    self._anotar_reintento("diferidos", espera)
+                    return
+                self._anotar_reintento("agotados")
+                if en_error is None:
+                    raise
+                yield en_error(siguiente, e)
+                return
+            except Exception as e:
+                if en_error is None:
+                    raise
+                yield en_error(item, e)
+                return
+            if intento:
+                self._anotar_reintento("recuperados")
+            yield resultado
+
+        for item in items:
+            if cancelado is not None and cancelado.is_set():
+                break
+            lanzar_listos()
+            pendientes.append((item, self._executor.submit(fn, item), 0))
+            if len(pendientes) >= ventana:
+                yield from entregar()
+        while pendientes or diferidos:
+            if cancelado is not None and cancelado.is_set():
+                cancelar_pendientes()
+                if not pendientes:
+                    break
+            if not pendientes:
+                # Solo quedan diferidos: se duerme hasta el próximo (o hasta cancelar)
+                espera = diferidos[0][0] - time.monotonic()
+                if espera > 0:
+                    if cancelado is not None:
+                        cancelado.wait(espera)
+                    else:
+                        time.sleep(espera)
+                lanzar_listos()
+                continue
+            yield from entregar()
+
+    def cerrar(self, drenar=False):
+        """
+        Cierra el pool de hilos. Con `drenar`, si hay mapear en curso se
+        dejan terminar y el último en salir lo cierra.
+        """
+        with self._lock_activos:
+            if drenar and self._activos:
+                self._cerrar_al_terminar = True
+                return
+        self._executor.shutdown(wait=False)
+
+
+class LoteEscritura:
+    """Archivos que reciben exactamente la misma escritura de exiftool."""
+
+    def __init__(self, datetime_exif, tipo_archivo):
+        self.datetime_exif = datetime_exif
+        self.tipo_archivo = tipo_archivo
+        self.paths = []
+        self.longitud = 0
+
+    def parte(self, paths):
+        """Otro lote con la misma escritura y solo esos archivos."""
+        lote = LoteEscritura(self.datetime_exif, self.tipo_archivo)
+        lote.paths = list(paths)
+        lote.longitud = sum(len(path) + 1 for path in lote.paths)
+        return lote
+
+
+class AgrupadorEscrituras:
+    """
+    Agrupa escrituras pendientes por (datetime_exif, tipo de archivo) para
+    enviarlas como un solo comando exiftool con muchos archivos. Los grupos
+    se parten en lotes de como mucho `max_archivos` archivos y `max_caracteres`
+    de rutas, para no pasar el límite de la línea de comandos (~32k en Windows)
+    cuando exiftool se lanza sin el pool.
+    """
+
+    def __init__(self, max_archivos=200, max_caracteres=24000):
+        self.max_archivos = max_archivos
+        self.max_caracteres = max_caracteres
+        self._grupos = {}
+
+    def agregar(self, path, datetime_exif, tipo_archivo):
+        """Agrega un archivo; devuelve la lista de lotes que se llenaron."""
+        clave = (datetime_exif, tipo_archivo)
+        lote = self._grupos.get(clave)
+        llenos = []
+        if lote is not None and (len(lote.paths) >= self.max_archivos or
+                                 lote.longitud + len(path) + 1 > self.max_caracteres):
+            llenos.append(lote)
+            lote = None
+        if lote is None:
+            lote = self._grupos[clave] = LoteEscritura(datetime_exif, tipo_archivo)
+        lote.paths.append(path)
+        lote.longitud += len(path) + 1
+        return llenos
+
+    def vaciar(self):
+        """Devuelve los lotes incompletos que quedan pendientes."""
+        lotes = list(self._grupos.values())
+        self._grupos = {}
+        return lotes
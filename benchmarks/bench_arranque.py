@@ -0,0 +1,89 @@
+# Mide el costo de importar main_webview (lo que pasa antes de que aparezca
+# la ventana) y de media_engine (uso sin interfaz) con `python -X importtime`,
+# y comprueba que los módulos pesados no se carguen al arrancar.
+#  - Total y los módulos más caros (tiempo acumulado, mediana de varias corridas).
+#  - Falla si el total pasa del presupuesto o si se importó un módulo prohibido.
+# Uso: python benchmarks/bench_arranque.py [--corridas 5] [--presupuesto-ms 250]
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que no deben cargarse antes de mostrar la ventana (van en la precarga)
+PROHIBIDOS = ("PIL", "numpy", "ffmpeg", "sqlite3", "dotenv", "persiantools")
+# En el motor sin interfaz tampoco webview
+PROHIBIDOS_MOTOR = PROHIBIDOS + ("webview",)
+
+
+def importtime(modulo):
+    """
+    Importa `modulo` en un intérprete nuevo con -X importtime.
+    Returns:
+        dict: {módulo: (propio_us, acumulado_us)} en orden de importación.
+    """
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, capture_output=True, text=True, check=True).stderr
+    tiempos = {}
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        tiempos[nombre.strip()] = (int(propio), int(acumulado))
+    return tiempos
+
+
+def medir(modulo, corridas, prohibidos, top):
+    totales = []
+    por_modulo = {}
+    cargados = set()
+    for _ in range(corridas):
+        tiempos = importtime(modulo)
+        totales.append(tiempos[modulo][1])
+        cargados.update(tiempos)
+        for nombre, (_, acumulado) in tiempos.items():
+            por_modulo.setdefault(nombre, []).append(acumulado)
+    mas_caros = sorted(((statistics.median(v), k) for k, v in por_modulo.items()
+                        if k != modulo), reverse=True)[:top]
+    return {
+        "total_ms": round(statistics.median(totales) / 1000, 1),
+        "min_ms": round(min(totales) / 1000, 1),
+        "modulos": len(cargados),
+        "mas_caros_ms": {k: round(v / 1000, 1) for v, k in mas_caros},
+        "prohibidos_cargados": sorted(m for m in cargados if m.split(".")[0] in prohibidos),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corridas", type=int, default=5)
+    parser.add_argument("--presupuesto-ms", type=float, default=250,
+                        help="máximo para importar main_webview (mediana)")
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+    resultado = {"python": sys.version.split()[0]}
+    errores = []
+    for modulo, prohibidos in (("main_webview", PROHIBIDOS), ("media_engine", PROHIBIDOS_MOTOR)):
+        try:
+            resultado[modulo] = medir(modulo, args.corridas, prohibidos, args.top)
+        except subprocess.CalledProcessError as e:
+            errores.append(f"{modulo}: no se pudo importar ({e.stderr.strip().splitlines()[-1]})")
+            continue
+        if resultado[modulo]["prohibidos_cargados"]:
+            errores.append(f"{modulo} carga {resultado[modulo]['prohibidos_cargados']} al arrancar")
+    if "main_webview" in resultado and resultado["main_webview"]["total_ms"] > args.presupuesto_ms:
+        errores.append(f"main_webview tarda {resultado['main_webview']['total_ms']} ms "
+                       f"(presupuesto {args.presupuesto_ms} ms)")
+    resultado["presupuesto_ms"] = args.presupuesto_ms
+    resultado["errores"] = errores
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    if errores:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
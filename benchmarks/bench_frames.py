@@ -0,0 +1,124 @@
+# Verifica la extracción de frames en una pasada (media_utils.extraer_frame_con_fecha)
+# y la compara con el camino anterior (ffmpeg a archivo + exiftool).
+#  - La imagen es la misma: sin el APP1 agregado, el JPEG es idéntico byte a
+#    byte al que escribe `ffmpeg -vframes 1 -q:v 1 salida.jpg`.
+#  - Las fechas EXIF y la fecha de modificación son las pedidas, y solo se
+#    lanza un proceso por video.
+#  - Si hay exiftool en el PATH también mide el camino anterior y compara
+#    las fechas que lee exiftool.
+# Uso: python benchmarks/bench_frames.py [--videos 20]
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import media_utils  # noqa: E402
+from jpeg_exif import fechas_exif, segmentos  # noqa: E402
+
+FECHA = "2019:07:14 18:45:30"
+
+
+def sin_exif(jpeg):
+    """El JPEG sin su APP1 'Exif' (para compararlo con el de ffmpeg solo)."""
+    for marcador, inicio, fin in segmentos(jpeg):
+        if marcador == 0xE1 and jpeg[inicio:inicio + 6] == b'Exif\x00\x00':
+            return jpeg[:inicio - 4] + jpeg[fin:]
+    return jpeg
+
+
+class ContadorProcesos:
+    """Cuenta los subprocess.Popen lanzados mientras está activo."""
+
+    def __enter__(self):
+        self.cantidad = 0
+        self._original = subprocess.Popen.__init__
+        contador = self
+
+        def init(proceso, *args, **kwargs):
+            contador.cantidad += 1
+            contador._original(proceso, *args, **kwargs)
+        subprocess.Popen.__init__ = init
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.Popen.__init__ = self._original
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=20)
+    args = parser.parse_args()
+    ffmpeg = media_utils.buscar_ejecutable("ffmpeg")
+    if not os.path.exists(ffmpeg):
+        print("No se encontró ffmpeg")
+        sys.exit(1)
+    exiftool = shutil.which("exiftool")
+    errores = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        video = os.path.join(carpeta, "video.mp4")
+        subprocess.run([ffmpeg, "-y", "-v", "error", "-f", "lavfi",
+                        "-i", "testsrc=size=1280x720:rate=30:duration=1",
+                        "-c:v", "mpeg4", "-q:v", "5", video], check=True)
+        referencia = os.path.join(carpeta, "referencia.jpg")
+        subprocess.run([ffmpeg, "-y", "-v", "error", "-i", video,
+                        "-vframes", "1", "-q:v", "1", referencia], check=True)
+
+        salida = os.path.join(carpeta, "frame.jpg")
+        tiempos = []
+        with ContadorProcesos() as procesos:
+            for _ in range(args.videos):
+                inicio = time.perf_counter()
+                media_utils.extraer_frame_con_fecha(video, salida, FECHA, ffmpeg)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        with open(salida, 'rb') as f:
+            jpeg = f.read()
+        with open(referencia, 'rb') as f:
+            if sin_exif(jpeg) != f.read():
+                errores.append("la imagen no es igual a la de ffmpeg -q:v 1")
+        fechas = fechas_exif(jpeg)
+        if fechas != dict.fromkeys(("ModifyDate", "DateTimeOriginal", "CreateDate"), FECHA):
+            errores.append(f"fechas EXIF: {fechas}")
+        esperado = time.mktime(time.strptime(FECHA, "%Y:%m:%d %H:%M:%S"))
+        if int(os.stat(salida).st_mtime) != int(esperado):
+            errores.append("mtime distinto de la fecha escrita")
+        if procesos.cantidad != args.videos:
+            errores.append(f"{procesos.cantidad} procesos para {args.videos} videos")
+        if [n for n in os.listdir(carpeta) if n.endswith(".tmp")]:
+            errores.append("quedaron archivos temporales")
+
+        anterior_ms = None
+        if exiftool:
+            fila = json.loads(subprocess.run(
+                [exiftool, "-json", "-AllDates", salida], capture_output=True, text=True).stdout)[0]
+            if any(fila.get(e) != FECHA for e in ("DateTimeOriginal", "CreateDate", "ModifyDate")):
+                errores.append(f"exiftool lee {fila}")
+            inicio = time.perf_counter()
+            for _ in range(args.videos):
+                subprocess.run([ffmpeg, "-y", "-v", "error", "-i", video,
+                                "-vframes", "1", "-q:v", "1", salida], check=True)
+                subprocess.run([exiftool, f"-AllDates={FECHA}", f"-FileModifyDate={FECHA}",
+                                "-overwrite_original", "-P", salida],
+                               check=True, capture_output=True)
+            anterior_ms = (time.perf_counter() - inicio) * 1000 / args.videos
+
+    tiempos.sort()
+    print(json.dumps({
+        "videos": args.videos,
+        "una_pasada_ms_p50": round(tiempos[len(tiempos) // 2], 2),
+        "procesos_por_video": procesos.cantidad / args.videos,
+        "anterior_ms_promedio": round(anterior_ms, 2) if anterior_ms else None,
+        "exiftool": exiftool,
+        "errores": errores,
+    }, indent=2, ensure_ascii=False))
+    if errores:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
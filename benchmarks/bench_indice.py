@@ -0,0 +1,86 @@
+# Mide el índice de medios (media_index) sobre una biblioteca sintética de
+# archivos vacíos con nombres fechados, repartidos en carpetas:
+#  - primera indexación (todos nuevos) y reapertura sin cambios;
+#  - reapertura con unos pocos archivos modificados y borrados;
+#  - consultas: sin leer, rango de fechas y fecha del nombre distinta.
+# No lee metadatos (los archivos están vacíos): mide el recorrido por stat.
+# Uso: python benchmarks/bench_indice.py [--archivos 100000] [--por-carpeta 1000]
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from media_index import IndiceMedios  # noqa: E402
+
+
+def crear_biblioteca(carpeta, archivos, por_carpeta):
+    for i in range(archivos):
+        sub = os.path.join(carpeta, f"d{i // por_carpeta:04d}")
+        if i % por_carpeta == 0:
+            os.makedirs(sub, exist_ok=True)
+        nombre = f"IMG_{2005 + i % 20}{i % 12 + 1:02d}{i % 28 + 1:02d}_{i % 24:02d}0000_{i}.jpg"
+        open(os.path.join(sub, nombre), "wb").close()
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, round(time.perf_counter() - inicio, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--archivos", type=int, default=100000)
+    parser.add_argument("--por-carpeta", type=int, default=1000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        biblioteca = os.path.join(tmp, "biblioteca")
+        crear_biblioteca(biblioteca, args.archivos, args.por_carpeta)
+        indice = IndiceMedios(os.path.join(tmp, "indice.sqlite3"))
+        primera, primera_s = medir(lambda: indice.sincronizar(biblioteca, recursivo=True))
+        reapertura, reapertura_s = medir(lambda: indice.sincronizar(biblioteca, recursivo=True))
+
+        # Unos pocos cambios: se modifican y borran 10 archivos de la primera carpeta
+        primera_carpeta = os.path.join(biblioteca, "d0000")
+        nombres = sorted(os.listdir(primera_carpeta))
+        for nombre in nombres[:10]:
+            with open(os.path.join(primera_carpeta, nombre), "ab") as f:
+                f.write(b"x")
+        for nombre in nombres[10:20]:
+            os.remove(os.path.join(primera_carpeta, nombre))
+        cambios, cambios_s = medir(lambda: indice.sincronizar(biblioteca, recursivo=True))
+
+        consultas = {}
+        for nombre, llamada in (
+                ("sin_leer", lambda: indice.consultar("sin_leer", biblioteca, limite=100)),
+                ("rango_nombre", lambda: indice.consultar(
+                    "todos", desde="2010:01:01", hasta="2010:12:31", campo="nombre", limite=100)),
+                ("distinta", lambda: indice.consultar("distinta", limite=100))):
+            res, segundos = medir(llamada)
+            consultas[nombre] = {"total": res["total"], "ms": round(segundos * 1000, 1)}
+        indice.cerrar()
+
+    errores = []
+    if reapertura["nuevos"] or reapertura["cambiados"] or reapertura["borrados"]:
+        errores.append(f"la reapertura sin cambios tocó archivos: {reapertura}")
+    if (cambios["cambiados"], cambios["borrados"]) != (10, 10):
+        errores.append(f"cambios detectados: {cambios}")
+    print(json.dumps({
+        "archivos": args.archivos,
+        "primera_indexacion_s": primera_s,
+        "reapertura_s": reapertura_s,
+        "reapertura_con_cambios_s": cambios_s,
+        "archivos_por_s_reapertura": round(args.archivos / reapertura_s) if reapertura_s else None,
+        "consultas": consultas,
+        "errores": errores,
+    }, indent=2, ensure_ascii=False))
+    if errores:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
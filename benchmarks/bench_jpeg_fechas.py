@@ -0,0 +1,196 @@
+# Verifica la escritura nativa de fechas en JPEG (media_utils.cambiar_fecha_jpeg_nativo)
+# y la compara en velocidad con exiftool.
+#  - Byte a byte: el archivo parcheado solo difiere del original en los 60
+#    bytes de las tres fechas, y las fechas releídas son las escritas.
+#  - Si hay exiftool: comprueba que la misma escritura hecha con exiftool
+#    deja el bloque APP1 'Exif' idéntico byte a byte al de la nativa, y las
+#    mismas fechas (AllDates y FileModifyDate). Esa igualdad todavía no se
+#    comprobó contra un exiftool real (no hay uno en el entorno donde se
+#    escribió, ni un archivo de referencia hecho con él): sin exiftool la
+#    parte se omite y "ida_y_vuelta_exiftool" la informa como sin verificar.
+# Uso: python benchmarks/bench_jpeg_fechas.py [--archivos 200]
+import os
+import sys
+import json
+import time
+import shutil
+import struct
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import media_utils  # noqa: E402
+from jpeg_exif import fechas_exif, segmentos  # noqa: E402
+
+FECHA_ORIGINAL = "2011:02:03 04:05:06"
+FECHA_NUEVA = "2023:12:24 21:30:00"
+
+
+def bloque_exif(endian):
+    """APP1 'Exif' mínimo: IFD0 (Make, ModifyDate, puntero ExifIFD) y ExifIFD con dos fechas."""
+    fecha = FECHA_ORIGINAL.encode('ascii') + b'\x00'
+    marca = b'Camara de prueba\x00'
+
+    def entrada(tag, tipo, cantidad, offset):
+        return struct.pack(endian + 'HHII', tag, tipo, cantidad, offset)
+
+    # Disposición: encabezado(8) + IFD0(2+3*12+4) + datos IFD0 + ExifIFD(2+2*12+4) + datos
+    ifd0 = 8
+    datos_ifd0 = ifd0 + 2 + 3 * 12 + 4
+    exif_ifd = datos_ifd0 + len(marca) + len(fecha)
+    datos_exif = exif_ifd + 2 + 2 * 12 + 4
+    tiff = (b'II' if endian == '<' else b'MM') + struct.pack(endian + 'HI', 42, ifd0)
+    tiff += struct.pack(endian + 'H', 3)
+    tiff += entrada(0x010F, 2, len(marca), datos_ifd0)
+    tiff += entrada(0x0132, 2, 20, datos_ifd0 + len(marca))
+    tiff += entrada(0x8769, 4, 1, exif_ifd)
+    tiff += struct.pack(endian + 'I', 0) + marca + fecha
+    tiff += struct.pack(endian + 'H', 2)
+    tiff += entrada(0x9003, 2, 20, datos_exif)
+    tiff += entrada(0x9004, 2, 20, datos_exif + 20)
+    tiff += struct.pack(endian + 'I', 0) + fecha + fecha
+    return b'Exif\x00\x00' + tiff
+
+
+def crear_jpeg(path, endian, tamano=(640, 480)):
+    from PIL import Image
+    Image.new("RGB", tamano, (30, 120, 200)).save(path, quality=85, exif=bloque_exif(endian))
+
+
+def buscar_exiftool():
+    """Ruta de exiftool si está instalado y responde a -ver con una versión, o None."""
+    exiftool = shutil.which("exiftool")
+    if not exiftool:
+        return None
+    try:
+        version = subprocess.run([exiftool, "-ver"], capture_output=True, text=True,
+                                 stdin=subprocess.DEVNULL, timeout=20).stdout.strip()
+        float(version)
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+    return exiftool
+
+
+def bloque_app1_exif(path):
+    """Contenido del primer segmento APP1 'Exif' del JPEG (bytes), o None."""
+    with open(path, 'rb') as f:
+        datos = f.read()
+    for marcador, inicio, fin in segmentos(datos):
+        if marcador == 0xE1 and datos[inicio:inicio + 6] == b'Exif\x00\x00':
+            return datos[inicio:fin]
+    return None
+
+
+def exiftool_json(exiftool, path):
+    salida = subprocess.run([exiftool, "-json", "-AllDates", "-FileModifyDate", path],
+                            capture_output=True, text=True, check=True).stdout
+    fila = json.loads(salida)[0]
+    fila.pop("SourceFile", None)
+    # FileModifyDate trae la zona horaria al final; se compara sin ella
+    fila["FileModifyDate"] = fila.get("FileModifyDate", "")[:19]
+    return fila
+
+
+def verificar(carpeta, exiftool):
+    errores = []
+    for endian in ('<', '>'):
+        original = os.path.join(carpeta, f"original_{endian == '<' and 'II' or 'MM'}.jpg")
+        crear_jpeg(original, endian)
+        nativo = original.replace("original", "nativo")
+        shutil.copyfile(original, nativo)
+        if not media_utils.cambiar_fecha_jpeg_nativo(nativo, FECHA_NUEVA):
+            errores.append(f"{endian}: la escritura nativa no aceptó el archivo")
+            continue
+        with open(original, 'rb') as f:
+            antes = f.read()
+        with open(nativo, 'rb') as f:
+            despues = f.read()
+        distintos = sum(1 for a, b in zip(antes, despues) if a != b)
+        if len(antes) != len(despues) or distintos > 60:
+            errores.append(f"{endian}: cambiaron {distintos} bytes (máximo 60)")
+        fechas = fechas_exif(despues)
+        if fechas != {"ModifyDate": FECHA_NUEVA, "DateTimeOriginal": FECHA_NUEVA,
+                      "CreateDate": FECHA_NUEVA}:
+            errores.append(f"{endian}: fechas releídas {fechas}")
+        mtime = time.strftime("%Y:%m:%d %H:%M:%S", time.localtime(os.stat(nativo).st_mtime))
+        if mtime != FECHA_NUEVA:
+            errores.append(f"{endian}: mtime {mtime}")
+        if exiftool:
+            con_exiftool = original.replace("original", "exiftool")
+            shutil.copyfile(original, con_exiftool)
+            subprocess.run([exiftool, f"-AllDates={FECHA_NUEVA}", f"-FileModifyDate={FECHA_NUEVA}",
+                            "-overwrite_original", "-P", con_exiftool],
+                           capture_output=True, check=True)
+            # Ida y vuelta byte a byte: el bloque EXIF que deja exiftool es el nativo
+            bloque_nativo = bloque_app1_exif(nativo)
+            bloque_exiftool = bloque_app1_exif(con_exiftool)
+            if bloque_exiftool is None or bloque_nativo != bloque_exiftool:
+                distintos = -1
+                if bloque_exiftool is not None and len(bloque_nativo) == len(bloque_exiftool):
+                    distintos = sum(1 for a, b in zip(bloque_nativo, bloque_exiftool) if a != b)
+                errores.append(f"{endian}: el bloque EXIF de exiftool difiere del nativo "
+                               f"({len(bloque_exiftool or b'')} vs {len(bloque_nativo)} bytes, "
+                               f"{distintos} bytes distintos)")
+            if exiftool_json(exiftool, nativo) != exiftool_json(exiftool, con_exiftool):
+                errores.append(f"{endian}: exiftool lee distinto el archivo nativo")
+    # Un JPEG sin EXIF no se toca: debe ir a exiftool
+    from PIL import Image
+    sin_exif = os.path.join(carpeta, "sin_exif.jpg")
+    Image.new("RGB", (32, 32)).save(sin_exif)
+    with open(sin_exif, 'rb') as f:
+        antes = f.read()
+    if media_utils.cambiar_fecha_jpeg_nativo(sin_exif, FECHA_NUEVA):
+        errores.append("sin EXIF: se aceptó un archivo sin los campos de fecha")
+    with open(sin_exif, 'rb') as f:
+        if f.read() != antes:
+            errores.append("sin EXIF: el archivo fue modificado")
+    return errores
+
+
+def medir(carpeta, n, exiftool):
+    base = os.path.join(carpeta, "base.jpg")
+    crear_jpeg(base, '<', (4000, 3000))
+    paths = []
+    for i in range(n):
+        path = os.path.join(carpeta, f"bench_{i:05d}.jpg")
+        shutil.copyfile(base, path)
+        paths.append(path)
+    resultado = {"archivos": n, "tamano_bytes": os.path.getsize(base)}
+    inicio = time.perf_counter()
+    for path in paths:
+        media_utils.cambiar_fecha_jpeg_nativo(path, FECHA_NUEVA)
+    resultado["nativo_s"] = round(time.perf_counter() - inicio, 3)
+    if exiftool:
+        inicio = time.perf_counter()
+        for path in paths:
+            subprocess.run([exiftool, f"-AllDates={FECHA_ORIGINAL}",
+                            f"-FileModifyDate={FECHA_ORIGINAL}",
+                            "-overwrite_original", "-P", path], capture_output=True)
+        resultado["exiftool_por_archivo_s"] = round(time.perf_counter() - inicio, 3)
+        resultado["aceleracion"] = round(
+            resultado["exiftool_por_archivo_s"] / max(resultado["nativo_s"], 1e-9), 1)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--archivos", type=int, default=200)
+    args = parser.parse_args()
+    exiftool = buscar_exiftool()
+    with tempfile.TemporaryDirectory() as carpeta:
+        errores = verificar(carpeta, exiftool)
+        resultado = medir(carpeta, args.archivos, exiftool)
+    resultado["exiftool"] = exiftool
+    resultado["ida_y_vuelta_exiftool"] = (
+        "verificada byte a byte" if exiftool
+        else "sin verificar: exiftool no está instalado, no se sabe si su bloque EXIF es igual al nativo")
+    resultado["errores"] = errores
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    if errores:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# Compara la representación del lote de la interfaz para una selección muy
+# grande (rutas sintéticas, no hace falta que existan):
+#  - antes: una lista de dicts por archivo (path, fecha, hora, miniatura,
+#    log...) y resultados con un mensaje por archivo;
+#  - después: lote.LoteMedios en columnas y resultados [id, estado, detalle].
+# Cada variante corre en un intérprete nuevo y mide el pico de memoria de
+# Python (tracemalloc), el pico de RSS del proceso y el tamaño en JSON de lo
+# que cruza el puente con la página (pywebview serializa con json.dumps).
+# Uso: python benchmarks/bench_lote.py [--archivos 200000] [--por-carpeta 100]
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def rutas(archivos, por_carpeta):
+    base = os.path.join(os.sep, "home", "usuario", "Imágenes", "Fotos del teléfono")
+    return [os.path.join(base, f"{2005 + i // 20000}", f"evento_{i // por_carpeta:05d}",
+                         f"IMG_{2005 + i // 20000}{i % 12 + 1:02d}{i % 28 + 1:02d}_"
+                         f"{i % 24:02d}{i % 60:02d}00.jpg")
+            for i in range(archivos)]
+
+
+def antes(paths):
+    # Como devolvían extraer_metadata_batch y el trabajo de procesar_batch
+    from media_utils import extract_datetime_from_filename
+    filas = []
+    for path in paths:
+        fecha, hora = extract_datetime_from_filename(path)
+        filas.append({"path": path, "fecha": fecha, "hora": hora, "fecha_actual": None,
+                      "thumb": None, "thumb_log": "", "thumb_pendiente": True})
+    enviados = [{"path": f["path"], "fecha": f["fecha"], "hora": f["hora"] or "",
+                 "accion": "modificar_imagen"} for f in filas]
+    resultados = [{"path": path, "resultado": f"✓ Metadatos aplicados a imagen: {path}"}
+                  for path in paths]
+    return filas, enviados, resultados
+
+
+def despues(paths):
+    from lote import LoteMedios
+    lote = LoteMedios.desde_rutas(paths)
+    columnas = lote.columnas()
+    enviados = {"lote_id": lote.id, "cambios": {}}
+    # Al procesar, el diario guarda las columnas y los archivos salen de a uno
+    diario = json.dumps({"lote": columnas, "cambios": {}})
+    resultados = []
+    for archivo in lote.archivos():
+        resultados.append(lote.anotar({"id": archivo["id"], "success": True}))
+    del diario
+    return columnas, enviados, resultados
+
+
+def medir(variante, archivos, por_carpeta):
+    import tracemalloc
+    paths = rutas(archivos, por_carpeta)
+    tracemalloc.start()
+    datos = (antes if variante == "antes" else despues)(paths)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    lote, enviados, resultados = datos
+    medida = {
+        "pico_python_mb": round(pico / 2 ** 20, 1),
+        "json_lote_mb": round(len(json.dumps(lote)) / 2 ** 20, 2),
+        "json_envio_mb": round(len(json.dumps(enviados)) / 2 ** 20, 2),
+        "json_resultados_mb": round(len(json.dumps(resultados)) / 2 ** 20, 2),
+    }
+    try:
+        import resource
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        medida["pico_rss_mb"] = round(maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+    except ImportError:
+        medida["pico_rss_mb"] = None
+    return medida
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--archivos", type=int, default=200000)
+    parser.add_argument("--por-carpeta", type=int, default=100)
+    parser.add_argument("--variante", choices=("antes", "despues"))
+    args = parser.parse_args()
+    if args.variante:
+        print(json.dumps(medir(args.variante, args.archivos, args.por_carpeta)))
+        return
+    medidas = {}
+    for variante in ("antes", "despues"):
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--variante", variante,
+             "--archivos", str(args.archivos), "--por-carpeta", str(args.por_carpeta)],
+            capture_output=True, text=True, check=True).stdout
+        medidas[variante] = json.loads(salida)
+    print(json.dumps({
+        "archivos": args.archivos,
+        **medidas,
+        "reduccion": {clave: round(medidas["antes"][clave] / medidas["despues"][clave], 1)
+                      for clave in medidas["antes"]
+                      if medidas["antes"][clave] and medidas["despues"][clave]},
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
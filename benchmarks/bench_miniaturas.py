@@ -0,0 +1,59 @@
+# Compara la generación de miniaturas anterior (leer todo el archivo y
+# decodificarlo completo) con thumbnails.miniatura_imagen sobre una carpeta.
+# Uso: python benchmarks/bench_miniaturas.py CARPETA [--repeticiones N]
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from thumbnails import miniatura_imagen, TAMANO_MINIATURA  # noqa: E402
+
+
+def miniatura_anterior(path, tamano=TAMANO_MINIATURA):
+    from PIL import Image
+    inicio = time.perf_counter()
+    with open(path, 'rb') as f:
+        img_bytes = f.read()
+    img = Image.open(io.BytesIO(img_bytes))
+    img.thumbnail(tamano)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG")
+    return (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("carpeta")
+    parser.add_argument("--repeticiones", type=int, default=1)
+    args = parser.parse_args()
+    paths = [os.path.join(args.carpeta, f) for f in sorted(os.listdir(args.carpeta))
+             if f.lower().endswith(('.jpg', '.jpeg'))]
+    anterior, nuevo, metodos = [], [], {}
+    for _ in range(args.repeticiones):
+        for path in paths:
+            anterior.append(miniatura_anterior(path))
+            _, metodo, ms = miniatura_imagen(path)
+            nuevo.append(ms)
+            metodos[metodo] = metodos.get(metodo, 0) + 1
+    if not paths:
+        print("No hay JPEGs en la carpeta")
+        return
+    resultado = {
+        "archivos": len(paths),
+        "anterior_ms_p50": round(statistics.median(anterior), 2),
+        "nuevo_ms_p50": round(statistics.median(nuevo), 2),
+        "aceleracion_total": round(sum(anterior) / max(sum(nuevo), 1e-9), 1),
+        "metodos": metodos,
+    }
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
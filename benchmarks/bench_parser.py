@@ -0,0 +1,170 @@
+# Verifica que el parser de nombres de media_utils da exactamente las mismas
+# salidas que la implementación anterior sobre un corpus de regresión, y
+# compara su velocidad (mejor de --corridas):
+#  - en frío: con todas las caches del parser vacías (limpiar_cache_nombres),
+#    la cifra que cuenta para el objetivo de 5x sobre 100k nombres;
+#  - en caliente: los mismos nombres otra vez, con los planes por forma y las
+#    fechas de 8 dígitos ya en cache (no hay cache por nombre). Se informa aparte.
+# Uso: python benchmarks/bench_parser.py [--nombres 100000] [--semilla 1] [--corridas 3]
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import media_utils  # noqa: E402
+from media_utils import (  # noqa: E402
+    is_persian_date, persian_date_to_gregorian, gregorian_date_to_exif_format)
+
+
+def extract_datetime_anterior(filename):
+    # Copia literal del parser anterior (una búsqueda de regex por patrón)
+    base = os.path.splitext(os.path.basename(filename))[0]
+    match_custom = re.search(r'_(\d{8})_', base)
+    if match_custom:
+        date_str = match_custom.group(1)
+        if is_persian_date(date_str):
+            fecha = persian_date_to_gregorian(date_str)
+        else:
+            fecha = gregorian_date_to_exif_format(date_str)
+        hora = None
+        return fecha, hora
+    match = re.search(r'(\d{8})', base)
+    if match:
+        date_str = match.group(1)
+        if is_persian_date(date_str):
+            fecha = persian_date_to_gregorian(date_str)
+        else:
+            fecha = gregorian_date_to_exif_format(date_str)
+    else:
+        fecha = None
+    match2 = re.search(
+        r'(\d{4})[-_](\d{1,2})[-_](\d{1,2})[-_](\d{1,2})[.](\d{1,2})[.](\d{1,2})', base)
+    if match2:
+        y, m, d, h, mi, s = match2.groups()
+        fecha = f"{y}:{m.zfill(2)}:{d.zfill(2)}"
+        hora = f"{h.zfill(2)}:{mi.zfill(2)}:{s.zfill(2)}"
+        return fecha, hora
+    match3 = re.search(r'(\d{4})[-_](\d{1,2})[-_](\d{1,2})', base)
+    if match3:
+        y, m, d = match3.groups()
+        fecha = f"{y}:{m.zfill(2)}:{d.zfill(2)}"
+    match4 = re.search(r'Status_(\w{3})_(\d{1,2})_(\d{4})', base)
+    if match4:
+        month_dict = {'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04',
+                      'May': '05', 'Jun': '06', 'Jul': '07', 'Aug': '08',
+                      'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'}
+        month = month_dict.get(match4.group(1), '01')
+        day = match4.group(2).zfill(2)
+        year = match4.group(3)
+        fecha = f"{year}:{month}:{day}"
+    match_hora = re.search(r'(\d{1,2})[.](\d{1,2})[.](\d{1,2})', base)
+    if match_hora:
+        h, mi, s = match_hora.groups()
+        hora = f"{h.zfill(2)}:{mi.zfill(2)}:{s.zfill(2)}"
+        return fecha, hora
+    match_hora2 = re.search(r'_(\d{9})$', base)
+    if match_hora2:
+        t = match_hora2.group(1)
+        hora = f"{t[:2]}:{t[2:4]}:{t[4:6]}"
+        return fecha, hora
+    match_hora3 = re.search(r'_(\d{6})[-\.]', base)
+    if match_hora3:
+        t = match_hora3.group(1)
+        hora = f"{t[:2]}:{t[2:4]}:{t[4:6]}"
+        return fecha, hora
+    match_hora4 = re.search(r'_(\d{6})-', base)
+    if match_hora4:
+        t = match_hora4.group(1)
+        hora = f"{t[:2]}:{t[2:4]}:{t[4:6]}"
+        return fecha, hora
+    hora = None
+    return fecha, hora
+
+
+def generar_nombres(n, semilla=1):
+    """Nombres que cubren todos los patrones del parser, más ruido."""
+    rnd = random.Random(semilla)
+    meses = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec', 'Xyz']
+
+    def d(a, b):
+        return rnd.randint(a, b)
+
+    def fecha8():
+        if rnd.random() < 0.3:
+            return f"{d(1395, 1405)}{d(1, 12):02d}{d(1, 31):02d}"
+        return f"{d(1990, 2030)}{d(1, 12):02d}{d(1, 31):02d}"
+
+    plantillas = [
+        lambda: f"IMG_{fecha8()}_{d(0, 23):02d}{d(0, 59):02d}{d(0, 59):02d}.jpg",
+        lambda: f"VID_{fecha8()}_{d(0, 999999):06d}.mp4",
+        lambda: f"IMG-{fecha8()}-WA{d(0, 9999):04d}.jpg",
+        lambda: f"{fecha8()}_{d(0, 999999):06d}-{d(0, 99)}.jpg",
+        lambda: f"{fecha8()}_{d(0, 999999):06d}.{d(0, 99)}.jpg",
+        lambda: f"PXL_{fecha8()}{d(0, 999999999):09d}.jpg",
+        lambda: f"photo_{d(0, 99)}_{d(0, 999999999):09d}.jpg",
+        lambda: f"WhatsApp Image {d(2015, 2025)}-{d(1, 12):02d}-{d(1, 31):02d} at {d(0, 23)}.{d(0, 59):02d}.{d(0, 59):02d}.jpeg",
+        lambda: f"Screenshot_{d(2015, 2025)}-{d(1, 12)}-{d(1, 31)}-{d(0, 23)}.{d(0, 59)}.{d(0, 59)}.png",
+        lambda: f"Status_{rnd.choice(meses)}_{d(1, 31)}_{d(2015, 2025)}.mp4",
+        lambda: f"Status_{rnd.choice(meses)}_{d(1, 31)}_{d(2015, 2025)} {d(0, 23)}.{d(0, 59)}.{d(0, 59)}.mp4",
+        lambda: f"{d(2015, 2025)}_{d(1, 12)}_{d(1, 31)}.jpg",
+        lambda: f"DSC{d(0, 99999):05d}.JPG",
+        lambda: f"vacaciones playa {d(1, 200)}.jpg",
+        lambda: "sin_numeros.jpg",
+        lambda: f"C:\\\\fotos\\\\{d(2000, 2030)}\\\\IMG_{fecha8()}_x.jpg",
+        lambda: f"/mnt/archivo/{d(2000, 2030)}/{fecha8()}{d(0, 99)}.jpg",
+    ]
+    return [rnd.choice(plantillas)() for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nombres", type=int, default=100000)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--corridas", type=int, default=3)
+    args = parser.parse_args()
+    nombres = generar_nombres(args.nombres, args.semilla)
+
+    esperados = [extract_datetime_anterior(n) for n in nombres]
+    media_utils.limpiar_cache_nombres()
+    distintos = [(n, e, o) for n, e, o in zip(nombres, esperados, media_utils.parse_many(nombres))
+                 if e != o]
+
+    def mejor(funcion, antes=None):
+        tiempos = []
+        for _ in range(args.corridas):
+            if antes:
+                antes()
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        return min(tiempos)
+
+    t_anterior = mejor(lambda: [extract_datetime_anterior(n) for n in nombres])
+    t_nuevo = mejor(lambda: media_utils.parse_many(nombres), media_utils.limpiar_cache_nombres)
+    t_caliente = mejor(lambda: media_utils.parse_many(nombres))
+    aceleracion = t_anterior / max(t_nuevo, 1e-9)
+    aceleracion_caliente = t_anterior / max(t_caliente, 1e-9)
+
+    print(json.dumps({
+        "nombres": len(nombres),
+        "distintos": len(distintos),
+        "ejemplos_distintos": distintos[:5],
+        "anterior_s": round(t_anterior, 3),
+        "nuevo_frio_s": round(t_nuevo, 3),
+        "nuevo_caliente_s": round(t_caliente, 3),
+        "aceleracion_frio": round(aceleracion, 1),
+        "aceleracion_caliente": round(aceleracion_caliente, 1),
+        "objetivo_5x_en_frio": aceleracion >= 5,
+        "objetivo_5x_en_caliente": aceleracion_caliente >= 5,
+    }, indent=2, ensure_ascii=False))
+    if distintos:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+# Banco de pruebas de rendimiento de las etapas del proceso sobre el corpus
+# sintético de benchmarks/corpus.py, con varios tamaños de corpus y de pool:
+#  - parser: extract_datetime_from_filename (caches vacías).
+#  - extraer_metadata_batch: lo que hace la interfaz al cargar archivos.
+#  - procesar_batch: MotorMedios.procesar_batch (fecha del nombre, por archivo).
+#  - carpeta_auto: _procesar_carpeta_auto en modo 'extraida' y en modo
+#    'manual' (escrituras agrupadas).
+# Cada medición corre en un proceso aparte (RSS y procesos lanzados propios,
+# caches frías) sobre una copia de los archivos. El resultado es JSON: archivos/s,
+# latencia por archivo p50/p95, RSS pico y procesos lanzados por ejecutable;
+# con --comparar se compara con un JSON anterior (de otro commit).
+# Uso: python benchmarks/bench_suite.py [--tamanos 100,1000] [--workers 1,4]
+#      [--etapas parser,procesar_batch] [--salida r.json] [--comparar anterior.json]
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(BENCH)
+sys.path.insert(0, BENCH)
+sys.path.insert(0, RAIZ)
+
+ETAPAS = ("parser", "extraer_metadata_batch", "procesar_batch",
+          "carpeta_auto", "carpeta_auto_manual")
+# Etapas sin subprocesos: el tamaño del pool no cambia nada
+SIN_WORKERS = ("parser", "extraer_metadata_batch")
+FECHA_MANUAL = ("2023:12:24", "21:30:00")
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def _contar_procesos():
+    """Cuenta los subprocess.Popen del proceso, por nombre de ejecutable."""
+    contador = {}
+    original = subprocess.Popen.__init__
+
+    def contando(self, args, *resto, **kwargs):
+        programa = args[0] if isinstance(args, (list, tuple)) else str(args).split()[0]
+        nombre = os.path.splitext(os.path.basename(str(programa)))[0]
+        contador[nombre] = contador.get(nombre, 0) + 1
+        original(self, args, *resto, **kwargs)
+    subprocess.Popen.__init__ = contando
+    return contador
+
+
+def _rss_pico_mb():
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    # ru_maxrss: KB en Linux, bytes en macOS
+    escala = 1 if sys.platform == "darwin" else 1024
+    propio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * escala
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * escala
+    return round(propio / 2 ** 20, 1), round(hijos / 2 ** 20, 1)
+
+
+def _cronometrar(objeto, nombre, latencias):
+    # Reemplaza objeto.nombre por una versión que anota cuánto tarda cada llamada
+    original = getattr(objeto, nombre)
+
+    def medido(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            latencias.append(time.perf_counter() - inicio)
+    setattr(objeto, nombre, medido)
+
+
+def _exitoso(res):
+    if isinstance(res, str):
+        return res.startswith("✓")
+    if "success" in res:
+        return bool(res["success"])
+    return str(res.get("resultado", "")).startswith("✓")
+
+
+def medir_etapa(etapa, corpus, n, workers, exiftool, ffmpeg):
+    """Corre una etapa sobre los primeros `n` archivos del corpus (proceso hijo)."""
+    import media_utils
+
+    # El proceso principal ya generó el corpus
+    with open(os.path.join(corpus, "manifiesto.json"), encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    elegidos = manifiesto["archivos"][:n]
+    trabajo = tempfile.mkdtemp(prefix="bench_suite_")
+    # Diarios y caches del proceso de prueba en la carpeta temporal
+    os.environ["XDG_DATA_HOME"] = os.environ["XDG_CACHE_HOME"] = trabajo
+    os.environ["LOCALAPPDATA"] = trabajo
+    carpeta = os.path.join(trabajo, "medios")
+    os.makedirs(carpeta)
+    paths = []
+    for archivo in elegidos:
+        destino = os.path.join(carpeta, os.path.basename(archivo["path"]))
+        if etapa not in SIN_WORKERS:
+            shutil.copyfile(os.path.join(corpus, archivo["path"]), destino)
+        paths.append(destino)
+
+    procesos = _contar_procesos()
+    latencias = []
+    resultados = []
+    motor = None
+    try:
+        if etapa == "parser":
+            media_utils.limpiar_cache_nombres()
+            extraer = media_utils.extract_datetime_from_filename
+            inicio = time.perf_counter()
+            for path in paths:
+                t = time.perf_counter()
+                resultados.append(extraer(path))
+                latencias.append(time.perf_counter() - t)
+            total = time.perf_counter() - inicio
+            resultados = [fecha is not None for fecha, _ in resultados]
+        elif etapa == "extraer_metadata_batch":
+            import io
+            import contextlib
+            import main_webview
+            api = main_webview.Api()
+            motor = api
+            _cronometrar(main_webview, "extract_datetime_from_filename", latencias)
+            with contextlib.redirect_stdout(io.StringIO()):
+                inicio = time.perf_counter()
+                resultados = api.extraer_metadata_batch(paths)
+                total = time.perf_counter() - inicio
+            resultados = [bool(r["fecha"]) for r in resultados]
+        else:
+            from media_engine import MotorMedios
+            motor = MotorMedios(exiftool, ffmpeg, workers, workers)
+            if etapa == "procesar_batch":
+                _cronometrar(motor, "_procesar_item_batch", latencias)
+                archivos = []
+                for path in paths:
+                    fecha, hora = media_utils.extract_datetime_from_filename(path)
+                    archivos.append({"path": path, "fecha": fecha, "hora": hora,
+                                     "accion": "modificar"})
+                inicio = time.perf_counter()
+                resultados = motor.procesar_batch(archivos)
+                total = time.perf_counter() - inicio
+            else:
+                if etapa == "carpeta_auto":
+                    _cronometrar(motor, "_procesar_archivo_auto", latencias)
+                    modo, fecha, hora = "extraida", None, None
+                else:
+                    # Escrituras agrupadas: no hay latencia por archivo
+                    modo, (fecha, hora) = "manual", FECHA_MANUAL
+                inicio = time.perf_counter()
+                logs = motor._procesar_carpeta_auto(carpeta, modo, fecha, hora)["logs"]
+                total = time.perf_counter() - inicio
+                resultados = logs[:-1]
+            resultados = [_exitoso(r) for r in resultados]
+    finally:
+        if motor is not None:
+            motor.cerrar()
+        shutil.rmtree(trabajo, ignore_errors=True)
+    rss, rss_hijos = _rss_pico_mb()
+    return {
+        "etapa": etapa,
+        "archivos": len(paths),
+        "workers": workers,
+        "s": round(total, 4),
+        "archivos_por_s": round(len(paths) / total, 1) if total > 0 else None,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3) if latencias else None,
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3) if latencias else None,
+        "exitosos": sum(resultados),
+        "fallidos": len(resultados) - sum(resultados),
+        "rss_pico_mb": rss,
+        "rss_pico_hijos_mb": rss_hijos,
+        "procesos": procesos,
+    }
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=RAIZ, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual, anterior):
+    """Cociente actual/anterior de archivos/s y p95 para las mismas mediciones."""
+    previas = {(r["etapa"], r["archivos"], r["workers"]): r for r in anterior.get("resultados", [])}
+    comparacion = []
+    for r in actual["resultados"]:
+        previa = previas.get((r["etapa"], r["archivos"], r["workers"]))
+        if not previa or "error" in r or "error" in previa:
+            continue
+        fila = {"etapa": r["etapa"], "archivos": r["archivos"], "workers": r["workers"]}
+        for clave in ("archivos_por_s", "p95_ms"):
+            if r.get(clave) and previa.get(clave):
+                fila[clave + "_ratio"] = round(r[clave] / previa[clave], 2)
+        comparacion.append(fila)
+    return {"commit_anterior": anterior.get("commit"), "filas": comparacion}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "corpus_medios"),
+                        help="carpeta del corpus (se reutiliza entre corridas)")
+    parser.add_argument("--tamanos", default="100,1000")
+    parser.add_argument("--workers", default="1,4")
+    parser.add_argument("--etapas", default=",".join(ETAPAS))
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--exiftool", default=None)
+    parser.add_argument("--ffmpeg", default=None)
+    parser.add_argument("--salida", default=None, help="guarda el JSON en este archivo")
+    parser.add_argument("--comparar", default=None, help="JSON de una corrida anterior")
+    parser.add_argument("--_medir", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--_n", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--_w", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    from media_utils import buscar_ejecutable
+    exiftool = args.exiftool or buscar_ejecutable("exiftool")
+    ffmpeg = args.ffmpeg or buscar_ejecutable("ffmpeg")
+
+    if args._medir:
+        # Proceso hijo: una sola medición, una línea JSON
+        print(json.dumps(medir_etapa(args._medir, args.corpus, args._n, args._w,
+                                     exiftool, ffmpeg), ensure_ascii=False))
+        return
+
+    from corpus import generar_corpus
+    tamanos = sorted(int(t) for t in args.tamanos.split(","))
+    workers = [int(w) for w in args.workers.split(",")]
+    etapas = [e for e in args.etapas.split(",") if e]
+    for etapa in etapas:
+        if etapa not in ETAPAS:
+            parser.error(f"etapa desconocida: {etapa} (hay {', '.join(ETAPAS)})")
+    manifiesto = generar_corpus(args.corpus, tamanos[-1], args.semilla,
+                                ffmpeg if os.path.exists(ffmpeg) else None)
+
+    resultado = {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "cambios_sin_commit": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "plataforma": sys.platform,
+        "cpus": os.cpu_count(),
+        "exiftool": exiftool if os.path.exists(exiftool) else None,
+        "ffmpeg": manifiesto.get("ffmpeg"),
+        "corpus": {"carpeta": args.corpus, "archivos": len(manifiesto["archivos"]),
+                   "bytes": manifiesto["bytes"], "semilla": args.semilla},
+        "resultados": [],
+    }
+    for etapa in etapas:
+        for n in tamanos:
+            for w in ([None] if etapa in SIN_WORKERS else workers):
+                comando = [sys.executable, os.path.abspath(__file__), "--corpus", args.corpus,
+                           "--exiftool", exiftool, "--ffmpeg", ffmpeg,
+                           "--_medir", etapa, "--_n", str(n)]
+                if w is not None:
+                    comando += ["--_w", str(w)]
+                hijo = subprocess.run(comando, capture_output=True, text=True)
+                lineas = hijo.stdout.strip().splitlines()
+                if hijo.returncode != 0 or not lineas:
+                    error = (hijo.stderr.strip().splitlines() or ["sin salida"])[-1]
+                    fila = {"etapa": etapa, "archivos": n, "workers": w, "error": error}
+                else:
+                    fila = json.loads(lineas[-1])
+                resultado["resultados"].append(fila)
+                print(json.dumps(fila, ensure_ascii=False), file=sys.stderr)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            resultado["comparacion"] = comparar(resultado, json.load(f))
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
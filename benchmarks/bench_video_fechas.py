@@ -0,0 +1,176 @@
+# Verifica la escritura nativa de fechas en MP4/MOV (media_utils.cambiar_fecha_video_nativo)
+# sobre un archivo sintético grande y disperso con mdat de tamaño de 64 bits,
+# moov al final y cajas versión 0 y 1, y mide los bytes leídos por archivo.
+# Comprueba además que con fechas de pista propias solo se escribe el mvhd y
+# que restaurar_fechas, con las fechas que guardaría el diario, deja el
+# archivo byte a byte como estaba.
+# Si hay exiftool en el PATH compara también con su lectura (QuickTimeUTC=1).
+# Uso: python benchmarks/bench_video_fechas.py [--gb 5]
+import os
+import sys
+import json
+import time
+import shutil
+import struct
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import media_utils  # noqa: E402
+import quicktime_atoms  # noqa: E402
+
+FECHA_NUEVA = "2023:12:24 21:30:00"
+
+
+def caja(tipo, contenido):
+    return struct.pack('>I4s', 8 + len(contenido), tipo) + contenido
+
+
+def caja_completa(tipo, version, cuerpo):
+    return caja(tipo, bytes([version]) + b'\x00\x00\x00' + cuerpo)
+
+
+def crear_mp4(path, tamano_mdat, fecha_pistas=None):
+    """
+    ftyp + mdat (tamaño de 64 bits, disperso) + moov al final. Con
+    `fecha_pistas` (segundos desde 1904) tkhd y mdhd llevan esa fecha.
+    """
+    fecha = 3600 * 24 * 365 * 100  # ~2004 en segundos desde 1904
+    pistas = fecha if fecha_pistas is None else fecha_pistas
+    mvhd = caja_completa(b'mvhd', 1, struct.pack('>QQIQ', fecha, fecha, 1000, 0) + bytes(80))
+    tkhd = caja_completa(b'tkhd', 0, struct.pack('>IIII', pistas, pistas, 1, 0) + bytes(64))
+    mdhd = caja_completa(b'mdhd', 1, struct.pack('>QQIQ', pistas, pistas, 1000, 0) + bytes(4))
+    stbl = caja(b'stbl', bytes(4096))
+    moov = caja(b'moov', mvhd + caja(b'trak', tkhd + caja(b'mdia', mdhd + caja(b'minf', stbl))))
+    with open(path, 'wb') as f:
+        f.write(caja(b'ftyp', b'isom\x00\x00\x02\x00isommp41'))
+        f.write(struct.pack('>I4sQ', 1, b'mdat', 16 + tamano_mdat))
+        f.seek(tamano_mdat, os.SEEK_CUR)
+        f.write(moov)
+
+
+class ArchivoContado:
+    """Envuelve un archivo y cuenta los bytes leídos."""
+
+    def __init__(self, f):
+        self.f = f
+        self.leidos = 0
+
+    def seek(self, *args):
+        return self.f.seek(*args)
+
+    def read(self, n=-1):
+        datos = self.f.read(n)
+        self.leidos += len(datos)
+        return datos
+
+
+def fechas_cajas(path):
+    with open(path, 'rb') as f:
+        campos = quicktime_atoms.campos_fecha(f, os.path.getsize(path))
+        resultado = {}
+        for campo in campos:
+            f.seek(campo.pos)
+            resultado[campo.caja.decode()] = struct.unpack(campo.formato(), f.read(2 * campo.ancho))
+    return resultado
+
+
+def verificar_reversion(carpeta):
+    """Escribe y revierte un MP4 con fechas uniformes y otro con fechas de pista propias."""
+    errores = []
+    nueva = (int(time.mktime(time.strptime(FECHA_NUEVA, "%Y:%m:%d %H:%M:%S")))
+             + quicktime_atoms.EPOCA_QUICKTIME,) * 2
+    for nombre, fecha_pistas in (("uniforme", None), ("pistas_propias", 3600 * 24 * 365 * 90)):
+        path = os.path.join(carpeta, f"{nombre}.mp4")
+        crear_mp4(path, 1024, fecha_pistas)
+        with open(path, 'rb') as f:
+            original = f.read()
+        antes = fechas_cajas(path)
+        # Lo que guardaría el diario (solo las fechas del mvhd)
+        originales = media_utils._fechas_video(path)
+        if not media_utils.cambiar_fecha_video_nativo(path, FECHA_NUEVA):
+            errores.append(f"{nombre}: la escritura nativa no aceptó el archivo")
+            continue
+        despues = fechas_cajas(path)
+        esperado = {caja: nueva for caja in antes} if fecha_pistas is None else dict(antes, mvhd=nueva)
+        if despues != esperado:
+            errores.append(f"{nombre}: fechas escritas {despues}, se esperaba {esperado}")
+        media_utils.restaurar_fechas(path, originales)
+        with open(path, 'rb') as f:
+            if f.read() != original:
+                errores.append(f"{nombre}: restaurar_fechas no dejó el archivo como estaba "
+                               f"({fechas_cajas(path)} en vez de {antes})")
+    return errores
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gb", type=float, default=5)
+    args = parser.parse_args()
+    errores = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        path = os.path.join(carpeta, "grande.mp4")
+        crear_mp4(path, int(args.gb * 1024 ** 3))
+        tamano = os.path.getsize(path)
+
+        with open(path, 'rb') as f:
+            contado = ArchivoContado(f)
+            campos = quicktime_atoms.campos_fecha(contado, tamano)
+        if campos is None:
+            errores.append("no se encontraron las cajas de fecha")
+        else:
+            cajas = [(c.caja.decode(), c.ancho) for c in campos]
+            if cajas != [("mvhd", 8), ("tkhd", 4), ("mdhd", 8)]:
+                errores.append(f"cajas inesperadas: {cajas}")
+
+        inicio = time.perf_counter()
+        escrito = media_utils.cambiar_fecha_video_nativo(path, FECHA_NUEVA)
+        ms = (time.perf_counter() - inicio) * 1000
+        if not escrito:
+            errores.append("la escritura nativa no aceptó el archivo")
+        esperado = int(time.mktime(time.strptime(FECHA_NUEVA, "%Y:%m:%d %H:%M:%S")))
+        with open(path, 'rb') as f:
+            campos = quicktime_atoms.campos_fecha(f, tamano)
+            for campo in campos or []:
+                f.seek(campo.pos)
+                valores = struct.unpack(campo.formato(), f.read(2 * campo.ancho))
+                if valores != (esperado + quicktime_atoms.EPOCA_QUICKTIME,) * 2:
+                    errores.append(f"{campo.caja.decode()}: {valores}")
+        if int(os.stat(path).st_mtime) != esperado:
+            errores.append("mtime distinto de la fecha escrita")
+        if os.path.getsize(path) != tamano:
+            errores.append("cambió el tamaño del archivo")
+
+        exiftool = shutil.which("exiftool")
+        if exiftool and campos:
+            salida = subprocess.run(
+                [exiftool, "-json", "-api", "QuickTimeUTC=1", "-CreateDate", "-ModifyDate", path],
+                capture_output=True, text=True).stdout
+            fila = json.loads(salida)[0] if salida.strip() else {}
+            if fila.get("CreateDate") != FECHA_NUEVA or fila.get("ModifyDate") != FECHA_NUEVA:
+                errores.append(f"exiftool lee {fila}")
+
+        errores += verificar_reversion(carpeta)
+
+        # Contenedores no soportados: no se tocan
+        avi = os.path.join(carpeta, "video.avi")
+        with open(avi, 'wb') as f:
+            f.write(b'RIFF\x00\x00\x00\x00AVI LIST')
+        if media_utils.cambiar_fecha_video_nativo(avi, FECHA_NUEVA):
+            errores.append("se aceptó un AVI")
+
+    print(json.dumps({
+        "tamano_archivo": tamano,
+        "bytes_leidos": contado.leidos,
+        "escritura_ms": round(ms, 2),
+        "exiftool": exiftool,
+        "errores": errores,
+    }, indent=2, ensure_ascii=False))
+    if errores:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
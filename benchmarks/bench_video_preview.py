@@ -0,0 +1,61 @@
+# Compara la miniatura de video anterior (ffmpeg -> MJPEG -> PIL) con el motor
+# nuevo (keyframe + escalado en ffmpeg + frame crudo por pipe), uno por uno
+# y agrupando varios videos por proceso ffmpeg.
+# Uso: python benchmarks/bench_video_preview.py CARPETA [--por-lote N]
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from media_utils import buscar_ejecutable  # noqa: E402
+from thumbnails import miniaturas_video, TAMANO_MINIATURA  # noqa: E402
+
+
+def miniatura_anterior(path, ffmpeg_path, tamano=TAMANO_MINIATURA):
+    # Equivalente a ffmpeg.input(path, ss=0).output('pipe:', vframes=1, format='image2', vcodec='mjpeg')
+    from PIL import Image
+    out = subprocess.run([ffmpeg_path, "-ss", "0", "-i", path, "-vframes", "1",
+                          "-f", "image2", "-vcodec", "mjpeg", "pipe:"],
+                         capture_output=True, check=True).stdout
+    img = Image.open(io.BytesIO(out))
+    img.thumbnail(tamano)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def medir(fn):
+    inicio = time.perf_counter()
+    fn()
+    return round(time.perf_counter() - inicio, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("carpeta")
+    parser.add_argument("--por-lote", type=int, default=4)
+    args = parser.parse_args()
+    ffmpeg_path = buscar_ejecutable('ffmpeg')
+    paths = [os.path.join(args.carpeta, f) for f in sorted(os.listdir(args.carpeta))
+             if f.lower().endswith(('.mp4', '.mov', '.avi'))]
+    if not paths:
+        print("No hay videos en la carpeta")
+        return
+    lotes = [paths[i:i + args.por_lote] for i in range(0, len(paths), args.por_lote)]
+    resultado = {
+        "videos": len(paths),
+        "anterior_s": medir(lambda: [miniatura_anterior(p, ffmpeg_path) for p in paths]),
+        "nuevo_uno_a_uno_s": medir(lambda: [miniaturas_video([p]) for p in paths]),
+        "nuevo_por_lote_s": medir(lambda: [miniaturas_video(lote) for lote in lotes]),
+        "procesos_ffmpeg": {"anterior": len(paths), "por_lote": len(lotes)},
+    }
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
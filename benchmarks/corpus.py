@@ -0,0 +1,204 @@
+# Genera un corpus sintético y reproducible de fotos y videos para los
+# benchmarks: JPEG con y sin EXIF en varias resoluciones, PNG, y clips MP4/MOV
+# cortos hechos con el ffmpeg local, con nombres que cubren cada regla del
+# parser de media_utils (más fechas persas y nombres sin fecha).
+# Misma semilla y parámetros = mismos archivos; si la carpeta ya tiene un
+# corpus igual se reutiliza.
+# Uso: python benchmarks/corpus.py CARPETA [--archivos 1000] [--semilla 1]
+import os
+import sys
+import json
+import shutil
+import random
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_jpeg_fechas import bloque_exif  # noqa: E402
+
+VERSION_CORPUS = 1
+
+# (tipo de archivo, peso relativo)
+TIPOS = (
+    ("jpg_exif", 55),
+    ("jpg_sin_exif", 15),
+    ("png", 10),
+    ("mp4", 12),
+    ("mov", 8),
+)
+
+# (ancho, alto, peso relativo); las grandes son pocas para que el corpus no pese
+RESOLUCIONES = (
+    (640, 480, 50),
+    (1920, 1080, 35),
+    (4000, 3000, 15),
+)
+
+MESES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _nombre(regla, rng):
+    """Nombre de archivo (sin extensión) que activa la regla dada del parser."""
+    a, m, d = rng.randint(2005, 2024), rng.randint(1, 12), rng.randint(1, 28)
+    h, mi, s = rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59)
+    if regla == "custom_8_digitos":
+        return f"IMG_{a}{m:02d}{d:02d}_{h:02d}{mi:02d}{s:02d}"
+    if regla == "8_digitos":
+        return f"{a}{m:02d}{d:02d}"
+    if regla == "fecha_hora":
+        return f"{a}-{m:02d}-{d:02d}-{h:02d}.{mi:02d}.{s:02d}"
+    if regla == "fecha_separada":
+        return f"foto {a}_{m}_{d}"
+    if regla == "whatsapp_status":
+        return f"Status_{MESES[m - 1]}_{d}_{a}"
+    if regla == "hora_puntos":
+        return f"Captura {h}.{mi:02d}.{s:02d}"
+    if regla == "hora_9_digitos":
+        return f"VID-{a}{m:02d}{d:02d}_{h:02d}{mi:02d}{s:02d}{rng.randint(0, 999):03d}"
+    if regla == "hora_6_digitos":
+        return f"PXL-{a}{m:02d}{d:02d}_{h:02d}{mi:02d}{s:02d}-editado"
+    if regla == "persa":
+        return f"IMG_{rng.randint(1390, 1402)}{m:02d}{d:02d}_{h:02d}{mi:02d}{s:02d}"
+    return rng.choice(("vacaciones", "cumpleanos", "playa", "familia")) + " sin fecha"
+
+
+def reglas_cubiertas():
+    from media_utils import REGLAS_NOMBRE
+    return [r.nombre for r in REGLAS_NOMBRE] + ["persa", "sin_fecha"]
+
+
+def _prefijo(i):
+    # Solo letras: un prefijo numérico podría activar reglas del parser
+    letras = ""
+    for _ in range(4):
+        i, r = divmod(i, 26)
+        letras = chr(97 + r) + letras
+    return letras + "-"
+
+
+def _plantilla_imagen(path, tamano, formato, con_exif, semilla):
+    from PIL import Image
+    ancho, alto = tamano
+    # Degradado con un poco de ruido: tamaño de archivo parecido a una foto simple
+    rng = random.Random(semilla)
+    base = Image.linear_gradient("L").resize((ancho, alto))
+    color = Image.merge("RGB", (base, base.rotate(90).resize((ancho, alto)),
+                                Image.effect_noise((ancho, alto), 6)))
+    color = color.point(lambda v: (v + rng.randint(0, 40)) % 256)
+    if formato == "PNG":
+        color.save(path, "PNG")
+    elif con_exif:
+        color.save(path, "JPEG", quality=85, exif=bloque_exif('<' if semilla % 2 else '>'))
+    else:
+        color.save(path, "JPEG", quality=85)
+
+
+def _plantilla_video(path, ffmpeg, segundos=1):
+    subprocess.run([ffmpeg, "-y", "-v", "error", "-f", "lavfi",
+                    "-i", f"testsrc=size=320x240:rate=30:duration={segundos}",
+                    "-c:v", "mpeg4", "-q:v", "5", path],
+                   check=True, capture_output=True)
+
+
+def generar_corpus(carpeta, archivos=1000, semilla=1, ffmpeg=None):
+    """
+    Crea (o reutiliza) el corpus en `carpeta`.
+    Args:
+        carpeta (str): destino; se crea si no existe.
+        archivos (int): cantidad de archivos.
+        semilla (int): semilla del generador.
+        ffmpeg (str, opcional): ejecutable para los videos; sin él el corpus
+            solo tiene imágenes.
+    Returns:
+        dict: manifiesto {version, semilla, archivos: [{path, tipo, regla,
+        resolucion}], ...}; también se guarda en carpeta/manifiesto.json.
+    """
+    if ffmpeg is None:
+        from media_utils import buscar_ejecutable
+        ffmpeg = buscar_ejecutable("ffmpeg")
+        if not os.path.exists(ffmpeg):
+            ffmpeg = None
+    parametros = {"version": VERSION_CORPUS, "semilla": semilla, "cantidad": archivos,
+                  "videos": ffmpeg is not None}
+    manifiesto_path = os.path.join(carpeta, "manifiesto.json")
+    if os.path.exists(manifiesto_path):
+        with open(manifiesto_path, encoding="utf-8") as f:
+            manifiesto = json.load(f)
+        if all(manifiesto.get(k) == v for k, v in parametros.items()) and all(
+                os.path.exists(os.path.join(carpeta, a["path"])) for a in manifiesto["archivos"]):
+            manifiesto["carpeta"] = carpeta
+            return manifiesto
+    if os.path.isdir(os.path.join(carpeta, "medios")):
+        shutil.rmtree(os.path.join(carpeta, "medios"))
+    medios = os.path.join(carpeta, "medios")
+    plantillas = os.path.join(carpeta, "plantillas")
+    os.makedirs(medios, exist_ok=True)
+    os.makedirs(plantillas, exist_ok=True)
+
+    rng = random.Random(semilla)
+    tipos = [t for t in TIPOS if ffmpeg or t[0] not in ("mp4", "mov")]
+    reglas = reglas_cubiertas()
+    creadas = {}
+
+    def plantilla(tipo, resolucion):
+        # Una plantilla por tipo y resolución; los archivos son copias
+        clave = (tipo, resolucion)
+        if clave not in creadas:
+            ext = {"png": ".png", "mp4": ".mp4", "mov": ".mov"}.get(tipo, ".jpg")
+            path = os.path.join(plantillas, f"{tipo}_{resolucion[0]}x{resolucion[1]}{ext}")
+            if tipo in ("mp4", "mov"):
+                _plantilla_video(path, ffmpeg)
+            else:
+                _plantilla_imagen(path, resolucion, "PNG" if tipo == "png" else "JPEG",
+                                  tipo == "jpg_exif", semilla + len(creadas))
+            creadas[clave] = path
+        return creadas[clave]
+
+    lista = []
+    for i in range(archivos):
+        # Las reglas se recorren en orden para cubrirlas todas aun con pocos archivos
+        regla = reglas[i % len(reglas)]
+        tipo = rng.choices([t for t, _ in tipos], [p for _, p in tipos])[0]
+        if tipo in ("mp4", "mov"):
+            resolucion = (320, 240)
+        else:
+            # Los PNG grandes pesan decenas de MB: solo en las resoluciones chicas
+            opciones = RESOLUCIONES[:-1] if tipo == "png" else RESOLUCIONES
+            ancho, alto, _ = rng.choices(opciones, [p for *_, p in opciones])[0]
+            resolucion = (ancho, alto)
+        ext = os.path.splitext(plantilla(tipo, resolucion))[1]
+        nombre = _prefijo(i) + _nombre(regla, rng) + ext
+        shutil.copyfile(plantilla(tipo, resolucion), os.path.join(medios, nombre))
+        lista.append({"path": os.path.join("medios", nombre), "tipo": tipo, "regla": regla,
+                      "resolucion": list(resolucion)})
+
+    manifiesto = dict(parametros, ffmpeg=ffmpeg, archivos=lista,
+                      bytes=sum(os.path.getsize(os.path.join(carpeta, a["path"])) for a in lista))
+    with open(manifiesto_path, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=1)
+    manifiesto["carpeta"] = carpeta
+    return manifiesto
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("carpeta")
+    parser.add_argument("--archivos", type=int, default=1000)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--ffmpeg", default=None)
+    args = parser.parse_args()
+    manifiesto = generar_corpus(args.carpeta, args.archivos, args.semilla, args.ffmpeg)
+    por_tipo = {}
+    por_regla = {}
+    for archivo in manifiesto["archivos"]:
+        por_tipo[archivo["tipo"]] = por_tipo.get(archivo["tipo"], 0) + 1
+        por_regla[archivo["regla"]] = por_regla.get(archivo["regla"], 0) + 1
+    print(json.dumps({"carpeta": args.carpeta, "archivos": len(manifiesto["archivos"]),
+                      "bytes": manifiesto["bytes"], "por_tipo": por_tipo,
+                      "por_regla": por_regla}, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# Verifica qué pasa cuando exiftool falla en medio de una escritura agrupada
+# (MotorMedios._iter_escrituras_agrupadas con media_utils.cambiar_metadata_lote):
+# se apunta exiftool a una ruta que no existe y se procesa una carpeta con
+# JPEG (que se parchean sin exiftool) y PNG (que dependen de él).
+#  - Los JPEG salen como aplicados, tienen la fecha nueva en disco y el
+#    diario los anota como hechos con sus fechas originales (revertibles).
+#  - Los PNG salen como fallidos y el diario los anota como error.
+# Uso: python benchmarks/verificar_fallo_exiftool.py
+import os
+import sys
+import json
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+FECHA, HORA = "2023:12:24", "21:30:00"
+
+
+def main():
+    with tempfile.TemporaryDirectory() as carpeta:
+        # Diario e índice en la carpeta temporal, no en los del usuario
+        os.environ["XDG_DATA_HOME"] = os.path.join(carpeta, "datos")
+        os.environ["XDG_CACHE_HOME"] = os.path.join(carpeta, "cache")
+        from PIL import Image
+        from bench_jpeg_fechas import crear_jpeg, FECHA_ORIGINAL
+        from jpeg_exif import fechas_exif
+        from journal import leer_diario
+        from media_engine import MotorMedios
+
+        medios = os.path.join(carpeta, "medios")
+        os.makedirs(medios)
+        jpegs = [os.path.join(medios, f"foto_{i}.jpg") for i in range(3)]
+        for path in jpegs:
+            crear_jpeg(path, '<', (64, 48))
+        pngs = [os.path.join(medios, f"imagen_{i}.png") for i in range(2)]
+        for path in pngs:
+            Image.new("RGB", (16, 16)).save(path)
+
+        motor = MotorMedios(exiftool_path=os.path.join(carpeta, "no_existe", "exiftool"),
+                            usar_indice=False)
+        errores = []
+        diario = motor._crear_diario("auto", {"path": medios})
+        try:
+            resultados = {res["path"]: res for res in motor._iter_carpeta_auto(
+                motor.escanear([medios], "imagen"), "manual", FECHA, HORA, diario=diario)}
+            diario.terminar()
+        finally:
+            motor.cerrar()
+        estado = leer_diario(diario.id)
+
+        for path in jpegs:
+            res = resultados.get(path, {})
+            if not res.get("success"):
+                errores.append(f"JPEG informado como fallido: {res}")
+            with open(path, 'rb') as f:
+                if fechas_exif(f.read()).get("DateTimeOriginal") != f"{FECHA} {HORA}":
+                    errores.append(f"JPEG sin la fecha nueva en disco: {path}")
+            if estado.hechos.get(path) != f"{FECHA} {HORA}":
+                errores.append(f"JPEG no anotado como hecho en el diario: {path}")
+            originales = estado.originales.get(path) or {}
+            if originales.get("DateTimeOriginal") != FECHA_ORIGINAL:
+                errores.append(f"JPEG sin fechas originales en el diario: {originales}")
+        for path in pngs:
+            res = resultados.get(path, {})
+            if res.get("success") or "Exiftool falló" not in res.get("msg", ""):
+                errores.append(f"PNG no informado como fallido por exiftool: {res}")
+            if path in estado.hechos:
+                errores.append(f"PNG anotado como hecho en el diario: {path}")
+            if path not in estado.fallidos:
+                errores.append(f"PNG sin error en el diario: {path}")
+        print(json.dumps({
+            "jpeg": len(jpegs), "png": len(pngs),
+            "resultados": {os.path.basename(path): res.get("msg")
+                           for path, res in sorted(resultados.items())},
+            "errores": errores,
+        }, indent=2, ensure_ascii=False))
+        if errores:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
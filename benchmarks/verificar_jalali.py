@@ -0,0 +1,72 @@
+# Compara la tabla de jalali.py con persiantools para cada día de 1300-1500,
+# en ambos sentidos, más los días inválidos, y mide la velocidad.
+# Uso: python benchmarks/verificar_jalali.py   (requiere `pip install persiantools`)
+import os
+import sys
+import json
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jalali  # noqa: E402
+from persiantools.jdatetime import JalaliDate  # noqa: E402
+
+
+def main():
+    distintos = []
+    dias = 0
+    cadenas = []
+    actual = JalaliDate(jalali.ANIO_MIN, 1, 1)
+    while actual.year <= jalali.ANIO_MAX:
+        gregoriano = actual.to_gregorian()
+        if jalali.jalali_a_gregoriano(actual.year, actual.month, actual.day) != gregoriano:
+            distintos.append(("a_gregoriano", str(actual)))
+        if jalali.gregoriano_a_jalali(gregoriano) != (actual.year, actual.month, actual.day):
+            distintos.append(("a_jalali", str(gregoriano)))
+        cadenas.append(f"{actual.year:04d}{actual.month:02d}{actual.day:02d}")
+        dias += 1
+        actual += timedelta(days=1)
+
+    # Fechas que no existen: persiantools lanza error, la tabla devuelve None
+    invalidas = 0
+    for anio in range(jalali.ANIO_MIN, jalali.ANIO_MAX + 1):
+        for mes in range(1, 13):
+            for dia in (0, 30, 31, 32):
+                try:
+                    JalaliDate(anio, mes, dia)
+                    existe = True
+                except (ValueError, TypeError):
+                    existe = False
+                if not existe:
+                    invalidas += 1
+                    if jalali.jalali_a_gregoriano(anio, mes, dia) is not None:
+                        distintos.append(("invalida", f"{anio}-{mes}-{dia}"))
+
+    inicio = time.perf_counter()
+    for c in cadenas:
+        JalaliDate(int(c[:4]), int(c[4:6]), int(c[6:8])).to_gregorian().strftime("%Y:%m:%d")
+    t_persiantools = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    lote = jalali.convertir_lote(cadenas)
+    t_tabla = time.perf_counter() - inicio
+
+    if lote[0] != "1921:03:21":
+        distintos.append(("lote", lote[0]))
+
+    print(json.dumps({
+        "dias": dias,
+        "invalidas": invalidas,
+        "distintos": len(distintos),
+        "ejemplos_distintos": distintos[:5],
+        "persiantools_s": round(t_persiantools, 3),
+        "tabla_s": round(t_tabla, 3),
+        "aceleracion": round(t_persiantools / max(t_tabla, 1e-9), 1),
+    }, indent=2, ensure_ascii=False))
+    if distintos:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+import os
+import re
+import time
+import queue
+import atexit
+import threading
+import itertools
+import subprocess
+
+from media_utils import get_creationflags
+from metricas import agregar, cpu_proceso
+
+
+class ExiftoolCaido(RuntimeError):
+    """El proceso exiftool terminó (o dejó de responder) en medio de un comando."""
+
+
+class _ExiftoolWorker:
+    """
+    Un proceso `exiftool -stay_open True -@ -` de larga vida.
+    Cada comando se escribe por stdin terminado en `-execute<N>`; la respuesta
+    termina con `{ready<N>}` en stdout y con `<status>=post<N>` en stderr
+    (gracias a `-echo4`), así se empareja cada respuesta con su petición.
+    """
+
+    def __init__(self, exiftool_path):
+        self.exiftool_path = exiftool_path
+        self._secuencia = itertools.count(1)
+        self.proc = subprocess.Popen(
+            [exiftool_path, "-stay_open", "True", "-@", "-",
+             "-common_args", "-charset", "filename=utf8"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            creationflags=get_creationflags())
+        # Hilos lectores: evitan bloqueos si un pipe se llena y permiten timeouts
+        self._stdout = queue.Queue()
+        self._stderr = queue.Queue()
+        for pipe, cola in ((self.proc.stdout, self._stdout), (self.proc.stderr, self._stderr)):
+            threading.Thread(target=self._leer_pipe, args=(pipe, cola), daemon=True).start()
+
+    @staticmethod
+    def _leer_pipe(pipe, cola):
+        try:
+            for linea in iter(pipe.readline, b''):
+                cola.put(linea.decode('utf-8', errors='replace'))
+        except (OSError, ValueError):
+            pass
+        finally:
+            cola.put(None)
+
+    def vivo(self):
+        return self.proc.poll() is None
+
+    def _leer_hasta(self, cola, es_fin, timeout):
+        lineas = []
+        while True:
+            try:
+                linea = cola.get(timeout=timeout)
+            except queue.Empty:
+                raise ExiftoolCaido("Exiftool no respondió a tiempo")
+            if linea is None:
+                raise ExiftoolCaido("Exiftool terminó inesperadamente")
+            fin = es_fin(linea.rstrip('\r\n'))
+            if fin is not None:
+                return lineas, fin
+            lineas.append(linea)
+
+    def ejecutar(self, args, timeout=None):
+        for arg in args:
+            if '\n' in arg or '\r' in arg:
+                raise ValueError(f"Argumento inválido para exiftool: {arg!r}")
+        numero = next(self._secuencia)
+        cpu_antes = cpu_proceso(self.proc)
+        comando = list(args) + ["-echo4", "${status}=post%d" % numero, "-execute%d" % numero]
+        try:
+            self.proc.stdin.write(("\n".join(comando) + "\n").encode('utf-8'))
+            self.proc.stdin.flush()
+        except (OSError, ValueError):
+            raise ExiftoolCaido("No se pudo enviar el comando a exiftool")
+        listo = "{ready%d}" % numero
+        salida, _ = self._leer_hasta(
+            self._stdout, lambda l: True if l == listo else None, timeout)
+        patron = re.compile(r'^(\d*)=post%d$' % numero)
+
+        def fin_stderr(linea):
+            m = patron.match(linea)
+            return m.group(1) if m else None
+        errores, status = self._leer_hasta(self._stderr, fin_stderr, timeout)
+        stderr = "".join(errores)
+        if status:
+            returncode = int(status)
+        else:
+            # Versiones antiguas de exiftool no expanden ${status}
+            returncode = 1 if "Error" in stderr else 0
+        resultado = subprocess.CompletedProcess(
+            [self.exiftool_path] + list(args), returncode, "".join(salida), stderr)
+        # CPU que gastó el proceso en este comando (None si no se puede medir)
+        cpu_despues = cpu_proceso(self.proc) if cpu_antes is not None else None
+        resultado.cpu_s = cpu_despues - cpu_antes if cpu_despues is not None else None
+        return resultado
+
+    def cerrar(self, timeout=5):
+        try:
+            self.proc.stdin.write(b"-stay_open\nFalse\n")
+            self.proc.stdin.flush()
+            self.proc.stdin.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            self.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+class ExiftoolPool:
+    """
+    Pool de procesos exiftool persistentes. Los workers se crean bajo demanda
+    hasta `tamano`; si uno se cae se reinicia y el comando se reintenta.
+    """
+
+    def __init__(self, exiftool_path, tamano=None, timeout=120, reintentos_caida=1):
+        if tamano is None:
+            tamano = int(os.environ.get("EXIFTOOL_WORKERS", 0)) or min(4, os.cpu_count() or 1)
+        self.exiftool_path = exiftool_path
+        self.tamano = max(1, tamano)
+        self.timeout = timeout
+        self.reintentos_caida = reintentos_caida
+        self.reinicios = 0
+        self._libres = queue.LifoQueue()
+        self._creados = 0
+        self._workers = []
+        self._lock = threading.Lock()
+        self._cerrado = False
+
+    def _tomar_worker(self):
+        with self._lock:
+            if self._cerrado:
+                raise RuntimeError("El pool de exiftool está cerrado")
+            if self._libres.empty() and self._creados < self.tamano:
+                self._creados += 1
+                crear = True
+            else:
+                crear = False
+        if not crear:
+            return self._libres.get()
+        try:
+            worker = _ExiftoolWorker(self.exiftool_path)
+        except Exception:
+            with self._lock:
+                self._creados -= 1
+            raise
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _reemplazar(self, worker):
+        worker.cerrar(timeout=1)
+        nuevo = _ExiftoolWorker(self.exiftool_path)
+        with self._lock:
+            self.reinicios += 1
+            if worker in self._workers:
+                self._workers.remove(worker)
+            self._workers.append(nuevo)
+        return nuevo
+
+    def ejecutar(self, args, timeout=None):
+        """
+        Ejecuta un comando exiftool (sin el ejecutable) en un worker libre.
+        Returns:
+            subprocess.CompletedProcess: con returncode, stdout y stderr.
+        """
+        inicio = time.perf_counter()
+        worker = self._tomar_worker()
+        # Tiempo esperando un worker libre: indica si el pool queda chico
+        agregar("exiftool_espera", time.perf_counter() - inicio)
+        try:
+            for intento in range(self.reintentos_caida + 1):
+                if not worker.vivo():
+                    worker = self._reemplazar(worker)
+                try:
+                    return worker.ejecutar(args, timeout or self.timeout)
+                except ExiftoolCaido:
+                    worker = self._reemplazar(worker)
+                    if intento >= self.reintentos_caida:
+                        raise
+        finally:
+            self._devolver(worker)
+
+    def _devolver(self, worker):
+        # Si el pool se achicó mientras estaba ocupado, el worker se cierra
+        with self._lock:
+            sobra = self._creados > self.tamano and not self._cerrado
+            if sobra:
+                self._creados -= 1
+                if worker in self._workers:
+                    self._workers.remove(worker)
+        if sobra:
+            worker.cerrar()
+        else:
+            self._libres.put(worker)
+
+    def redimensionar(self, tamano):
+        """
+        Cambia la cantidad máxima de workers. Si baja, los que sobran se
+        cierran: los libres ahora y los ocupados al terminar su comando.
+        """
+        with self._lock:
+            self.tamano = max(1, tamano)
+        while True:
+            with self._lock:
+                if self._creados <= self.tamano:
+                    return
+                try:
+                    worker = self._libres.get_nowait()
+                except queue.Empty:
+                    return
+                self._creados -= 1
+                if worker in self._workers:
+                    self._workers.remove(worker)
+            worker.cerrar()
+
+    def cerrar(self):
+        with self._lock:
+            self._cerrado = True
+            workers = list(self._workers)
+            self._workers = []
+        for worker in workers:
+            worker.cerrar()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def iniciar_pool(exiftool_path, tamano=None):
+    """Activa (o reutiliza) el pool global que usan las funciones de media_utils."""
+    global _pool
+    with _pool_lock:
+        actual = _pool
+        if actual is None or actual.exiftool_path != exiftool_path:
+            anterior, _pool = _pool, ExiftoolPool(exiftool_path, tamano)
+            actual = None
+    if actual is not None:
+        if tamano:
+            actual.redimensionar(tamano)
+        return actual
+    if anterior is not None:
+        anterior.cerrar()
+    return _pool
+
+
+def pool_activo(exiftool_path):
+    """Devuelve el pool global si está activo para ese ejecutable, si no None."""
+    pool = _pool
+    if pool is not None and pool.exiftool_path == exiftool_path:
+        return pool
+    return None
+
+
+def cerrar_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.cerrar()
+
+
+atexit.register(cerrar_pool)
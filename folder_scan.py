@@ -0,0 +1,178 @@
+import os
+import re
+import fnmatch
+
+# Única tabla de extensiones soportadas: extensión -> tipo de archivo
+EXTENSIONES_MEDIA = {
+    ".jpg": "imagen",
+    ".jpeg": "imagen",
+    ".png": "imagen",
+    ".bmp": "imagen",
+    ".gif": "imagen",
+    ".mp4": "video",
+    ".mov": "video",
+    ".avi": "video",
+}
+
+EXTENSIONES_IMAGEN = tuple(e for e, t in EXTENSIONES_MEDIA.items() if t == "imagen")
+EXTENSIONES_VIDEO = tuple(e for e, t in EXTENSIONES_MEDIA.items() if t == "video")
+
+# Formatos que acepta procesar_batch (archivos elegidos en la interfaz): BMP
+# y GIF no se escriben por ese camino, y se aceptan videos que no se buscan
+# en carpetas (sus fechas las escribe exiftool y el frame lo saca ffmpeg)
+EXTENSIONES_BATCH = {
+    ".jpg": "imagen",
+    ".jpeg": "imagen",
+    ".png": "imagen",
+    ".mp4": "video",
+    ".mov": "video",
+    ".avi": "video",
+    ".mkv": "video",
+    ".wmv": "video",
+    ".flv": "video",
+    ".webm": "video",
+}
+
+# Política para enlaces simbólicos
+SYMLINKS_IGNORAR = "ignorar"    # no se siguen ni archivos ni carpetas enlazadas
+SYMLINKS_ARCHIVOS = "archivos"  # se aceptan archivos enlazados, no se entra a carpetas
+SYMLINKS_SEGUIR = "seguir"      # se sigue todo (con detección de ciclos)
+
+
+def tipo_por_extension(path):
+    """Devuelve 'imagen', 'video' o None según la extensión del archivo."""
+    return EXTENSIONES_MEDIA.get(os.path.splitext(path)[1].lower())
+
+
+def _compilar_globs(patrones):
+    if not patrones:
+        return None
+    if isinstance(patrones, str):
+        patrones = [patrones]
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patrones),
+                      re.IGNORECASE)
+
+
+class FiltroArchivos:
+    """
+    Decide qué archivos entran según tipo y globs de incluir/excluir, con
+    las mismas reglas que escanear_carpeta (las usa también folder_watch).
+    """
+
+    def __init__(self, tipos=None, incluir=None, excluir=None):
+        self.tipos = set(tipos) if tipos else None
+        self._incluir = _compilar_globs(incluir)
+        self._excluir = _compilar_globs(excluir)
+
+    def excluido(self, nombre, relativo):
+        """True si el archivo o carpeta coincide con algún glob de excluir."""
+        return self._excluir is not None and bool(
+            self._excluir.match(nombre) or self._excluir.match(relativo))
+
+    def tipo(self, nombre, relativo):
+        """Tipo del archivo ('imagen'/'video') si pasa el filtro, si no None."""
+        tipo = EXTENSIONES_MEDIA.get(os.path.splitext(nombre)[1].lower())
+        if tipo is None or (self.tipos is not None and tipo not in self.tipos):
+            return None
+        if self._incluir is not None and not (
+                self._incluir.match(nombre) or self._incluir.match(relativo)):
+            return None
+        if self.excluido(nombre, relativo):
+            return None
+        return tipo
+
+
+class ArchivoEncontrado:
+    """
+    Un archivo de medios encontrado por el escáner. Guarda el DirEntry para
+    reutilizar la información de stat que ya trae (en Windows viene gratis
+    con el listado de la carpeta).
+    """
+    __slots__ = ("path", "tipo", "relativo", "_entrada")
+
+    def __init__(self, path, tipo, relativo, entrada):
+        self.path = path
+        self.tipo = tipo
+        self.relativo = relativo
+        self._entrada = entrada
+
+    def stat(self):
+        return self._entrada.stat()
+
+
+def escanear_carpeta(carpeta, tipos=None, recursivo=False, incluir=None, excluir=None,
+                     symlinks=SYMLINKS_ARCHIVOS, ordenar=True, en_error=None):
+    """
+    Recorre una carpeta con os.scandir y entrega los archivos de medios a
+    medida que los encuentra (generador), sin armar la lista completa antes.
+    Args:
+        carpeta (str): carpeta raíz.
+        tipos (iterable, opcional): tipos a incluir ('imagen', 'video');
+            por defecto todos.
+        recursivo (bool): si también recorre las subcarpetas.
+        incluir (str | list, opcional): globs; solo se entregan los archivos
+            cuyo nombre o ruta relativa coincide con alguno.
+        excluir (str | list, opcional): globs de archivos o carpetas a saltar
+            (una carpeta excluida no se recorre).
+        symlinks (str): SYMLINKS_IGNORAR, SYMLINKS_ARCHIVOS o SYMLINKS_SEGUIR.
+        ordenar (bool): ordena por nombre dentro de cada carpeta; los
+            archivos de una carpeta salen antes que los de sus subcarpetas.
+        en_error (callable, opcional): en_error(path, excepcion) para
+            carpetas que no se pueden leer; por defecto se informa y se siguen.
+    Yields:
+        ArchivoEncontrado
+    """
+    if symlinks not in (SYMLINKS_IGNORAR, SYMLINKS_ARCHIVOS, SYMLINKS_SEGUIR):
+        raise ValueError(f"Política de symlinks no válida: {symlinks}")
+    filtro = FiltroArchivos(tipos, incluir, excluir)
+    visitadas = set()
+    if symlinks == SYMLINKS_SEGUIR:
+        st = os.stat(carpeta)
+        visitadas.add((st.st_dev, st.st_ino))
+
+    # Pila de (ruta, ruta relativa); se procesa en profundidad
+    pila = [(carpeta, "")]
+    while pila:
+        actual, relativo_actual = pila.pop()
+        try:
+            with os.scandir(actual) as it:
+                entradas = list(it)
+        except OSError as e:
+            if en_error is not None:
+                en_error(actual, e)
+            else:
+                print(f"No se pudo leer la carpeta {actual}: {e}")
+            continue
+        if ordenar:
+            entradas.sort(key=lambda e: e.name)
+        subcarpetas = []
+        for entrada in entradas:
+            nombre = entrada.name
+            relativo = f"{relativo_actual}/{nombre}" if relativo_actual else nombre
+            try:
+                es_enlace = entrada.is_symlink()
+                if es_enlace and symlinks == SYMLINKS_IGNORAR:
+                    continue
+                if entrada.is_dir():
+                    if not recursivo or filtro.excluido(nombre, relativo):
+                        continue
+                    if es_enlace and symlinks != SYMLINKS_SEGUIR:
+                        continue
+                    if symlinks == SYMLINKS_SEGUIR:
+                        st = entrada.stat()
+                        clave = (st.st_dev, st.st_ino)
+                        if clave in visitadas:
+                            continue
+                        visitadas.add(clave)
+                    subcarpetas.append((entrada.path, relativo))
+                    continue
+                if not entrada.is_file():
+                    continue
+            except OSError:
+                continue
+            tipo = filtro.tipo(nombre, relativo)
+            if tipo is None:
+                continue
+            yield ArchivoEncontrado(entrada.path, tipo, relativo, entrada)
+        # Al revés para que la pila saque primero la primera subcarpeta
+        pila.extend(reversed(subcarpetas))
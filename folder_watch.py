@@ -0,0 +1,338 @@
+# Vigilancia de carpetas: detecta archivos de medios nuevos o modificados y
+# los entrega cuando terminaron de escribirse (sin cambios durante el tiempo
+# de asentamiento). En Linux usa inotify (vía ctypes, sin dependencias); en
+# el resto de los sistemas, o si inotify no está disponible, revisa la
+# carpeta cada `intervalo_sondeo` segundos.
+# La memoria está acotada: hay un máximo de pendientes (si se llena, lo que
+# falta se recupera con un re-escaneo por fecha de cambio) y el registro de
+# archivos ya procesados descarta los más viejos.
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from collections import OrderedDict
+
+from folder_scan import FiltroArchivos, escanear_carpeta
+
+# Eventos de inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_MASCARA = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+            IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENTO = struct.Struct('iIII')
+
+# Margen al comparar fechas de cambio entre re-escaneos (resolución de FAT/exFAT)
+_MARGEN_NS = 2 * 10 ** 9
+
+
+class _Inotify:
+    """Descriptor de inotify con un watch por carpeta."""
+
+    def __init__(self):
+        nombre = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(nombre, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falló")
+        self.carpetas = {}   # wd -> carpeta
+
+    def agregar(self, carpeta):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(carpeta), _MASCARA)
+        if wd < 0:
+            numero = ctypes.get_errno()
+            raise OSError(numero, os.strerror(numero), carpeta)
+        self.carpetas[wd] = carpeta
+
+    def leer(self, timeout):
+        """
+        Espera eventos hasta `timeout` segundos.
+        Returns:
+            list: [(carpeta o None, nombre, máscara)]
+        """
+        listos, _, _ = select.select([self.fd], [], [], timeout)
+        if not listos:
+            return []
+        try:
+            datos = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        eventos = []
+        pos = 0
+        while pos + _EVENTO.size <= len(datos):
+            wd, mascara, _, largo = _EVENTO.unpack_from(datos, pos)
+            nombre = datos[pos + _EVENTO.size:pos + _EVENTO.size + largo].rstrip(b'\x00')
+            pos += _EVENTO.size + largo
+            carpeta = self.carpetas.get(wd)
+            if mascara & IN_IGNORED:
+                self.carpetas.pop(wd, None)
+            eventos.append((carpeta, os.fsdecode(nombre), mascara))
+        return eventos
+
+    def cerrar(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class ObservadorCarpeta:
+    """
+    Entrega, por tandas, los archivos de medios de una carpeta que aparecen o
+    cambian después de empezar a vigilarla, una vez que dejaron de crecer.
+    Uso típico: llamar `esperar_listos` en un bucle, procesar lo que devuelve
+    y registrar cada archivo con `marcar_procesado`; los cambios que hace el
+    propio proceso (fechas escritas) no se vuelven a entregar.
+    """
+
+    def __init__(self, carpeta, tipos=None, recursivo=False, incluir=None, excluir=None,
+                 asentamiento=2.0, intervalo_sondeo=2.0, sondeo=None, procesar_existentes=False,
+                 max_pendientes=10000, max_procesados=50000):
+        """
+        Args:
+            carpeta (str): carpeta a vigilar.
+            tipos, recursivo, incluir, excluir: filtros como en escanear_carpeta.
+            asentamiento (float): segundos sin cambios para dar un archivo por terminado.
+            intervalo_sondeo (float): cada cuánto se revisa la carpeta sin inotify.
+            sondeo (bool, opcional): True fuerza el sondeo; None usa inotify si hay.
+            procesar_existentes (bool): entregar también los archivos que ya estaban.
+            max_pendientes (int): archivos en espera de asentarse como máximo.
+            max_procesados (int): archivos procesados que se recuerdan como máximo.
+        """
+        self.carpeta = os.path.abspath(carpeta)
+        self.recursivo = recursivo
+        self.asentamiento = asentamiento
+        self.intervalo_sondeo = intervalo_sondeo
+        self.max_pendientes = max_pendientes
+        self.max_procesados = max_procesados
+        self._filtro = FiltroArchivos(tipos, incluir, excluir)
+        self._tipos, self._incluir, self._excluir = tipos, incluir, excluir
+        self._pendientes = {}                 # path -> [vence, firma]
+        self._en_proceso = set()
+        self._procesados = OrderedDict()      # path -> firma tras procesarlo
+        # Re-escaneo: archivos con fecha de cambio posterior a `_desde_ns`
+        self._desde_ns = self._inicio_ns = 0 if procesar_existentes else time.time_ns()
+        self._reescanear = procesar_existentes
+        # Un re-escaneo que se corta por falta de lugar sigue después desde
+        # el mismo punto del recorrido (pasada en curso)
+        self._pasada_inicio_ns = None
+        self._pasada_vistos = 0
+        self._proximo_sondeo = 0.0
+        self._inotify = None
+        if not sondeo and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+                for carpeta_vigilada in self._carpetas(self.carpeta):
+                    self._inotify.agregar(carpeta_vigilada)
+            except (OSError, AttributeError) as e:
+                # Sin inotify o sin watches libres (fs.inotify.max_user_watches)
+                print("inotify no disponible, se usa sondeo:", e)
+                if self._inotify is not None:
+                    self._inotify.cerrar()
+                self._inotify = None
+
+    @property
+    def metodo(self):
+        return "inotify" if self._inotify is not None else "sondeo"
+
+    def _carpetas(self, raiz):
+        # La carpeta y, si es recursivo, sus subcarpetas no excluidas
+        yield raiz
+        if not self.recursivo:
+            return
+        for actual, subcarpetas, _ in os.walk(raiz):
+            relativo_actual = os.path.relpath(actual, self.carpeta).replace(os.sep, "/")
+            conservar = []
+            for nombre in sorted(subcarpetas):
+                relativo = nombre if relativo_actual == "." else f"{relativo_actual}/{nombre}"
+                if not self._filtro.excluido(nombre, relativo):
+                    conservar.append(nombre)
+                    yield os.path.join(actual, nombre)
+            subcarpetas[:] = conservar
+
+    @staticmethod
+    def _firma(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _relativo(self, path):
+        return os.path.relpath(path, self.carpeta).replace(os.sep, "/")
+
+    def _anotar(self, path, firma=None):
+        # Un archivo cambió: (re)empieza su tiempo de asentamiento
+        if path in self._en_proceso:
+            return
+        pendiente = self._pendientes.get(path)
+        if pendiente is not None and firma is None:
+            # Mientras se copia llegan muchos eventos: solo se corre el plazo
+            # (el tamaño se compara al vencer)
+            pendiente[0] = time.monotonic() + self.asentamiento
+            return
+        if firma is None:
+            firma = self._firma(path)
+        if firma is None:
+            self._pendientes.pop(path, None)
+            return
+        if self._procesados.get(path) == firma:
+            # Es el resultado de nuestra propia escritura
+            return
+        if pendiente is None and len(self._pendientes) >= self.max_pendientes:
+            # Memoria acotada: lo que no entra se recupera re-escaneando después
+            self._reescanear = True
+            return
+        self._pendientes[path] = [time.monotonic() + self.asentamiento, firma]
+
+    def _procesar_eventos(self, eventos):
+        for carpeta, nombre, mascara in eventos:
+            if mascara & IN_Q_OVERFLOW:
+                # Se perdieron eventos en el kernel
+                self._reescanear = True
+                continue
+            if carpeta is None or not nombre:
+                continue
+            path = os.path.join(carpeta, nombre)
+            if mascara & IN_ISDIR:
+                if self.recursivo and mascara & (IN_CREATE | IN_MOVED_TO):
+                    relativo = self._relativo(path)
+                    if self._filtro.excluido(nombre, relativo):
+                        continue
+                    try:
+                        for nueva in self._carpetas(path):
+                            self._inotify.agregar(nueva)
+                    except OSError as e:
+                        print(f"No se puede vigilar {path}: {e}")
+                    # Lo que se copió antes de tener el watch aparece re-escaneando
+                    self._reescanear = True
+                continue
+            if self._filtro.tipo(nombre, self._relativo(path)) is None:
+                continue
+            if mascara & (IN_DELETE | IN_MOVED_FROM):
+                self._pendientes.pop(path, None)
+                self._procesados.pop(path, None)
+            else:
+                self._anotar(path)
+
+    def _escanear(self):
+        # Busca archivos cambiados desde el último escaneo completo (por
+        # st_ctime, que cambia también al copiar o mover; en Windows es la
+        # fecha de creación, por eso se mira también st_mtime)
+        if self._pasada_inicio_ns is None:
+            self._pasada_inicio_ns = time.time_ns()
+            self._pasada_vistos = 0
+        self._reescanear = False
+        for i, encontrado in enumerate(escanear_carpeta(
+                self.carpeta, self._tipos, self.recursivo, self._incluir, self._excluir,
+                en_error=lambda path, e: None)):
+            if i < self._pasada_vistos:
+                continue
+            if len(self._pendientes) >= self.max_pendientes:
+                self._pasada_vistos = i
+                self._reescanear = True
+                return
+            try:
+                st = encontrado.stat()
+            except OSError:
+                continue
+            if max(st.st_ctime_ns, st.st_mtime_ns) < self._desde_ns:
+                continue
+            if encontrado.path not in self._pendientes:
+                self._anotar(encontrado.path, (st.st_size, st.st_mtime_ns))
+        # Pasada completa: la próxima solo mira lo que cambió desde que empezó
+        self._desde_ns = max(self._inicio_ns, self._pasada_inicio_ns - _MARGEN_NS)
+        self._pasada_inicio_ns = None
+
+    def _listos(self, max_archivos):
+        ahora = time.monotonic()
+        listos = []
+        for path, (vence, firma) in list(self._pendientes.items()):
+            if vence > ahora:
+                continue
+            actual = self._firma(path)
+            if actual is None:
+                del self._pendientes[path]
+            elif actual != firma:
+                # Sigue creciendo: otra espera completa
+                self._pendientes[path] = [ahora + self.asentamiento, actual]
+            else:
+                del self._pendientes[path]
+                self._en_proceso.add(path)
+                listos.append(path)
+                if len(listos) >= max_archivos:
+                    break
+        return listos
+
+    def esperar_listos(self, timeout=1.0, max_archivos=200):
+        """
+        Espera hasta `timeout` segundos a que haya archivos terminados.
+        Returns:
+            list: rutas listas para procesar (como mucho `max_archivos`);
+            vacía si no hubo ninguna a tiempo.
+        """
+        limite = time.monotonic() + timeout
+        while True:
+            ahora = time.monotonic()
+            if self._inotify is None and ahora >= self._proximo_sondeo:
+                self._proximo_sondeo = ahora + self.intervalo_sondeo
+                self._reescanear = True
+            if self._reescanear and len(self._pendientes) <= self.max_pendientes // 2:
+                self._escanear()
+            listos = self._listos(max_archivos)
+            if listos:
+                return listos
+            # Se duerme hasta el próximo vencimiento, sondeo o fin del timeout
+            despertar = limite
+            if self._pendientes:
+                despertar = min(despertar, min(v for v, _ in self._pendientes.values()))
+            if self._inotify is None:
+                despertar = min(despertar, self._proximo_sondeo)
+            espera = max(0.0, despertar - time.monotonic())
+            if self._inotify is not None:
+                try:
+                    self._procesar_eventos(self._inotify.leer(espera))
+                except OSError as e:
+                    if e.errno != errno.EINTR:
+                        raise
+            elif espera:
+                time.sleep(espera)
+            if time.monotonic() >= limite and not self._vencidos():
+                return []
+
+    def _vencidos(self):
+        ahora = time.monotonic()
+        return any(vence <= ahora for vence, _ in self._pendientes.values())
+
+    def marcar_procesado(self, path):
+        """Registra el estado del archivo tras procesarlo: sus propios cambios se ignoran."""
+        self._en_proceso.discard(path)
+        firma = self._firma(path)
+        if firma is None:
+            return
+        self._procesados[path] = firma
+        self._procesados.move_to_end(path)
+        while len(self._procesados) > self.max_procesados:
+            self._procesados.popitem(last=False)
+
+    def estado(self):
+        return {"carpeta": self.carpeta, "metodo": self.metodo,
+                "pendientes": len(self._pendientes), "en_proceso": len(self._en_proceso),
+                "procesados_recordados": len(self._procesados)}
+
+    def cerrar(self):
+        if self._inotify is not None:
+            self._inotify.cerrar()
+            self._inotify = None
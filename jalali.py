@@ -0,0 +1,114 @@
+# Conversión Jalali (calendario persa) <-> gregoriano por tabla, sin dependencias.
+# Cubre los años que acepta la heurística de nombres de archivo (1300-1500);
+# la tabla se construye la primera vez que se usa.
+import bisect
+from datetime import date
+
+ANIO_MIN = 1300
+ANIO_MAX = 1500
+
+# 1 Farvardin 1300 = 21 de marzo de 1921
+_INICIO_1300 = date(1921, 3, 21).toordinal()
+
+# Días transcurridos antes de cada mes (Farvardin..Esfand)
+_DIAS_ANTES_MES = (0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336)
+
+_inicios = None
+
+
+def es_bisiesto(anio):
+    """Regla de 33 años; en 1300-1500 coincide con el calendario oficial iraní."""
+    return (25 * anio + 11) % 33 < 8
+
+
+def _tabla():
+    # Ordinal gregoriano del 1 de Farvardin de cada año, más el de ANIO_MAX + 1
+    global _inicios
+    if _inicios is None:
+        inicios = [_INICIO_1300]
+        for anio in range(ANIO_MIN, ANIO_MAX + 1):
+            inicios.append(inicios[-1] + (366 if es_bisiesto(anio) else 365))
+        _inicios = inicios
+    return _inicios
+
+
+def dias_del_mes(anio, mes):
+    if mes <= 6:
+        return 31
+    if mes <= 11:
+        return 30
+    return 30 if es_bisiesto(anio) else 29
+
+
+def _ordinal(anio, mes, dia):
+    # Ordinal gregoriano de la fecha Jalali, o None si no existe
+    if not (ANIO_MIN <= anio <= ANIO_MAX and 1 <= mes <= 12 and dia >= 1):
+        return None
+    inicios = _tabla()
+    i = anio - ANIO_MIN
+    if mes <= 6:
+        limite = 31
+    elif mes <= 11:
+        limite = 30
+    else:
+        # Esfand tiene 30 días solo en años bisiestos
+        limite = inicios[i + 1] - inicios[i] - 336
+    if dia > limite:
+        return None
+    return inicios[i] + _DIAS_ANTES_MES[mes - 1] + dia - 1
+
+
+def jalali_a_gregoriano(anio, mes, dia):
+    """
+    Convierte una fecha Jalali a gregoriana.
+    Returns:
+        datetime.date | None: None si la fecha no existe o está fuera de rango.
+    """
+    ordinal = _ordinal(anio, mes, dia)
+    if ordinal is None:
+        return None
+    return date.fromordinal(ordinal)
+
+
+def gregoriano_a_jalali(fecha):
+    """
+    Convierte un datetime.date gregoriano a Jalali.
+    Returns:
+        tuple | None: (anio, mes, dia), o None si cae fuera de 1300-1500.
+    """
+    inicios = _tabla()
+    ordinal = fecha.toordinal()
+    if not inicios[0] <= ordinal < inicios[-1]:
+        return None
+    i = bisect.bisect_right(inicios, ordinal) - 1
+    dia_del_anio = ordinal - inicios[i]
+    mes = bisect.bisect_right(_DIAS_ANTES_MES, dia_del_anio)
+    return ANIO_MIN + i, mes, dia_del_anio - _DIAS_ANTES_MES[mes - 1] + 1
+
+
+def cadena_a_exif(date_str):
+    """
+    '14030115' (Jalali, AAAAMMDD) -> '2024:04:03', o None si no es válida.
+    """
+    digitos = date_str[:8]
+    if len(digitos) != 8 or not digitos.isdigit():
+        return None
+    n = int(digitos)
+    ordinal = _ordinal(n // 10000, n // 100 % 100, n % 100)
+    if ordinal is None:
+        return None
+    return date.fromordinal(ordinal).isoformat().replace('-', ':')
+
+
+def convertir_lote(cadenas):
+    """
+    Convierte muchas cadenas Jalali AAAAMMDD de una vez; las repetidas se
+    calculan una sola vez.
+    Returns:
+        list: fechas 'AAAA:MM:DD' (o None) en el mismo orden.
+    """
+    resultados = {}
+    for cadena in cadenas:
+        if cadena not in resultados:
+            resultados[cadena] = cadena_a_exif(cadena)
+    return [resultados[cadena] for cadena in cadenas]
@@ -0,0 +1,124 @@
+import time
+import uuid
+import threading
+
+
+class Trabajo:
+    """
+    Un proceso batch que corre en segundo plano. Los resultados por archivo
+    se van acumulando y la interfaz los recoge con un cursor; lo ya entregado
+    se descarta para no guardar todo el log en memoria.
+    """
+
+    def __init__(self, total=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.total = total
+        self.procesados = 0
+        self.inicio = time.monotonic()
+        self.fin = None
+        self.error = None
+        self.resumen = None
+        self.cancelado = threading.Event()
+        self._resultados = []
+        self._base = 0
+        self._lock = threading.Lock()
+
+    def agregar(self, resultado):
+        with self._lock:
+            self._resultados.append(resultado)
+            self.procesados += 1
+
+    def terminar(self, error=None, resumen=None):
+        with self._lock:
+            self.error = error
+            self.resumen = resumen
+            self.fin = time.monotonic()
+
+    def estado(self, cursor=0):
+        """
+        Devuelve el progreso y los resultados nuevos desde `cursor`.
+        Returns:
+            dict: {id, total, procesados, resultados, cursor, archivos_por_s,
+                   eta_s, terminado, cancelado, error, resumen}
+        """
+        with self._lock:
+            # Lo anterior al cursor ya fue recibido por la interfaz
+            descartar = max(0, min(cursor, self._base + len(self._resultados)) - self._base)
+            if descartar:
+                del self._resultados[:descartar]
+                self._base += descartar
+            nuevos = list(self._resultados)
+            transcurrido = (self.fin or time.monotonic()) - self.inicio
+            velocidad = self.procesados / transcurrido if transcurrido > 0 else 0.0
+            eta = None
+            if self.fin is None and self.total is not None and velocidad > 0:
+                eta = max(0, self.total - self.procesados) / velocidad
+            return {
+                "id": self.id,
+                "total": self.total,
+                "procesados": self.procesados,
+                "resultados": nuevos,
+                "cursor": self._base + len(nuevos),
+                "archivos_por_s": round(velocidad, 2),
+                "eta_s": round(eta, 1) if eta is not None else None,
+                "terminado": self.fin is not None,
+                "cancelado": self.cancelado.is_set(),
+                "error": self.error,
+                "resumen": self.resumen,
+            }
+
+
+class GestorTrabajos:
+    """Lanza trabajos en hilos propios y los localiza por id."""
+
+    def __init__(self, max_terminados=20):
+        self.max_terminados = max_terminados
+        self._trabajos = {}
+        self._lock = threading.Lock()
+
+    def iniciar(self, ejecutar, total=None):
+        """
+        Inicia un trabajo. `ejecutar(trabajo)` corre en un hilo aparte, debe
+        llamar `trabajo.agregar` por cada archivo y revisar
+        `trabajo.cancelado`; puede devolver un texto de resumen.
+        Returns:
+            str: id del trabajo.
+        """
+        trabajo = Trabajo(total)
+
+        def correr():
+            try:
+                resumen = ejecutar(trabajo)
+            except Exception as e:
+                trabajo.terminar(error=str(e))
+            else:
+                trabajo.terminar(resumen=resumen)
+
+        with self._lock:
+            self._trabajos[trabajo.id] = trabajo
+            self._purgar()
+        threading.Thread(target=correr, name=f"trabajo-{trabajo.id}", daemon=True).start()
+        return trabajo.id
+
+    def _purgar(self):
+        terminados = [t for t in self._trabajos.values() if t.fin is not None]
+        terminados.sort(key=lambda t: t.fin)
+        for trabajo in terminados[:max(0, len(terminados) - self.max_terminados)]:
+            del self._trabajos[trabajo.id]
+
+    def obtener(self, trabajo_id):
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def cancelar(self, trabajo_id):
+        trabajo = self.obtener(trabajo_id)
+        if trabajo is None:
+            return False
+        trabajo.cancelado.set()
+        return True
+
+    def cancelar_todos(self):
+        with self._lock:
+            trabajos = list(self._trabajos.values())
+        for trabajo in trabajos:
+            trabajo.cancelado.set()
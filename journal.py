@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import uuid
+import threading
+
+from media_utils import directorio_usuario
+
+
+def directorio_diarios():
+    path = os.path.join(directorio_usuario('datos'), 'diarios')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class DiarioBatch:
+    """
+    Diario de un proceso batch: un archivo JSON Lines de solo agregado con
+    una línea por evento ('inicio', 'plan', 'hecho', 'error', 'omitido',
+    'fin'). Las líneas se acumulan y se bajan a disco con fsync por grupos
+    (cada `cada_n` entradas o `cada_s` segundos), así el costo por archivo
+    es mínimo y tras un corte se pierde como mucho el último grupo. Los
+    'plan' (las fechas para revertir) se bajan con sincronizar() antes de
+    tocar los archivos, ver MotorMedios._con_fechas_actuales.
+    """
+
+    def __init__(self, path, cada_n=200, cada_s=1.0):
+        self.path = path
+        self.id = os.path.splitext(os.path.basename(path))[0]
+        self.cada_n = cada_n
+        self.cada_s = cada_s
+        self._lock = threading.Lock()
+        self._pendientes = []
+        self._ultimo_sync = time.monotonic()
+        self._f = open(path, 'a', encoding='utf-8')
+
+    @classmethod
+    def crear(cls, tipo, parametros, carpeta=None):
+        """
+        Crea un diario nuevo y registra con qué parámetros se lanzó el
+        trabajo (lo necesario para reanudarlo).
+        """
+        carpeta = carpeta or directorio_diarios()
+        diario_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        diario = cls(os.path.join(carpeta, diario_id + '.jsonl'))
+        diario.registrar("inicio", tipo_trabajo=tipo, parametros=parametros, creado=time.time())
+        diario.sincronizar()
+        return diario
+
+    @classmethod
+    def abrir(cls, diario_id, carpeta=None):
+        """Reabre un diario existente para seguir agregando (al reanudar)."""
+        path = os.path.join(carpeta or directorio_diarios(), diario_id + '.jsonl')
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No existe el diario {diario_id}")
+        return cls(path)
+
+    def registrar(self, evento, **datos):
+        datos["e"] = evento
+        linea = json.dumps(datos, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._pendientes.append(linea)
+            if (len(self._pendientes) >= self.cada_n or
+                    time.monotonic() - self._ultimo_sync >= self.cada_s):
+                self._bajar()
+
+    def planificado(self, path, fechas_originales):
+        self.registrar("plan", path=path, original=fechas_originales)
+
+    def hecho(self, path, datetime_exif):
+        self.registrar("hecho", path=path, datetime=datetime_exif)
+
+    def fallido(self, path, error):
+        self.registrar("error", path=path, error=error)
+
+    def omitido(self, path):
+        self.registrar("omitido", path=path)
+
+    def _bajar(self):
+        if self._pendientes:
+            self._f.write("\n".join(self._pendientes) + "\n")
+            self._pendientes = []
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._ultimo_sync = time.monotonic()
+
+    def sincronizar(self):
+        with self._lock:
+            self._bajar()
+
+    def terminar(self, estado="completo"):
+        """Cierra el diario; estado: 'completo', 'cancelado' o 'error'."""
+        self.registrar("fin", estado=estado, terminado=time.time())
+        self.cerrar()
+
+    def cerrar(self):
+        with self._lock:
+            if self._f.closed:
+                return
+            self._bajar()
+            self._f.close()
+
+
+class EstadoDiario:
+    """Resumen de un diario leído de disco."""
+
+    def __init__(self, diario_id):
+        self.id = diario_id
+        self.tipo_trabajo = None
+        self.parametros = None
+        self.creado = None
+        self.fin = None
+        self.originales = {}   # path -> fechas antes del cambio (o None)
+        self.hechos = {}       # path -> datetime aplicado
+        self.fallidos = {}     # path -> error
+        self.omitidos = set()
+
+    @property
+    def reanudable(self):
+        return self.fin != "completo"
+
+    def completados(self):
+        """Archivos que no hay que volver a procesar al reanudar."""
+        return set(self.hechos) | self.omitidos
+
+    def resumen(self):
+        return {
+            "id": self.id,
+            "tipo": self.tipo_trabajo,
+            "creado": self.creado,
+            "estado": self.fin or "interrumpido",
+            "planificados": len(self.originales),
+            "completados": len(self.hechos),
+            "fallidos": len(self.fallidos),
+            "omitidos": len(self.omitidos),
+        }
+
+
+def leer_diario(diario_id, carpeta=None):
+    """
+    Lee un diario. Una última línea cortada (el proceso murió escribiéndola)
+    se ignora.
+    Returns:
+        EstadoDiario
+    """
+    path = os.path.join(carpeta or directorio_diarios(), diario_id + '.jsonl')
+    estado = EstadoDiario(diario_id)
+    with open(path, encoding='utf-8') as f:
+        for linea in f:
+            try:
+                entrada = json.loads(linea)
+            except ValueError:
+                continue
+            evento = entrada.get("e")
+            path_archivo = entrada.get("path")
+            if evento == "inicio":
+                estado.tipo_trabajo = entrada.get("tipo_trabajo")
+                estado.parametros = entrada.get("parametros")
+                estado.creado = entrada.get("creado")
+            elif evento == "plan":
+                # Vale el primer plan: al reanudar se vuelve a planificar y
+                # las fechas leídas entonces pueden ser las que escribió el batch
+                estado.originales.setdefault(path_archivo, entrada.get("original"))
+            elif evento == "hecho":
+                estado.hechos[path_archivo] = entrada.get("datetime")
+                estado.fallidos.pop(path_archivo, None)
+            elif evento == "error":
+                estado.fallidos[path_archivo] = entrada.get("error")
+            elif evento == "omitido":
+                estado.omitidos.add(path_archivo)
+            elif evento == "fin":
+                estado.fin = entrada.get("estado")
+    return estado
+
+
+def listar_diarios(carpeta=None):
+    """Ids de los diarios guardados, del más reciente al más antiguo."""
+    carpeta = carpeta or directorio_diarios()
+    ids = [os.path.splitext(n)[0] for n in os.listdir(carpeta) if n.endswith('.jsonl')]
+    return sorted(ids, reverse=True)
+
+
+def borrar_diario(diario_id, carpeta=None):
+    try:
+        os.remove(os.path.join(carpeta or directorio_diarios(), diario_id + '.jsonl'))
+        return True
+    except OSError:
+        return False
+
+
+def purgar_diarios(max_guardados=20, carpeta=None):
+    """Deja solo los `max_guardados` diarios más recientes."""
+    for diario_id in listar_diarios(carpeta)[max_guardados:]:
+        borrar_diario(diario_id, carpeta)
@@ -0,0 +1,309 @@
+# Lectura mínima de la estructura EXIF (APP1/TIFF) de un JPEG, sin dependencias.
+# Trabaja sobre cualquier buffer indexable (bytes, mmap), así solo se tocan
+# las páginas del encabezado del archivo.
+import struct
+
+# Tipos TIFF -> tamaño en bytes de cada elemento
+TAMANO_TIPO = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+
+TAG_EXIF_IFD = 0x8769
+TAG_JPEG_OFFSET = 0x0201
+TAG_JPEG_LONGITUD = 0x0202
+
+# Fechas EXIF (ASCII 'AAAA:MM:DD HH:MM:SS\0'); nombres como los muestra exiftool
+TAG_FECHA_MODIFICACION = 0x0132    # IFD0 ModifyDate (DateTime)
+TAG_FECHA_ORIGINAL = 0x9003        # ExifIFD DateTimeOriginal
+TAG_FECHA_DIGITALIZACION = 0x9004  # ExifIFD CreateDate (DateTimeDigitized)
+
+
+class EntradaIFD:
+    """Una entrada de un IFD: tag, tipo, cantidad y posición absoluta del valor."""
+    __slots__ = ("tag", "tipo", "cantidad", "pos_valor")
+
+    def __init__(self, tag, tipo, cantidad, pos_valor):
+        self.tag = tag
+        self.tipo = tipo
+        self.cantidad = cantidad
+        self.pos_valor = pos_valor
+
+
+class TiffExif:
+    """
+    Bloque TIFF dentro del segmento APP1 'Exif' de un JPEG.
+    `inicio` y `fin` son posiciones absolutas en el buffer; los offsets
+    internos de TIFF se cuentan desde `inicio`.
+    """
+
+    def __init__(self, datos, inicio, fin):
+        self.datos = datos
+        self.inicio = inicio
+        self.fin = fin
+        orden = bytes(datos[inicio:inicio + 2])
+        if orden == b'II':
+            self.endian = '<'
+        elif orden == b'MM':
+            self.endian = '>'
+        else:
+            raise ValueError("Encabezado TIFF inválido")
+        if self._u16(inicio + 2) != 42:
+            raise ValueError("Encabezado TIFF inválido")
+        self.ifd0 = self._u32(inicio + 4)
+
+    def _u16(self, pos):
+        return struct.unpack(self.endian + 'H', self.datos[pos:pos + 2])[0]
+
+    def _u32(self, pos):
+        return struct.unpack(self.endian + 'I', self.datos[pos:pos + 4])[0]
+
+    def leer_ifd(self, offset):
+        """
+        Lee el IFD que empieza en `offset` (relativo al TIFF).
+        Returns:
+            tuple: ({tag: EntradaIFD}, offset del siguiente IFD o 0)
+        """
+        pos = self.inicio + offset
+        if offset < 8 or pos + 2 > self.fin:
+            raise ValueError("Offset de IFD fuera del bloque EXIF")
+        n = self._u16(pos)
+        if pos + 2 + 12 * n + 4 > self.fin:
+            raise ValueError("IFD truncado")
+        entradas = {}
+        for i in range(n):
+            e = pos + 2 + 12 * i
+            tag = self._u16(e)
+            tipo = self._u16(e + 2)
+            cantidad = self._u32(e + 4)
+            largo = TAMANO_TIPO.get(tipo, 0) * cantidad
+            if largo <= 4:
+                pos_valor = e + 8
+            else:
+                pos_valor = self.inicio + self._u32(e + 8)
+                if pos_valor + largo > self.fin:
+                    continue
+            entradas[tag] = EntradaIFD(tag, tipo, cantidad, pos_valor)
+        siguiente = self._u32(pos + 2 + 12 * n)
+        return entradas, siguiente
+
+    def valor_entero(self, entrada):
+        if entrada.tipo == 3:
+            return self._u16(entrada.pos_valor)
+        if entrada.tipo == 4:
+            return self._u32(entrada.pos_valor)
+        raise ValueError("La entrada no es un entero")
+
+    def valor_ascii(self, entrada):
+        if entrada.tipo != 2:
+            raise ValueError("La entrada no es ASCII")
+        crudo = bytes(self.datos[entrada.pos_valor:entrada.pos_valor + entrada.cantidad])
+        return crudo.split(b'\x00', 1)[0].decode('ascii', errors='replace')
+
+
+def segmentos(datos):
+    """
+    Recorre los marcadores del JPEG hasta el inicio de la imagen (SOS).
+    Yields:
+        tuple: (marcador, inicio, fin) con las posiciones absolutas del
+        contenido de cada segmento (sin marcador ni largo).
+    """
+    if bytes(datos[0:2]) != b'\xff\xd8':
+        return
+    pos = 2
+    total = len(datos)
+    while pos + 4 <= total:
+        if datos[pos] != 0xFF:
+            return
+        marcador = datos[pos + 1]
+        if marcador == 0xFF:
+            # Relleno entre marcadores
+            pos += 1
+            continue
+        if marcador in (0xD8, 0x01) or 0xD0 <= marcador <= 0xD7:
+            pos += 2
+            continue
+        if marcador in (0xDA, 0xD9):
+            return
+        largo = struct.unpack('>H', datos[pos + 2:pos + 4])[0]
+        if largo < 2:
+            return
+        yield marcador, pos + 4, min(pos + 2 + largo, total)
+        pos += 2 + largo
+
+
+def buscar_tiff_exif(datos):
+    """
+    Devuelve el TiffExif del primer APP1 'Exif' del JPEG, o None si no hay.
+    """
+    for marcador, inicio, fin in segmentos(datos):
+        if marcador == 0xE1 and bytes(datos[inicio:inicio + 6]) == b'Exif\x00\x00':
+            try:
+                return TiffExif(datos, inicio + 6, fin)
+            except (ValueError, struct.error):
+                return None
+    return None
+
+
+def miniatura_exif(datos):
+    """
+    Devuelve los bytes de la miniatura JPEG embebida en el IFD1 del EXIF
+    (la que guardan las cámaras y teléfonos), o None si no hay.
+    """
+    tiff = buscar_tiff_exif(datos)
+    if tiff is None:
+        return None
+    try:
+        _, ifd1 = tiff.leer_ifd(tiff.ifd0)
+        if not ifd1:
+            return None
+        entradas, _ = tiff.leer_ifd(ifd1)
+        if TAG_JPEG_OFFSET not in entradas or TAG_JPEG_LONGITUD not in entradas:
+            return None
+        inicio = tiff.inicio + tiff.valor_entero(entradas[TAG_JPEG_OFFSET])
+        largo = tiff.valor_entero(entradas[TAG_JPEG_LONGITUD])
+    except (ValueError, struct.error):
+        return None
+    if largo <= 0 or inicio + largo > tiff.fin:
+        return None
+    miniatura = bytes(datos[inicio:inicio + largo])
+    if not miniatura.startswith(b'\xff\xd8'):
+        return None
+    return miniatura
+
+
+def fechas_exif(datos):
+    """
+    Lee las fechas EXIF de un JPEG.
+    Returns:
+        dict | None: {'ModifyDate', 'DateTimeOriginal', 'CreateDate'} con el
+        texto de cada una (None si falta), o None si no hay bloque EXIF legible.
+    """
+    tiff = buscar_tiff_exif(datos)
+    if tiff is None:
+        return None
+    fechas = {"ModifyDate": None, "DateTimeOriginal": None, "CreateDate": None}
+    try:
+        ifd0, _ = tiff.leer_ifd(tiff.ifd0)
+        if TAG_FECHA_MODIFICACION in ifd0:
+            fechas["ModifyDate"] = tiff.valor_ascii(ifd0[TAG_FECHA_MODIFICACION])
+        if TAG_EXIF_IFD in ifd0:
+            exif, _ = tiff.leer_ifd(tiff.valor_entero(ifd0[TAG_EXIF_IFD]))
+            for tag, nombre in ((TAG_FECHA_ORIGINAL, "DateTimeOriginal"),
+                                (TAG_FECHA_DIGITALIZACION, "CreateDate")):
+                if tag in exif:
+                    fechas[nombre] = tiff.valor_ascii(exif[tag])
+    except (ValueError, struct.error):
+        return None
+    return fechas
+
+
+# Firmas de segmentos que pueden repetir las fechas fuera del EXIF
+_FIRMA_XMP = b'http://ns.adobe.com/xap/1.0/'
+_FIRMA_IPTC = b'Photoshop 3.0\x00'
+
+
+def posiciones_fechas(datos):
+    """
+    Ubica los tres campos de fecha que escribe `-AllDates` para poder
+    sobrescribirlos en su lugar. Solo se aceptan si los tres existen como
+    ASCII de 20 bytes ('AAAA:MM:DD HH:MM:SS\\0') y el archivo no tiene XMP ni
+    IPTC (exiftool también actualizaría las fechas de esos bloques).
+    Returns:
+        list | None: posiciones absolutas de ModifyDate, DateTimeOriginal y
+        CreateDate, o None si el archivo no se puede parchear con seguridad.
+    """
+    tiff = None
+    for marcador, inicio, fin in segmentos(datos):
+        cabecera = bytes(datos[inicio:inicio + 29])
+        if marcador == 0xE1 and cabecera.startswith(_FIRMA_XMP):
+            return None
+        if marcador == 0xED and cabecera.startswith(_FIRMA_IPTC):
+            return None
+        if tiff is None and marcador == 0xE1 and cabecera.startswith(b'Exif\x00\x00'):
+            try:
+                tiff = TiffExif(datos, inicio + 6, fin)
+            except (ValueError, struct.error):
+                return None
+    if tiff is None:
+        return None
+    try:
+        ifd0, _ = tiff.leer_ifd(tiff.ifd0)
+        if TAG_EXIF_IFD not in ifd0 or TAG_FECHA_MODIFICACION not in ifd0:
+            return None
+        exif, _ = tiff.leer_ifd(tiff.valor_entero(ifd0[TAG_EXIF_IFD]))
+        entradas = [ifd0[TAG_FECHA_MODIFICACION], exif.get(TAG_FECHA_ORIGINAL),
+                    exif.get(TAG_FECHA_DIGITALIZACION)]
+    except (ValueError, struct.error):
+        return None
+    posiciones = []
+    for entrada in entradas:
+        if entrada is None or entrada.tipo != 2 or entrada.cantidad != 20:
+            return None
+        if entrada.pos_valor + 20 > tiff.fin:
+            return None
+        posiciones.append(entrada.pos_valor)
+    return posiciones
+
+
+def app1_fechas(datetime_exif, endian='>'):
+    """
+    Arma un segmento APP1 'Exif' mínimo con las fechas que escribe
+    `-AllDates`: ModifyDate en el IFD0 y DateTimeOriginal y CreateDate en
+    el ExifIFD (más ExifVersion, que el estándar pide en ese IFD).
+    Sin verificar: no está comprobado que exiftool arme este mismo bloque
+    byte a byte (bench_jpeg_fechas lo compara solo si exiftool está instalado).
+    Args:
+        datetime_exif (str): 'AAAA:MM:DD HH:MM:SS'.
+        endian (str): '>' (MM) o '<' (II).
+    Returns:
+        bytes: el segmento completo, con marcador y largo.
+    """
+    fecha = datetime_exif.encode('ascii') + b'\x00'
+    if len(fecha) != 20:
+        raise ValueError(f"Fecha EXIF inválida: {datetime_exif!r}")
+
+    def entrada(tag, tipo, cantidad, valor):
+        # valor: offset (int) o hasta 4 bytes guardados en la misma entrada
+        if isinstance(valor, bytes):
+            return struct.pack(endian + 'HHI', tag, tipo, cantidad) + valor.ljust(4, b'\x00')
+        return struct.pack(endian + 'HHII', tag, tipo, cantidad, valor)
+
+    # Disposición: encabezado(8) + IFD0(2+2*12+4) + fecha + ExifIFD(2+3*12+4) + 2 fechas
+    ifd0 = 8
+    datos_ifd0 = ifd0 + 2 + 2 * 12 + 4
+    exif_ifd = datos_ifd0 + 20
+    datos_exif = exif_ifd + 2 + 3 * 12 + 4
+    tiff = (b'II' if endian == '<' else b'MM') + struct.pack(endian + 'HI', 42, ifd0)
+    tiff += struct.pack(endian + 'H', 2)
+    tiff += entrada(TAG_FECHA_MODIFICACION, 2, 20, datos_ifd0)
+    tiff += entrada(TAG_EXIF_IFD, 4, 1, exif_ifd)
+    tiff += struct.pack(endian + 'I', 0) + fecha
+    tiff += struct.pack(endian + 'H', 3)
+    tiff += entrada(0x9000, 7, 4, b'0232')
+    tiff += entrada(TAG_FECHA_ORIGINAL, 2, 20, datos_exif)
+    tiff += entrada(TAG_FECHA_DIGITALIZACION, 2, 20, datos_exif + 20)
+    tiff += struct.pack(endian + 'I', 0) + fecha + fecha
+    contenido = b'Exif\x00\x00' + tiff
+    return b'\xff\xe1' + struct.pack('>H', len(contenido) + 2) + contenido
+
+
+def insertar_app1(jpeg, app1):
+    """
+    Inserta un segmento APP1 en un JPEG en memoria: después del APP0 JFIF
+    si lo hay (debe ir primero) o si no justo después de SOI. Un APP1 'Exif'
+    que ya tuviera el archivo se reemplaza.
+    Returns:
+        bytes: el JPEG nuevo.
+    """
+    if not jpeg.startswith(b'\xff\xd8'):
+        raise ValueError("No es un JPEG")
+    pos = 2
+    quitar = None
+    for marcador, inicio, fin in segmentos(jpeg):
+        if marcador == 0xE0 and inicio == 6 and jpeg[inicio:inicio + 5] == b'JFIF\x00':
+            pos = fin
+        elif marcador == 0xE1 and jpeg[inicio:inicio + 6] == b'Exif\x00\x00':
+            quitar = (inicio - 4, fin)
+            break
+    if quitar is not None:
+        jpeg = jpeg[:quitar[0]] + jpeg[quitar[1]:]
+        pos = min(pos, quitar[0])
+    return jpeg[:pos] + app1 + jpeg[pos:]
@@ -0,0 +1,202 @@
+# Lote de archivos de la interfaz guardado en columnas, para selecciones muy
+# grandes (cientos de miles de archivos): cada carpeta y cada fecha repetida
+# se guarda una sola vez y las filas guardan su número en arrays; el estado
+# de cada archivo es un código, y las miniaturas no viajan con el lote (se
+# piden aparte por id de fila, ver Api.obtener_miniaturas).
+import os
+import uuid
+from array import array
+
+# Estado de cada archivo del lote, en lugar de un mensaje por archivo
+PENDIENTE, APLICADO, OMITIDO, AVISO, ERROR, NO_SOPORTADO = range(6)
+ESTADOS = ("pendiente", "aplicado", "omitido", "aviso", "error", "no_soportado")
+
+
+def estado_de(res):
+    """Código de estado de un resultado de MotorMedios (dict con resultado o msg)."""
+    if res.get("omitido"):
+        return OMITIDO
+    texto = str(res.get("resultado") or res.get("msg") or "")
+    if res.get("success", texto.startswith("✓")):
+        return APLICADO
+    if texto.startswith("⚠️"):
+        return AVISO
+    if texto.startswith("Tipo de archivo no soportado"):
+        return NO_SOPORTADO
+    return ERROR
+
+
+class Valores:
+    """
+    Valores repetidos (carpetas, fechas) guardados una vez; las filas guardan
+    su número. El número 0 es 'sin valor' (None).
+    """
+
+    __slots__ = ("valores", "_numeros")
+
+    def __init__(self):
+        self.valores = [None]
+        self._numeros = {None: 0}
+
+    def numero(self, valor):
+        n = self._numeros.get(valor)
+        if n is None:
+            n = self._numeros[valor] = len(self.valores)
+            self.valores.append(valor)
+        return n
+
+
+def _separar(path):
+    # Carpeta con su separador final y nombre: carpeta + nombre == path
+    i = path.rfind(os.sep)
+    if os.altsep:
+        i = max(i, path.rfind(os.altsep))
+    return path[:i + 1], path[i + 1:]
+
+
+class LoteMedios:
+    """
+    Archivos seleccionados en la interfaz, por columnas. La fila `i` es el id
+    del archivo para la interfaz: con él pide miniaturas y recibe resultados.
+    """
+
+    __slots__ = ("id", "_carpetas", "_fechas", "_horas", "_actuales",
+                 "carpeta", "nombre", "fecha", "hora", "actual", "estado", "detalles")
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self._carpetas = Valores()
+        self._fechas = Valores()
+        self._horas = Valores()
+        self._actuales = Valores()
+        self.carpeta = array('I')
+        self.nombre = []
+        self.fecha = array('I')
+        self.hora = array('I')
+        self.actual = array('I')
+        self.estado = array('B')
+        # Mensaje de los archivos que fallaron (id -> texto); el resto solo tiene código
+        self.detalles = {}
+
+    @classmethod
+    def desde_columnas(cls, columnas):
+        """Reconstruye un lote guardado con columnas() (p. ej. en un diario)."""
+        lote = cls()
+        carpetas, fechas, horas, actuales = (
+            columnas["carpetas"], columnas["fechas"], columnas["horas"], columnas["actuales"])
+        for carpeta, nombre, fecha, hora, actual in zip(
+                columnas["carpeta"], columnas["nombre"], columnas["fecha"],
+                columnas["hora"], columnas["actual"]):
+            lote.agregar(carpetas[carpeta] + nombre, fechas[fecha], horas[hora], actuales[actual])
+        return lote
+
+    @classmethod
+    def desde_rutas(cls, paths, filas=None):
+        """
+        Arma el lote con la fecha y hora del nombre de cada archivo. Los que
+        están en `filas` (del índice, ver IndiceMedios.obtener) toman de ahí
+        la fecha del nombre y la fecha actual sin volver a analizarlos.
+        """
+        from media_utils import extract_datetime_from_filename
+        filas = filas or {}
+        lote = cls()
+        for path in paths:
+            fila = filas.get(path)
+            if fila is not None:
+                lote.agregar(path, fila["fecha_nombre"], fila["hora_nombre"], fila["fecha_actual"])
+                continue
+            try:
+                fecha, hora = extract_datetime_from_filename(path)
+            except Exception:
+                fecha, hora = None, None
+            lote.agregar(path, fecha, hora)
+        return lote
+
+    def agregar(self, path, fecha=None, hora=None, fecha_actual=None):
+        """
+        Agrega un archivo al final del lote.
+        Returns:
+            int: id de la fila.
+        """
+        carpeta, nombre = _separar(path)
+        self.carpeta.append(self._carpetas.numero(carpeta))
+        self.nombre.append(nombre)
+        self.fecha.append(self._fechas.numero(fecha or None))
+        self.hora.append(self._horas.numero(hora or None))
+        self.actual.append(self._actuales.numero(fecha_actual or None))
+        self.estado.append(PENDIENTE)
+        return len(self.nombre) - 1
+
+    def __len__(self):
+        return len(self.nombre)
+
+    def path(self, i):
+        return self._carpetas.valores[self.carpeta[i]] + self.nombre[i]
+
+    def fecha_hora(self, i):
+        return self._fechas.valores[self.fecha[i]], self._horas.valores[self.hora[i]]
+
+    def fecha_actual(self, i):
+        return self._actuales.valores[self.actual[i]]
+
+    def poner_fecha_actual(self, i, fecha_actual):
+        self.actual[i] = self._actuales.numero(fecha_actual or None)
+
+    def archivos(self, cambios=None):
+        """
+        Archivos para MotorMedios._lanzar_batch, de a uno: la fecha y hora
+        del nombre, salvo en las filas que la interfaz cambió.
+        Args:
+            cambios (dict): {id: [fecha, hora, accion]}; las claves pueden
+                venir como texto (JSON).
+        Yields:
+            dict: {id, path, fecha, hora[, accion]}
+        """
+        cambios = {int(i): valores for i, valores in (cambios or {}).items()}
+        for i in range(len(self)):
+            fecha, hora = self.fecha_hora(i)
+            accion = None
+            if i in cambios:
+                fecha, hora, accion = cambios[i]
+            archivo = {"id": i, "path": self.path(i), "fecha": fecha or "", "hora": hora or ""}
+            if accion:
+                archivo["accion"] = accion
+            yield archivo
+
+    def anotar(self, res):
+        """
+        Guarda el estado de un resultado de procesar_batch (con su id).
+        Returns:
+            list: [id, estado, detalle]; el detalle solo si no salió bien.
+        """
+        i = res["id"]
+        estado = estado_de(res)
+        self.estado[i] = estado
+        detalle = None
+        if estado not in (APLICADO, OMITIDO):
+            detalle = self.detalles[i] = res.get("resultado") or res.get("msg")
+        return [i, estado, detalle]
+
+    def columnas(self):
+        """
+        El lote para la interfaz (JSON compacto): cada columna es una lista
+        de números que apunta a su lista de valores (`carpetas`, `fechas`,
+        `horas`, `actuales`; el 0 es vacío). La ruta de la fila i es
+        carpetas[carpeta[i]] + nombre[i]. `tipos` es la tabla de extensiones
+        que acepta el batch (folder_scan.EXTENSIONES_BATCH), para que la
+        interfaz no tenga su propia lista.
+        """
+        from folder_scan import EXTENSIONES_BATCH
+        return {
+            "id": self.id,
+            "tipos": EXTENSIONES_BATCH,
+            "carpetas": self._carpetas.valores,
+            "carpeta": self.carpeta.tolist(),
+            "nombre": self.nombre,
+            "fechas": self._fechas.valores,
+            "fecha": self.fecha.tolist(),
+            "horas": self._horas.valores,
+            "hora": self.hora.tolist(),
+            "actuales": self._actuales.valores,
+            "actual": self.actual.tolist(),
+        }
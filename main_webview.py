@@ -1,16 +1,20 @@
 # --- Utilidad para ocultar consola en subprocesos en Windows ---
-from media_utils import (
-    extract_datetime_from_filename,
-    process_video,
-    get_bin_path,
-    cambiar_metadata_imagen,
-    cambiar_metadata_video
-)
-from dotenv import load_dotenv
+# Al arrancar solo se importa lo que la ventana necesita para mostrarse; PIL,
+# la cache de miniaturas, exiftool y ffmpeg-python se cargan en la precarga
+# (Api.calentar) cuando la página ya está visible.
+from media_utils import leer_fechas_lote
+from media_engine import MotorMedios
+from exiftool_pool import cerrar_pool, pool_activo
+from thumbnails import GeneradorMiniaturas
+from folder_scan import EXTENSIONES_MEDIA
+from lote import LoteMedios
+from metricas import agregar, tramo
 import sys
 import os
+import time
+import base64
+import threading
 import webview
-import sys as _sys
 
 
 def get_creationflags():
@@ -22,10 +26,20 @@ def get_creationflags():
 
 
 # --- Parche para ocultar consola en ffmpeg-python en Windows ---
-if _sys.platform == "win32":
+def parchear_ffmpeg_python():
+    """
+    Hace que ffmpeg-python lance ffmpeg sin abrir una consola en Windows.
+    Importar ffmpeg-python es lento, así que se aplica en la precarga y no
+    al importar este módulo.
+    """
+    if sys.platform != "win32":
+        return
     import subprocess as _subprocess
-    import ffmpeg as _ffmpeg
-    from ffmpeg._run import output_operator as _output_operator
+    try:
+        import ffmpeg as _ffmpeg
+        from ffmpeg._run import output_operator as _output_operator
+    except ImportError:
+        return
 
     @_output_operator()
     def _patched_run_async(
@@ -49,20 +63,100 @@ if _sys.platform == "win32":
     _ffmpeg._run.run_async = _patched_run_async
 
 
-class Api:
+# Métodos que la interfaz puede pedir como tarea del motor asyncio (Api.enviar)
+PEDIDOS_EN_SEGUNDO_PLANO = ("extraer_metadata_batch", "obtener_miniaturas", "cargar_indice",
+                            "consultar_indice", "resumen_indice")
+
+
+class Api(MotorMedios):
+    """
+    API que llama la interfaz web (web/renderer.js). El procesamiento está en
+    MotorMedios (media_engine); aquí quedan los diálogos y las miniaturas.
+    """
+
     def __init__(self):
-        # Determinar la ruta base (donde está el ejecutable o script)
-        if hasattr(sys, '_MEIPASS'):
-            base_dir = sys._MEIPASS
-        else:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-        # Ya no se carga .env ni OUTPUT_DIR
-        # Inicializa rutas de ejecutables externos de forma dinámica
-        self.exiftool_path = get_bin_path('exiftool.exe')
-        self.ffmpeg_path = get_bin_path('ffmpeg.exe')
+        super().__init__()
         self._last_file_path = None
         self._last_folder_path = None
         self._last_thumb_logs = None
+        self._thumb_cache = None
+        self._miniaturas = None
+        self._lock_miniaturas = threading.Lock()
+        self._motor_async = None
+        # Lote que muestra la tabla (ver lote.LoteMedios)
+        self._lote = None
+        self._calentado = False
+        self.precarga_ms = None
+
+    def calentar(self):
+        """
+        Precarga en segundo plano lo que la ventana no necesita para
+        mostrarse: el parche de ffmpeg-python, PIL, la cache de miniaturas y
+        el primer proceso exiftool. Se llama cuando la página ya cargó, así
+        la primera miniatura o el primer batch no pagan ese costo.
+        """
+        if self._calentado:
+            return
+        self._calentado = True
+        threading.Thread(target=self._calentar, name="precarga", daemon=True).start()
+
+    def _calentar(self):
+        inicio = time.perf_counter()
+        pasos = (
+            ("ffmpeg-python", parchear_ffmpeg_python),
+            ("PIL", lambda: __import__("PIL.Image")),
+            ("cache de miniaturas", self._cache_miniaturas),
+            ("índice de medios", self._indice_medios),
+            ("motor asyncio", self._motor),
+            ("exiftool", self._iniciar_exiftool),
+        )
+        for nombre, paso in pasos:
+            try:
+                paso()
+            except Exception as e:
+                print(f"Precarga de {nombre} falló:", e)
+        self.precarga_ms = (time.perf_counter() - inicio) * 1000
+
+    def _iniciar_exiftool(self):
+        # Lanza un proceso del pool; exiftool tarda en arrancar (perl)
+        pool = pool_activo(self.exiftool_path)
+        if pool is not None and os.path.exists(self.exiftool_path):
+            pool.ejecutar(["-ver"])
+
+    def _motor(self):
+        # Motor asyncio (async_engine); se inicia en la precarga o con el
+        # primer pedido, con los mismos límites por herramienta que los batch
+        if self._motor_async is None:
+            from async_engine import iniciar_motor
+            self._motor_async = iniciar_motor({
+                "exiftool": self._planificador.workers_metadata,
+                "ffmpeg": self._planificador.workers_ffmpeg})
+        return self._motor_async
+
+    def enviar(self, metodo, args=None):
+        """
+        Ejecuta un método de la Api como tarea del motor asyncio y vuelve al
+        instante: el puente de pywebview queda libre y varios pedidos
+        independientes avanzan a la vez. El resultado se pide con resultado_tarea.
+        Returns:
+            dict: {tarea_id} o {error}.
+        """
+        if metodo not in PEDIDOS_EN_SEGUNDO_PLANO:
+            return {"error": f"❌ Método no disponible en segundo plano: {metodo}"}
+        return {"tarea_id": self._motor().enviar(getattr(self, metodo), *(args or []))}
+
+    def resultado_tarea(self, tarea_id, espera=0.25):
+        # Espera como mucho unos segundos para no retener el puente
+        return self._motor().resultado(tarea_id, min(max(0.0, float(espera)), 5.0))
+
+    def cancelar_tarea(self, tarea_id):
+        return {"cancelado": self._motor().cancelar(tarea_id)}
+
+    def _cerrar_motor(self):
+        if self._motor_async is not None:
+            from async_engine import cerrar_motor
+            cerrar_motor()
+            self._motor_async = None
 
     def get_file_path(self):
         # PyWebView native file dialog
@@ -82,150 +176,7 @@ class Api:
             return self._last_folder_path
         return None
 
-    def extraer_fecha_hora(self, input_path):
-        fecha, hora = extract_datetime_from_filename(input_path)
-        return {"fecha": fecha, "hora": hora}
-
-    def procesar_archivo(self, input_path, tipo_archivo, modo_fecha, fecha_manual, hora_manual, accion=None):
-        # modo_fecha: 'extraida' o 'manual'
-        if modo_fecha == 'extraida':
-            res = self.extraer_fecha_hora(input_path)
-            fecha_final = res['fecha']
-            hora_final = res['hora'] or "12:00:00"
-        else:
-            fecha_final = fecha_manual
-            hora_final = hora_manual or "12:00:00"
-        base = os.path.splitext(os.path.basename(input_path))[0]
-        ext = os.path.splitext(input_path)[1].lower()
-        if tipo_archivo == "video":
-            # Determina la acción a realizar
-            if not accion:
-                accion = "modificar_video"
-            if accion == "modificar_video":
-                datetime_exif = f"{fecha_final} {hora_final}"
-                cambiar_metadata_video(
-                    input_path, datetime_exif, self.exiftool_path)
-                return {"success": True, "msg": f"✓ Metadatos aplicados a video: {input_path}"}
-            else:
-                return {"success": False, "msg": "❌ Acción no soportada para video."}
-        elif tipo_archivo == "imagen":
-            if not accion:
-                accion = "modificar_imagen"
-            if accion == "modificar_imagen":
-                datetime_exif = f"{fecha_final} {hora_final}"
-                cambiar_metadata_imagen(
-                    input_path, datetime_exif, self.exiftool_path)
-                return {"success": True, "msg": f"✓ Metadatos aplicados a imagen: {input_path}"}
-            else:
-                return {"success": False, "msg": "❌ Acción no soportada para imagen."}
-        else:
-            return {"success": False, "msg": "❌ Tipo de archivo no soportado."}
-
-    def procesar_carpeta(self, folder_path, tipo_archivo, modo_fecha, fecha_manual, hora_manual):
-        if tipo_archivo == "imagen":
-            valid_exts = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
-        else:
-            valid_exts = ('.mp4', '.mov', '.avi')
-        count = 0
-        success = 0
-        logs = []
-        for file in os.listdir(folder_path):
-            if file.lower().endswith(valid_exts):
-                input_path = os.path.join(folder_path, file)
-                if modo_fecha == 'extraida':
-                    res = self.extraer_fecha_hora(input_path)
-                    f = res['fecha']
-                    h = res['hora'] or "12:00:00"
-                else:
-                    f = fecha_manual
-                    h = hora_manual or "12:00:00"
-                base = os.path.splitext(os.path.basename(input_path))[0]
-                ext = os.path.splitext(input_path)[1].lower()
-                if tipo_archivo == "video":
-                    datetime_exif = f"{f} {h}" if f else None
-                    try:
-                        cambiar_metadata_video(
-                            input_path, datetime_exif, self.exiftool_path)
-                        logs.append(
-                            f"✓ Metadatos aplicados a video: {input_path}")
-                    except Exception as e:
-                        logs.append(
-                            f"❌ Error aplicando metadata: {str(e)}")
-                elif tipo_archivo == "imagen":
-                    datetime_exif = f"{f} {h}" if f else None
-                    try:
-                        cambiar_metadata_imagen(
-                            input_path, datetime_exif, self.exiftool_path)
-                        logs.append(
-                            f"✓ Metadatos aplicados a imagen: {input_path}")
-                    except Exception as e:
-                        logs.append(
-                            f"❌ Error aplicando metadata: {str(e)}")
-                else:
-                    logs.append(
-                        f"❌ Tipo de archivo no soportado para {file}.")
-                success += 1
-                count += 1
-        logs.append(
-            f"--- RESUMEN ---\nTotal de archivos procesados: {count}\nArchivos modificados exitosamente: {success}")
-        return {"success": True, "logs": logs}
-
-    def procesar_auto(self, path, modo_fecha, fecha_manual, hora_manual, tipo_carpeta=None):
-        import os
-        if os.path.isdir(path):
-            # Procesar carpeta con filtro
-            return self._procesar_carpeta_auto(path, modo_fecha, fecha_manual, hora_manual, tipo_carpeta)
-        elif os.path.isfile(path):
-            # Procesar archivo individual
-            return self._procesar_archivo_auto(path, modo_fecha, fecha_manual, hora_manual)
-        else:
-            return {"success": False, "msg": "❌ Ruta no válida."}
-
-    def _procesar_archivo_auto(self, input_path, modo_fecha, fecha_manual, hora_manual):
-        ext = os.path.splitext(input_path)[1].lower()
-        imagen_exts = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
-        video_exts = ('.mp4', '.mov', '.avi')
-        if ext in imagen_exts:
-            tipo = "imagen"
-        elif ext in video_exts:
-            tipo = "video"
-        else:
-            return {"success": False, "msg": f"❌ Extensión no soportada: {ext}"}
-        return self.procesar_archivo(input_path, tipo, modo_fecha, fecha_manual, hora_manual)
-
-    def _procesar_carpeta_auto(self, folder_path, modo_fecha, fecha_manual, hora_manual, tipo_carpeta=None):
-        imagen_exts = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
-        video_exts = ('.mp4', '.mov', '.avi')
-        archivos = [f for f in os.listdir(
-            folder_path) if os.path.isfile(os.path.join(folder_path, f))]
-        logs = []
-        count = 0
-        success = 0
-        for file in archivos:
-            ext = os.path.splitext(file)[1].lower()
-            input_path = os.path.join(folder_path, file)
-            es_imagen = ext in imagen_exts
-            es_video = ext in video_exts
-            # Filtro según tipo_carpeta
-            if tipo_carpeta == "imagen" and not es_imagen:
-                continue
-            if tipo_carpeta == "video" and not es_video:
-                continue
-            if tipo_carpeta in (None, "ambos") and not (es_imagen or es_video):
-                continue
-            if es_imagen or es_video:
-                res = self._procesar_archivo_auto(
-                    input_path, modo_fecha, fecha_manual, hora_manual)
-                logs.append(res.get("msg", ""))
-                if res.get("success"):
-                    success += 1
-                count += 1
-        logs.append(
-            f"--- RESUMEN ---\nTotal de archivos procesados: {count}\nArchivos modificados exitosamente: {success}")
-        return {"success": True, "logs": logs}
-
     def is_file_or_dir(self, path):
-        import os
         if os.path.isfile(path):
             return {"type": "file"}
         elif os.path.isdir(path):
@@ -237,138 +188,126 @@ class Api:
         # En Windows/PyWebView, normalmente no se necesita esto, pero se deja para compatibilidad
         return filename
 
-    def extraer_metadata_batch(self, file_paths):
-        # Recibe una lista de rutas, devuelve [{path, fecha, hora, thumb, thumb_log} ...]
-        from datetime import datetime
-        import os
-        import subprocess
-        import tempfile
-        import base64
-        results = []
-        thumb_logs = []
-        # flags = get_creationflags()  # Ya no se usa aquí, el parche global lo maneja
-        for path in file_paths:
-            try:
-                fecha, hora = extract_datetime_from_filename(path)
-            except Exception:
-                fecha, hora = "", ""
-            ext = os.path.splitext(path)[1].lower()
-            thumb = None
-            thumb_log = ''
-            if ext in [".mp4", ".mov", ".avi"]:
-                # Genera miniatura SOLO en memoria, nunca en disco
-                try:
-                    import ffmpeg
-                    import numpy as np
-                    from PIL import Image
-                    import io
-                    # Extrae el primer frame usando ffmpeg-python
-                    out, _ = (
-                        ffmpeg.input(path, ss=0)
-                        .output('pipe:', vframes=1, format='image2', vcodec='mjpeg')
-                        .run(capture_stdout=True, capture_stderr=True)
-                    )
-                    img = Image.open(io.BytesIO(out))
-                    # Redimensiona thumbnail
-                    img.thumbnail((120, 80))
-                    buffer = io.BytesIO()
-                    img.save(buffer, format="JPEG")
-                    thumb = f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
-                    thumb_log = "Imagen lista para previsualizar."
-                except Exception as e:
-                    # SVG fallback base64 for 'Sin miniatura'
-                    svg = '''<svg xmlns='http://www.w3.org/2000/svg' width='60' height='40'><rect width='100%' height='100%' fill='#eee'/><text x='50%' y='50%' font-size='10' text-anchor='middle' fill='#888' dy='.3em'>Sin miniatura</text></svg>'''
-                    thumb = f"data:image/svg+xml;base64,{base64.b64encode(svg.encode('utf-8')).decode('utf-8')}"
-                    thumb_log = f"❌ Error leyendo imagen: {str(e)}"
-            elif ext in [".jpg", ".jpeg", ".png", ".bmp", ".gif"]:
+    def _cache_miniaturas(self):
+        # Cache en disco de miniaturas; se abre la primera vez que se usa
+        # (en la precarga o en la primera miniatura, lo que llegue antes)
+        with self._lock_miniaturas:
+            if self._thumb_cache is None:
                 try:
-                    from PIL import Image
-                    import io
-                    with open(path, 'rb') as f:
-                        img_bytes = f.read()
-                    img = Image.open(io.BytesIO(img_bytes))
-                    img.thumbnail((120, 80))
-                    buffer = io.BytesIO()
-                    img.save(buffer, format="JPEG")
-                    thumb = f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
-                    thumb_log = "Imagen lista para previsualizar."
+                    from thumb_cache import CacheMiniaturas
+                    self._thumb_cache = CacheMiniaturas()
                 except Exception as e:
-                    svg = '''<svg xmlns='http://www.w3.org/2000/svg' width='60' height='40'><rect width='100%' height='100%' fill='#eee'/><text x='50%' y='50%' font-size='10' text-anchor='middle' fill='#888' dy='.3em'>Sin preview</text></svg>'''
-                    thumb = f"data:image/svg+xml;base64,{base64.b64encode(svg.encode('utf-8')).decode('utf-8')}"
-                    thumb_log = f"❌ Error leyendo imagen: {str(e)}"
-            print(f"{path} -> fecha: {fecha}, hora: {hora}")
-            results.append({
-                "path": path,
-                "fecha": fecha,
-                "hora": hora,
-                "thumb": thumb,
-                "thumb_log": thumb_log
-            })
-        self._last_thumb_logs = thumb_logs
-        return results
+                    print("Cache de miniaturas no disponible:", e)
+                    self._thumb_cache = False
+        return self._thumb_cache or None
+
+    def _generador_miniaturas(self):
+        if self._miniaturas is None:
+            self._miniaturas = GeneradorMiniaturas(self._cache_miniaturas())
+        return self._miniaturas
 
-    def procesar_batch(self, archivos):
-        # Recibe lista de dicts: {path, fecha, hora, accion}
-        resultados = []
-        for archivo in archivos:
-            path = archivo.get("path")
-            fecha = archivo.get("fecha")
-            hora = archivo.get("hora")
-            accion = archivo.get("accion", "modificar_imagen")
-            ext = os.path.splitext(path)[1].lower()
-            base = os.path.splitext(os.path.basename(path))[0]
+    def extraer_metadata_batch(self, file_paths=None):
+        # Recibe una lista de rutas (o usa la última selección del diálogo) y
+        # devuelve el lote en columnas (LoteMedios.columnas) al instante; las
+        # miniaturas se piden aparte con obtener_miniaturas
+        if file_paths is None:
+            file_paths = self._last_file_path or []
+        with tramo("parser_lote", archivos=len(file_paths)):
+            return self._metadata_batch(file_paths)
+
+    def _filas_indice(self, file_paths):
+        indice = self._indice_medios()
+        if indice is None:
+            return {}
+        try:
+            return indice.obtener(file_paths)
+        except Exception as e:
+            print("No se pudo consultar el índice:", e)
+            return {}
+
+    def _metadata_batch(self, file_paths):
+        # Los archivos ya indexados y sin cambios traen la fecha del nombre y
+        # la embebida sin volver a analizarlos
+        self._lote = LoteMedios.desde_rutas(file_paths, self._filas_indice(file_paths))
+        return self._lote.columnas()
+
+    def cargar_indice(self, consulta="todos", carpeta=None, desde=None, hasta=None,
+                      campo="actual", limite=None):
+        # Búsqueda en el índice cargada como lote de la tabla: {total, lote} o {error}
+        res = self.consultar_indice(consulta, carpeta, desde=desde, hasta=hasta,
+                                    campo=campo, limite=limite)
+        if "error" in res:
+            return res
+        lote = LoteMedios()
+        for fila in res["filas"]:
+            lote.agregar(fila["path"], fila["fecha_nombre"], fila["hora_nombre"],
+                         fila["fecha_actual"])
+        self._lote = lote
+        return {"total": res["total"], "lote": lote.columnas()}
+
+    def _lote_actual(self, lote_id):
+        # El lote que pide la interfaz, si sigue siendo el de la tabla
+        lote = self._lote
+        return lote if lote is not None and lote.id == lote_id else None
+
+    def iniciar_procesar_lote(self, lote_id, cambios=None):
+        """
+        Procesa el lote de la tabla como trabajo en segundo plano. La
+        interfaz solo manda las filas que cambió ({id: [fecha, hora, accion]})
+        y recibe por cada archivo [id, estado, detalle] (ver LoteMedios.anotar).
+        """
+        lote = self._lote_actual(lote_id)
+        if lote is None:
+            return {"error": "❌ La lista de archivos cambió, vuelve a seleccionarlos."}
+        # El diario guarda el lote en columnas, no un dict por archivo
+        diario = self._crear_diario("batch", {"lote": lote.columnas(), "cambios": cambios or {}})
+        return self._lanzar_batch(lote.archivos(cambios), diario, total=len(lote),
+                                  compactar=lote.anotar)
+
+    def _fechas_actuales(self, file_paths):
+        # Fechas embebidas de las filas visibles; las que el índice no tiene
+        # se leen ahora (en bloque) y quedan guardadas para la próxima vez
+        filas = self._filas_indice(file_paths)
+        sin_leer = [path for path, fila in filas.items() if not fila["fechas_leidas"]]
+        if sin_leer:
             try:
-                # Si la fecha está vacía, usar la fecha actual
-                if not fecha:
-                    from datetime import datetime
-                    fecha = datetime.now().strftime('%Y:%m:%d')
-                    hora = datetime.now().strftime('%H:%M:%S')
-                # Si la hora está vacía pero la fecha existe, usar hora por defecto
-                if fecha and (not hora or hora.strip() == ""):
-                    hora = "12:00:00"
-                datetime_exif = f"{fecha} {hora}"
-                if ext in [".jpg", ".jpeg", ".png"]:
-                    try:
-                        cambiar_metadata_imagen(
-                            path, datetime_exif, self.exiftool_path)
-                        res = f"✓ Metadatos aplicados a imagen: {path}"
-                    except Exception as e:
-                        res = f"❌ Error metadatos imagen: {str(e)}"
-                elif ext in [".mp4", ".mov", ".avi", ".mkv", ".wmv", ".flv", ".webm"]:
-                    # Si la acción es solo extraer frame, NO modificar el video original
-                    if accion == "extraer_frame":
-                        try:
-                            # Guardar el frame en el mismo directorio del video de entrada
-                            output_dir = os.path.dirname(path)
-                            if not os.path.exists(output_dir):
-                                os.makedirs(output_dir)
-                            output_img = os.path.join(
-                                output_dir, f"{base}.jpg")
-                            process_video(path, output_img, None,
-                                          self.exiftool_path, self.ffmpeg_path)
-                            try:
-                                cambiar_metadata_imagen(
-                                    output_img, datetime_exif, self.exiftool_path)
-                                res = f"✓ Frame extraído y metadatos aplicados: {output_img}"
-                            except Exception as e:
-                                res = f"❌ Error metadatos frame: {str(e)}"
-                        except Exception as e:
-                            res = f"❌ Error extrayendo frame: {str(e)}"
-                    else:
-                        video_error = None
-                        try:
-                            cambiar_metadata_video(
-                                path, datetime_exif, self.exiftool_path)
-                            res = f"✓ Metadatos aplicados a video: {path}"
-                        except Exception as e:
-                            video_error = str(e)
-                            res = f"⚠️ No se pudieron modificar los metadatos del video: {video_error}"
-                else:
-                    res = f"Tipo de archivo no soportado: {path}"
+                self._guardar_en_indice(sin_leer, leer_fechas_lote(sin_leer, self.exiftool_path))
+                filas.update(self._filas_indice(sin_leer))
             except Exception as e:
-                res = f"❌ Error: {str(e)}"
-            resultados.append({"path": path, "resultado": res})
-        return resultados
+                print("No se pudieron leer las fechas actuales:", e)
+        return {path: fila["fecha_actual"] for path, fila in filas.items()}
+
+    def obtener_miniaturas(self, lote_id, ids):
+        """
+        Miniaturas de las filas visibles del lote, por id de fila.
+        Returns:
+            list: [{id, thumb, metodo, ms, error, fecha_actual} ...]; sin
+                miniatura `thumb` es None y `error` dice por qué (o None si
+                el archivo no es de un tipo con miniatura).
+        """
+        lote = self._lote_actual(lote_id)
+        if lote is None:
+            return []
+        ids = [i for i in ids if 0 <= i < len(lote)]
+        paths = [lote.path(i) for i in ids]
+        actuales = self._fechas_actuales(paths)
+        results = []
+        for i, res in zip(ids, self._generador_miniaturas().obtener(paths, (120, 80))):
+            path = res["path"]
+            thumb = error = None
+            if res["ms"] is not None:
+                agregar(f"miniatura_{res['metodo'] or 'error'}", res["ms"] / 1000, path)
+            if res["datos"] is not None:
+                with tramo("miniatura_base64", path, bytes=len(res["datos"])):
+                    thumb = f"data:image/jpeg;base64,{base64.b64encode(res['datos']).decode('utf-8')}"
+            elif os.path.splitext(path)[1].lower() in EXTENSIONES_MEDIA:
+                error = str(res["error"])
+            if path in actuales:
+                lote.poner_fecha_actual(i, actuales[path])
+            results.append({"id": i, "thumb": thumb, "metodo": res["metodo"],
+                            "ms": round(res["ms"]) if res["ms"] is not None else None,
+                            "error": error, "fecha_actual": lote.fecha_actual(i)})
+        return results
 
     def abrir_output_dir(self):
         # Esta función ya no es necesaria
@@ -376,7 +315,18 @@ class Api:
 
 
 if __name__ == '__main__':
+    # Necesario para el pool de procesos de miniaturas en el ejecutable congelado
+    import multiprocessing
+    multiprocessing.freeze_support()
     api = Api()
-    webview.create_window('Editor Unificado de Metadatos', 'web/index.html',
-                          js_api=api, width=950, height=670, resizable=True)
+    window = webview.create_window('Editor Unificado de Metadatos', 'web/index.html',
+                                   js_api=api, width=950, height=670, resizable=True)
+    # Con la página ya visible se precarga lo pesado en segundo plano
+    window.events.loaded += api.calentar
+    # Al cerrar la ventana: cancela trabajos y cierra los procesos exiftool
+    window.events.closed += api._trabajos.cancelar_todos
+    window.events.closed += cerrar_pool
+    window.events.closed += lambda: api._miniaturas and api._miniaturas.cerrar()
+    window.events.closed += lambda: api._indice and api._indice.cerrar()
+    window.events.closed += api._cerrar_motor
     webview.start(debug=False)
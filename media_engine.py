@@ -0,0 +1,1308 @@
+# Motor de procesamiento sin interfaz: las mismas operaciones que usa la
+# ventana (main_webview.Api) para usarlas desde scripts o desde la línea de
+# comandos (python -m media_engine). No importa webview, PIL ni ffmpeg: esos
+# módulos se cargan recién en la función que los necesita.
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime
+
+from media_utils import (
+    extract_datetime_from_filename,
+    extraer_frame_con_fecha,
+    get_bin_path,
+    buscar_ejecutable,
+    cambiar_metadata_imagen,
+    cambiar_metadata_video,
+    cambiar_metadata_lote,
+    es_error_transitorio,
+    leer_fechas_lote,
+    fecha_ya_aplicada,
+    restaurar_fechas,
+    ArchivoOcupado,
+    SIN_CONFIRMAR,
+    directorio_usuario
+)
+from exiftool_pool import iniciar_pool, cerrar_pool
+from batch_engine import PlanificadorBatch, AgrupadorEscrituras, Diferir
+from jobs import GestorTrabajos
+from journal import DiarioBatch, leer_diario, listar_diarios, borrar_diario, purgar_diarios
+from folder_scan import EXTENSIONES_BATCH, escanear_carpeta, tipo_por_extension
+from folder_watch import ObservadorCarpeta
+from metricas import metricas, tramo
+
+
+class MotorMedios:
+    """
+    Operaciones por lote sobre imágenes y videos: extraer fechas del nombre,
+    escribir metadatos, extraer frames y recorrer carpetas. Los procesos
+    largos devuelven generadores o trabajos en segundo plano (ver jobs).
+    """
+
+    def __init__(self, exiftool_path=None, ffmpeg_path=None, workers_metadata=None,
+                 workers_ffmpeg=None, usar_diario=True, usar_indice=True):
+        # Rutas de ejecutables externos; por defecto los de la carpeta bin
+        self.exiftool_path = exiftool_path or get_bin_path('exiftool.exe')
+        self.ffmpeg_path = ffmpeg_path or get_bin_path('ffmpeg.exe')
+        # Planificador de trabajos por archivo y pool de exiftool persistente
+        # (-stay_open) con un proceso por worker de metadata; los procesos
+        # exiftool se lanzan recién con el primer comando
+        self._planificador = PlanificadorBatch(workers_metadata, workers_ffmpeg)
+        iniciar_pool(self.exiftool_path, self._planificador.workers_metadata)
+        self._trabajos = GestorTrabajos()
+        # Los batch no reescriben archivos que ya tienen la fecha pedida
+        self.omitir_correctos = True
+        # Diario de cada batch para poder reanudarlo o revertirlo (journal)
+        self.usar_diario = usar_diario
+        # Índice de medios (media_index); se abre la primera vez que se usa
+        self.usar_indice = usar_indice
+        self._indice = None
+        self._lock_indice = threading.Lock()
+
+    def configurar_workers(self, workers_metadata=None, workers_ffmpeg=None):
+        # Cambia la concurrencia de los procesos batch (None = valor por
+        # defecto). Los trabajos nuevos usan el planificador nuevo; los que
+        # están corriendo terminan en el anterior, que se cierra después
+        anterior = self._planificador
+        self._planificador = PlanificadorBatch(workers_metadata, workers_ffmpeg)
+        anterior.cerrar(drenar=True)
+        iniciar_pool(self.exiftool_path, self._planificador.workers_metadata)
+        return {"workers_metadata": self._planificador.workers_metadata,
+                "workers_ffmpeg": self._planificador.workers_ffmpeg}
+
+    def configurar_omitir_correctos(self, activo=True):
+        # Activa/desactiva la lectura previa que salta los archivos ya correctos
+        self.omitir_correctos = bool(activo)
+        return {"omitir_correctos": self.omitir_correctos}
+
+    def _con_fechas_actuales(self, items, path_de=None, tamano=200, diario=None):
+        # Empareja cada item con sus fechas actuales, leídas en bloque por
+        # tandas de `tamano` archivos; con el modo apagado y sin diario las
+        # fechas son None. Con diario, cada archivo queda planificado junto
+        # con sus fechas originales (para poder revertir el batch).
+        if not self.omitir_correctos and diario is None:
+            for item in items:
+                yield item, None
+            return
+        tanda = []
+
+        def leer():
+            paths = [path_de(item) if path_de else item for item in tanda]
+            fechas = leer_fechas_lote(paths, self.exiftool_path)
+            # Lo leído queda en el índice, que así se mantiene al día gratis
+            self._guardar_en_indice(paths, fechas)
+            if diario is not None:
+                # Las fechas originales llegan a disco antes de que se
+                # modifique cualquier archivo de la tanda
+                for path in paths:
+                    diario.planificado(path, fechas.get(path))
+                diario.sincronizar()
+            for item, path in zip(tanda, paths):
+                yield item, (fechas.get(path) if self.omitir_correctos else None)
+
+        for item in items:
+            tanda.append(item)
+            if len(tanda) >= tamano:
+                yield from leer()
+                tanda = []
+        if tanda:
+            yield from leer()
+
+    @staticmethod
+    def _msg_omitido(path):
+        return f"✓ Sin cambios, la fecha ya era correcta: {path}"
+
+    @staticmethod
+    def _msg_sin_fecha_manual(path):
+        return f"❌ No se indicó una fecha manual: {path}"
+
+    def extraer_fecha_hora(self, input_path):
+        with tramo("parser", input_path):
+            fecha, hora = extract_datetime_from_filename(input_path)
+        return {"fecha": fecha, "hora": hora}
+
+    def procesar_archivo(self, input_path, tipo_archivo, modo_fecha, fecha_manual, hora_manual, accion=None,
+                         fechas_actuales=None, reintentar=True):
+        # fechas_actuales: las leídas con leer_fechas_lote, para omitir el archivo
+        # si ya tiene la fecha que se va a escribir
+        # reintentar=False: si el archivo está ocupado lanza ArchivoOcupado
+        # para que el planificador lo reintente más tarde
+        # modo_fecha: 'extraida' o 'manual'
+        if modo_fecha == 'extraida':
+            res = self.extraer_fecha_hora(input_path)
+            fecha_final = res['fecha']
+            hora_final = res['hora'] or "12:00:00"
+            if not fecha_final:
+                return {"success": False,
+                        "msg": f"❌ No se encontró una fecha en el nombre: {input_path}"}
+        else:
+            fecha_final = fecha_manual
+            hora_final = hora_manual or "12:00:00"
+            if not fecha_final:
+                return {"success": False, "msg": self._msg_sin_fecha_manual(input_path)}
+        if fecha_ya_aplicada(fechas_actuales, f"{fecha_final} {hora_final}", tipo_archivo):
+            return {"success": True, "omitido": True, "msg": self._msg_omitido(input_path)}
+        if tipo_archivo == "video":
+            # Determina la acción a realizar
+            if not accion:
+                accion = "modificar_video"
+            if accion == "modificar_video":
+                datetime_exif = f"{fecha_final} {hora_final}"
+                with self._planificador.limite("metadata"):
+                    cambiar_metadata_video(
+                        input_path, datetime_exif, self.exiftool_path, reintentar)
+                return {"success": True, "datetime": datetime_exif,
+                        "msg": f"✓ Metadatos aplicados a video: {input_path}"}
+            else:
+                return {"success": False, "msg": "❌ Acción no soportada para video."}
+        elif tipo_archivo == "imagen":
+            if not accion:
+                accion = "modificar_imagen"
+            if accion == "modificar_imagen":
+                datetime_exif = f"{fecha_final} {hora_final}"
+                with self._planificador.limite("metadata"):
+                    cambiar_metadata_imagen(
+                        input_path, datetime_exif, self.exiftool_path, reintentar)
+                return {"success": True, "datetime": datetime_exif,
+                        "msg": f"✓ Metadatos aplicados a imagen: {input_path}"}
+            else:
+                return {"success": False, "msg": "❌ Acción no soportada para imagen."}
+        else:
+            return {"success": False, "msg": "❌ Tipo de archivo no soportado."}
+
+    def procesar_carpeta(self, folder_path, tipo_archivo, modo_fecha, fecha_manual, hora_manual,
+                         recursivo=False, incluir=None, excluir=None):
+        # Los archivos se procesan a medida que el escáner los encuentra
+        archivos = []
+        omitidos = set()
+
+        def descubrir():
+            tipos = ("imagen",) if tipo_archivo == "imagen" else ("video",)
+            for encontrado in escanear_carpeta(folder_path, tipos, recursivo, incluir, excluir):
+                archivos.append(encontrado.path)
+                yield encontrado.path
+
+        def procesar(par):
+            input_path, fechas_actuales = par
+            if modo_fecha == 'extraida':
+                res = self.extraer_fecha_hora(input_path)
+                f = res['fecha']
+                h = res['hora'] or "12:00:00"
+            else:
+                f = fecha_manual
+                h = hora_manual or "12:00:00"
+            if f and fecha_ya_aplicada(fechas_actuales, f"{f} {h}", tipo_archivo):
+                omitidos.add(input_path)
+                return self._msg_omitido(input_path)
+            if tipo_archivo == "video":
+                datetime_exif = f"{f} {h}" if f else None
+                try:
+                    with self._planificador.limite("metadata"):
+                        cambiar_metadata_video(
+                            input_path, datetime_exif, self.exiftool_path, reintentar=False)
+                    return f"✓ Metadatos aplicados a video: {input_path}"
+                except ArchivoOcupado:
+                    raise
+                except Exception as e:
+                    return f"❌ Error aplicando metadata: {str(e)}"
+            elif tipo_archivo == "imagen":
+                datetime_exif = f"{f} {h}" if f else None
+                try:
+                    with self._planificador.limite("metadata"):
+                        cambiar_metadata_imagen(
+                            input_path, datetime_exif, self.exiftool_path, reintentar=False)
+                    return f"✓ Metadatos aplicados a imagen: {input_path}"
+                except ArchivoOcupado:
+                    raise
+                except Exception as e:
+                    return f"❌ Error aplicando metadata: {str(e)}"
+            else:
+                return f"❌ Tipo de archivo no soportado para {os.path.basename(input_path)}."
+
+        if modo_fecha == 'manual' and fecha_manual and tipo_archivo in ("imagen", "video"):
+            # Misma fecha para todos: se agrupan en pocos comandos exiftool
+            datetime_exif = f"{fecha_manual} {hora_manual or '12:00:00'}"
+            resultados = {}
+            for path, _, error, omitido in self._iter_escrituras_agrupadas(
+                    (path, tipo_archivo, datetime_exif) for path in descubrir()):
+                resultados[path] = error
+                if omitido:
+                    omitidos.add(path)
+            logs = [f"❌ Error aplicando metadata: {resultados[path]}" if resultados[path]
+                    else (self._msg_omitido(path) if path in omitidos
+                          else f"✓ Metadatos aplicados a {tipo_archivo}: {path}")
+                    for path in archivos]
+        else:
+            logs = list(self._planificador.mapear(
+                procesar, self._con_fechas_actuales(descubrir()),
+                en_error=lambda par, e: f"❌ Error aplicando metadata a {par[0]}: {str(e)}"))
+        count = len(archivos)
+        success = count
+        logs.append(self._resumen(count, success, len(omitidos)))
+        return {"success": True, "logs": logs}
+
+    def procesar_auto(self, path, modo_fecha, fecha_manual, hora_manual, tipo_carpeta=None,
+                      recursivo=False, incluir=None, excluir=None):
+        if os.path.isdir(path):
+            # Procesar carpeta con filtro
+            return self._procesar_carpeta_auto(path, modo_fecha, fecha_manual, hora_manual,
+                                               tipo_carpeta, recursivo, incluir, excluir)
+        elif os.path.isfile(path):
+            # Procesar archivo individual
+            return self._procesar_archivo_auto(path, modo_fecha, fecha_manual, hora_manual)
+        else:
+            return {"success": False, "msg": "❌ Ruta no válida."}
+
+    def _procesar_archivo_auto(self, input_path, modo_fecha, fecha_manual, hora_manual,
+                               fechas_actuales=None, reintentar=True):
+        tipo = tipo_por_extension(input_path)
+        if tipo is None:
+            ext = os.path.splitext(input_path)[1].lower()
+            return {"success": False, "msg": f"❌ Extensión no soportada: {ext}"}
+        return self.procesar_archivo(input_path, tipo, modo_fecha, fecha_manual, hora_manual,
+                                     fechas_actuales=fechas_actuales, reintentar=reintentar)
+
+    def _procesar_carpeta_auto(self, folder_path, modo_fecha, fecha_manual, hora_manual,
+                               tipo_carpeta=None, recursivo=False, incluir=None, excluir=None):
+        pendientes = []
+
+        def descubrir():
+            for path in self._escanear_carpeta_auto(
+                    folder_path, tipo_carpeta, recursivo, incluir, excluir):
+                pendientes.append(path)
+                yield path
+        diario = self._crear_diario("auto", {
+            "path": folder_path, "modo_fecha": modo_fecha, "fecha_manual": fecha_manual,
+            "hora_manual": hora_manual, "tipo_carpeta": tipo_carpeta, "recursivo": recursivo,
+            "incluir": incluir, "excluir": excluir})
+        # En modo manual los resultados llegan por lote; se ordenan como la carpeta
+        try:
+            por_path = {res["path"]: res for res in self._iter_carpeta_auto(
+                descubrir(), modo_fecha, fecha_manual, hora_manual, diario=diario)}
+        except Exception:
+            if diario is not None:
+                diario.terminar("error")
+            raise
+        if diario is not None:
+            diario.terminar()
+        logs = []
+        count = 0
+        success = 0
+        omitidos = 0
+        for path in pendientes:
+            res = por_path[path]
+            logs.append(res.get("msg", ""))
+            if res.get("success"):
+                success += 1
+            if res.get("omitido"):
+                omitidos += 1
+            count += 1
+        logs.append(self._resumen(count, success, omitidos))
+        return {"success": True, "logs": logs}
+
+    @staticmethod
+    def _resumen(count, success, omitidos=0):
+        resumen = f"--- RESUMEN ---\nTotal de archivos procesados: {count}\nArchivos modificados exitosamente: {success}"
+        if omitidos:
+            resumen += f"\nArchivos omitidos (ya tenían la fecha): {omitidos}"
+        return resumen
+
+    @staticmethod
+    def _escanear_carpeta_auto(folder_path, tipo_carpeta=None, recursivo=False,
+                               incluir=None, excluir=None):
+        # Genera las rutas de medios de la carpeta a medida que se encuentran
+        tipos = (tipo_carpeta,) if tipo_carpeta in ("imagen", "video") else None
+        for encontrado in escanear_carpeta(folder_path, tipos, recursivo, incluir, excluir):
+            yield encontrado.path
+
+    def _iter_carpeta_auto(self, pendientes, modo_fecha, fecha_manual, hora_manual, cancelado=None,
+                           diario=None):
+        # Genera {path, success, msg} por archivo a medida que se procesan
+        try:
+            for res in self._iter_carpeta_auto_sin_diario(
+                    pendientes, modo_fecha, fecha_manual, hora_manual, cancelado, diario):
+                if diario is not None:
+                    self._anotar_en_diario(diario, res)
+                self._anotar_en_indice(res)
+                yield res
+        finally:
+            self._guardar_acciones_indice()
+
+    def _iter_carpeta_auto_sin_diario(self, pendientes, modo_fecha, fecha_manual, hora_manual,
+                                      cancelado=None, diario=None):
+        if modo_fecha == 'manual':
+            # Misma fecha para todos: se agrupan en pocos comandos exiftool
+            datetime_exif = f"{fecha_manual} {hora_manual or '12:00:00'}"
+            no_validos = []
+
+            def trabajos():
+                # Sin fecha o con una extensión desconocida no llegan a exiftool
+                for path in pendientes:
+                    tipo = tipo_por_extension(path)
+                    if not fecha_manual:
+                        no_validos.append((path, self._msg_sin_fecha_manual(path)))
+                    elif tipo is None:
+                        ext = os.path.splitext(path)[1].lower()
+                        no_validos.append((path, f"❌ Extensión no soportada: {ext}"))
+                    else:
+                        yield path, tipo, datetime_exif
+
+            def fallidos():
+                while no_validos:
+                    path, msg = no_validos.pop(0)
+                    yield {"path": path, "success": False, "msg": msg}
+
+            for path, tipo, error, omitido in self._iter_escrituras_agrupadas(
+                    trabajos(), cancelado, diario):
+                yield from fallidos()
+                if error:
+                    yield {"path": path, "success": False,
+                           "msg": f"❌ Error aplicando metadata: {error}"}
+                elif omitido:
+                    yield {"path": path, "success": True, "omitido": True,
+                           "msg": self._msg_omitido(path)}
+                else:
+                    yield {"path": path, "success": True, "datetime": datetime_exif,
+                           "msg": f"✓ Metadatos aplicados a {tipo}: {path}"}
+            yield from fallidos()
+            return
+
+        def procesar(par):
+            input_path, fechas_actuales = par
+            with tramo("archivo_auto", input_path):
+                res = self._procesar_archivo_auto(
+                    input_path, modo_fecha, fecha_manual, hora_manual, fechas_actuales,
+                    reintentar=False)
+            return dict(res, path=input_path)
+        yield from self._planificador.mapear(
+            procesar, self._con_fechas_actuales(pendientes, diario=diario),
+            en_error=lambda par, e: {
+                "path": par[0], "success": False,
+                "msg": f"❌ Error aplicando metadata: {str(e)}"},
+            cancelado=cancelado)
+
+    def _escribir_agrupado(self, trabajos):
+        """
+        Escribe fechas agrupando en un solo comando exiftool los archivos con
+        la misma fecha y tipo. trabajos: lista de (path, tipo_archivo, datetime_exif).
+        Returns:
+            dict: {path: None si se aplicó (u omitió), o el mensaje de error}.
+        """
+        return {path: error for path, _, error, _ in self._iter_escrituras_agrupadas(trabajos)}
+
+    def _iter_escrituras_agrupadas(self, trabajos, cancelado=None, diario=None):
+        # Genera (path, tipo_archivo, error o None, omitido) a medida que
+        # termina cada lote; los archivos que ya tienen la fecha no se escriben
+        omitidos = deque()
+
+        def lotes():
+            agrupador = AgrupadorEscrituras()
+            for (path, tipo, datetime_exif), fechas in self._con_fechas_actuales(
+                    trabajos, path_de=lambda trabajo: trabajo[0], diario=diario):
+                if fecha_ya_aplicada(fechas, datetime_exif, tipo):
+                    omitidos.append((path, tipo))
+                    continue
+                yield from agrupador.agregar(path, datetime_exif, tipo)
+            yield from agrupador.vaciar()
+
+        def escribir(lote):
+            with self._planificador.limite("metadata"), \
+                    tramo("lote_escritura", archivos=len(lote.paths)):
+                errores = cambiar_metadata_lote(
+                    lote.paths, lote.datetime_exif, lote.tipo_archivo, self.exiftool_path)
+            ocupados = [path for path, error in errores.items()
+                        if isinstance(error, str) and es_error_transitorio(error)]
+            # Salida ambigua: solo esos se aplican uno a uno (los parcheados
+            # sin exiftool ya están escritos)
+            for path in [path for path, error in errores.items() if error is SIN_CONFIRMAR]:
+                try:
+                    with self._planificador.limite("metadata"):
+                        if lote.tipo_archivo == "video":
+                            cambiar_metadata_video(path, lote.datetime_exif,
+                                                   self.exiftool_path, reintentar=False)
+                        else:
+                            cambiar_metadata_imagen(path, lote.datetime_exif,
+                                                    self.exiftool_path, reintentar=False)
+                    errores[path] = None
+                except ArchivoOcupado as e:
+                    errores[path] = str(e)
+                    ocupados.append(path)
+                except Exception as e:
+                    errores[path] = str(e)
+            if ocupados:
+                # Los bloqueados vuelven a la cola diferida como un lote aparte;
+                # lo que sí se escribió se entrega ya
+                bloqueados = set(ocupados)
+                hechos = [path for path in lote.paths if path not in bloqueados]
+                raise Diferir(errores[ocupados[0]], item=lote.parte(ocupados),
+                              parcial=(lote.parte(hechos), errores) if hechos else None)
+            return lote, errores
+
+        for lote, errores in self._planificador.mapear(
+                escribir, lotes(),
+                en_error=lambda lote, e: (lote, {path: str(e) for path in lote.paths}),
+                cancelado=cancelado):
+            while omitidos:
+                yield omitidos.popleft() + (None, True)
+            for path in lote.paths:
+                yield path, lote.tipo_archivo, errores[path], False
+        while omitidos:
+            yield omitidos.popleft() + (None, True)
+
+    def procesar_batch(self, archivos):
+        # Recibe lista de dicts: {path, fecha, hora, accion}
+        diario = self._crear_diario("batch", {"archivos": archivos})
+        try:
+            resultados = list(self._iter_batch(archivos, diario=diario))
+        except Exception:
+            if diario is not None:
+                diario.terminar("error")
+            raise
+        if diario is not None:
+            diario.terminar()
+        return resultados
+
+    def _iter_batch(self, archivos, cancelado=None, diario=None):
+        resultados = self._planificador.mapear(
+            self._procesar_item_batch_medido,
+            self._con_fechas_actuales(
+                archivos, path_de=lambda archivo: archivo.get("path"), diario=diario),
+            en_error=lambda par, e: self._con_id(par[0], {
+                "path": par[0].get("path"), "resultado": f"❌ Error: {str(e)}"}),
+            cancelado=cancelado)
+        try:
+            for res in resultados:
+                if diario is not None:
+                    self._anotar_en_diario(diario, res)
+                self._anotar_en_indice(res)
+                yield res
+        finally:
+            self._guardar_acciones_indice()
+
+    # --- Diario de batch: permite reanudar o revertir un proceso ---
+
+    def _crear_diario(self, tipo, parametros):
+        # Si no se puede crear el diario el batch sigue igual, sin él
+        if not self.usar_diario:
+            return None
+        try:
+            purgar_diarios()
+            return DiarioBatch.crear(tipo, parametros)
+        except Exception as e:
+            print("No se pudo crear el diario del batch:", e)
+            return None
+
+    @staticmethod
+    def _anotar_en_diario(diario, res):
+        path = res.get("path")
+        if res.get("omitido"):
+            diario.omitido(path)
+        elif res.get("success", str(res.get("resultado", "")).startswith("✓")):
+            diario.hecho(path, res.get("datetime"))
+        else:
+            diario.fallido(path, res.get("msg") or res.get("resultado"))
+
+    @staticmethod
+    def _terminar_diario(diario, trabajo):
+        if diario is None:
+            return
+        if trabajo.cancelado.is_set():
+            diario.terminar("cancelado")
+        else:
+            diario.terminar()
+
+    def listar_trabajos_guardados(self):
+        # Diarios guardados (más recientes primero) con sus contadores
+        resumenes = []
+        for diario_id in listar_diarios():
+            try:
+                resumenes.append(leer_diario(diario_id).resumen())
+            except (OSError, ValueError):
+                continue
+        return resumenes
+
+    def reanudar_trabajo(self, diario_id):
+        # Relanza un batch o carpeta interrumpido saltando lo ya completado
+        try:
+            estado = leer_diario(diario_id)
+        except OSError:
+            return {"success": False, "msg": "❌ Diario no encontrado."}
+        if not estado.reanudable:
+            return {"success": False, "msg": "El trabajo ya había terminado."}
+        completados = estado.completados()
+        diario = DiarioBatch.abrir(diario_id)
+        parametros = estado.parametros or {}
+        if estado.tipo_trabajo == "batch":
+            archivos = parametros.get("archivos")
+            if archivos is None and "lote" in parametros:
+                # Batch de un lote de la interfaz: el diario guarda sus columnas
+                from lote import LoteMedios
+                archivos = LoteMedios.desde_columnas(parametros["lote"]).archivos(
+                    parametros.get("cambios"))
+            archivos = [a for a in archivos or [] if a.get("path") not in completados]
+            return dict(self._lanzar_batch(archivos, diario), success=True,
+                        ya_completados=len(completados))
+        inicio = self._lanzar_auto(diario=diario, saltar=completados, **parametros)
+        return dict(inicio, ya_completados=len(completados))
+
+    def revertir_trabajo(self, diario_id):
+        # Devuelve a cada archivo modificado por el batch las fechas que tenía
+        try:
+            estado = leer_diario(diario_id)
+        except OSError:
+            return {"success": False, "msg": "❌ Diario no encontrado."}
+        pendientes = [(path, estado.originales.get(path))
+                      for path, datetime_exif in estado.hechos.items() if datetime_exif]
+
+        def revertir(par):
+            path, fechas = par
+            if not fechas:
+                return {"path": path, "success": False,
+                        "msg": f"❌ No se conocen las fechas originales: {path}"}
+            with self._planificador.limite("metadata"):
+                restaurar_fechas(path, fechas, self.exiftool_path)
+            self._anotar_en_indice({"path": path, "success": True}, "fechas_restauradas")
+            return {"path": path, "success": True, "msg": f"✓ Fechas restauradas: {path}"}
+
+        def ejecutar(trabajo):
+            count = 0
+            success = 0
+            for res in self._planificador.mapear(
+                    revertir, pendientes,
+                    en_error=lambda par, e: {"path": par[0], "success": False,
+                                             "msg": f"❌ Error restaurando fechas: {str(e)}"},
+                    cancelado=trabajo.cancelado):
+                trabajo.agregar(res)
+                success += 1 if res["success"] else 0
+                count += 1
+            self._guardar_acciones_indice()
+            return self._resumen(count, success)
+        return {"success": True,
+                "job_id": self._trabajos.iniciar(ejecutar, total=len(pendientes))}
+
+    def descartar_trabajo_guardado(self, diario_id):
+        return {"borrado": borrar_diario(diario_id)}
+
+    # --- Índice de medios: fechas conocidas de cada archivo (media_index) ---
+
+    def _indice_medios(self):
+        # Si no se puede abrir el índice todo sigue igual, sin él
+        if not self.usar_indice:
+            return None
+        with self._lock_indice:
+            if self._indice is None:
+                try:
+                    from media_index import IndiceMedios
+                    self._indice = IndiceMedios()
+                except Exception as e:
+                    print("Índice de medios no disponible:", e)
+                    self._indice = False
+        return self._indice or None
+
+    def _guardar_en_indice(self, paths, fechas):
+        indice = self._indice_medios()
+        if indice is None:
+            return
+        try:
+            indice.guardar_fechas(paths, fechas)
+        except Exception as e:
+            print("No se pudo actualizar el índice:", e)
+
+    def _anotar_en_indice(self, res, accion=None):
+        indice = self._indice_medios()
+        if indice is None or not res.get("path"):
+            return
+        if accion is None:
+            if res.get("omitido"):
+                accion = "omitido"
+            elif not res.get("success", str(res.get("resultado", "")).startswith("✓")):
+                accion = "error"
+            elif res.get("datetime"):
+                accion = "fecha_escrita"
+            else:
+                # Lo único que termina bien sin escribir fechas en el archivo
+                accion = "frame_extraido"
+        try:
+            indice.registrar_accion(res["path"], accion, res.get("datetime"),
+                                    res.get("msg") or res.get("resultado"))
+        except Exception as e:
+            print("No se pudo actualizar el índice:", e)
+
+    def _guardar_acciones_indice(self):
+        # Al terminar un batch: las acciones anotadas se guardan en una transacción
+        if not self._indice:
+            return
+        try:
+            self._indice.guardar_acciones()
+        except Exception as e:
+            print("No se pudo actualizar el índice:", e)
+
+    def indexar_carpeta(self, path, tipo_carpeta=None, recursivo=True, incluir=None,
+                        excluir=None, leer_fechas=True):
+        """
+        Pone al día el índice de una carpeta en segundo plano: recorre la
+        carpeta (solo se analizan los archivos nuevos o modificados) y lee
+        las fechas embebidas que faltan, por tandas.
+        Returns:
+            dict: {success, job_id}
+        """
+        indice = self._indice_medios()
+        if indice is None:
+            return {"success": False, "msg": "❌ Índice de medios no disponible."}
+        if not os.path.isdir(path):
+            return {"success": False, "msg": "❌ Carpeta no válida."}
+        tipos = (tipo_carpeta,) if tipo_carpeta in ("imagen", "video") else None
+
+        def leer(tanda):
+            with self._planificador.limite("metadata"):
+                fechas = leer_fechas_lote(tanda, self.exiftool_path)
+            indice.guardar_fechas(tanda, fechas)
+            return {"path": tanda[0], "archivos": len(tanda), "success": True,
+                    "msg": f"✓ Fechas leídas de {len(tanda)} archivos"}
+
+        def ejecutar(trabajo):
+            res = indice.sincronizar(path, tipos, recursivo, incluir, excluir, trabajo.cancelado)
+            trabajo.agregar(dict(res, path=path, success=True, msg=(
+                f"✓ Carpeta recorrida en {res['segundos']} s: {res['archivos']} archivos, "
+                f"{res['nuevos']} nuevos, {res['cambiados']} modificados, "
+                f"{res['borrados']} borrados")))
+            leidos = 0
+            if leer_fechas:
+                pendientes = indice.pendientes_de_leer(path, recursivo)
+                tandas = [pendientes[i:i + 200] for i in range(0, len(pendientes), 200)]
+                trabajo.total = 1 + len(tandas)
+                for parcial in self._planificador.mapear(
+                        leer, tandas,
+                        en_error=lambda tanda, e: {
+                            "path": tanda[0], "archivos": len(tanda), "success": False,
+                            "msg": f"❌ Error leyendo fechas: {str(e)}"},
+                        cancelado=trabajo.cancelado):
+                    trabajo.agregar(parcial)
+                    if parcial["success"]:
+                        leidos += parcial["archivos"]
+            resumen = indice.resumen(path)
+            return (f"--- ÍNDICE ---\nArchivos en el índice: {resumen['todos']}\n"
+                    f"Fechas leídas ahora: {leidos}\n"
+                    f"Sin fecha embebida: {resumen['sin_fecha']}\n"
+                    f"Fecha del nombre distinta a la embebida: {resumen['distinta']}")
+        return {"success": True, "job_id": self._trabajos.iniciar(ejecutar, total=1)}
+
+    def consultar_indice(self, consulta="todos", carpeta=None, desde=None, hasta=None,
+                         campo="actual", limite=500, desplazamiento=0):
+        """
+        Busca en el índice: 'sin_fecha', 'distinta' (fecha del nombre ≠
+        fecha embebida), 'sin_fecha_nombre', 'sin_leer' o 'todos', con un
+        rango de fechas opcional (AAAA:MM:DD). Ver IndiceMedios.consultar.
+        Returns:
+            dict: {total, filas} o {error}.
+        """
+        from media_index import CONSULTAS
+        indice = self._indice_medios()
+        if indice is None:
+            return {"error": "❌ Índice de medios no disponible."}
+        if consulta not in CONSULTAS:
+            return {"error": f"❌ Consulta no válida: {consulta}"}
+        return indice.consultar(consulta, carpeta, True, desde, hasta, campo,
+                                limite, desplazamiento)
+
+    def resumen_indice(self, carpeta=None):
+        # Cantidad de archivos de cada consulta, para la interfaz
+        indice = self._indice_medios()
+        if indice is None:
+            return {"error": "❌ Índice de medios no disponible."}
+        return indice.resumen(carpeta)
+
+    # --- Trabajos en segundo plano: la interfaz recibe resultados por partes ---
+
+    def iniciar_procesar_batch(self, archivos):
+        # Igual que procesar_batch pero devuelve un id de trabajo al instante
+        return self._lanzar_batch(archivos, self._crear_diario("batch", {"archivos": archivos}))
+
+    def _lanzar_batch(self, archivos, diario, total=None, compactar=None):
+        # `archivos` puede ser un iterable si se da `total`; `compactar(res)`,
+        # si se da, reduce cada resultado antes de guardarlo en el trabajo
+        # (ver lote.LoteMedios.anotar)
+        def ejecutar(trabajo):
+            try:
+                for res in self._iter_batch(archivos, trabajo.cancelado, diario):
+                    trabajo.agregar(compactar(res) if compactar else res)
+            except Exception:
+                if diario is not None:
+                    diario.terminar("error")
+                raise
+            self._terminar_diario(diario, trabajo)
+        if total is None:
+            total = len(archivos)
+        return {"job_id": self._trabajos.iniciar(ejecutar, total=total),
+                "diario_id": diario.id if diario is not None else None}
+
+    def iniciar_procesar_auto(self, path, modo_fecha, fecha_manual, hora_manual, tipo_carpeta=None,
+                              recursivo=False, incluir=None, excluir=None):
+        # Igual que procesar_auto pero devuelve un id de trabajo al instante
+        if not os.path.exists(path):
+            return {"success": False, "msg": "❌ Ruta no válida."}
+        parametros = {"path": path, "modo_fecha": modo_fecha, "fecha_manual": fecha_manual,
+                      "hora_manual": hora_manual, "tipo_carpeta": tipo_carpeta,
+                      "recursivo": recursivo, "incluir": incluir, "excluir": excluir}
+        return self._lanzar_auto(diario=self._crear_diario("auto", parametros), **parametros)
+
+    def _lanzar_auto(self, path, modo_fecha, fecha_manual, hora_manual, tipo_carpeta=None,
+                     recursivo=False, incluir=None, excluir=None, diario=None, saltar=()):
+        if os.path.isdir(path):
+            escaneo = True
+        elif os.path.isfile(path):
+            escaneo = False
+        else:
+            return {"success": False, "msg": "❌ Ruta no válida."}
+
+        def ejecutar(trabajo):
+            def pendientes():
+                # La carpeta se recorre mientras se procesa; el total se
+                # conoce recién al terminar el recorrido
+                if not escaneo:
+                    if path not in saltar:
+                        yield path
+                    return
+                encontrados = 0
+                for encontrado in self._escanear_carpeta_auto(
+                        path, tipo_carpeta, recursivo, incluir, excluir):
+                    if encontrado in saltar:
+                        continue
+                    encontrados += 1
+                    yield encontrado
+                trabajo.total = encontrados
+
+            count = 0
+            success = 0
+            omitidos = 0
+            try:
+                for res in self._iter_carpeta_auto(
+                        pendientes(), modo_fecha, fecha_manual, hora_manual,
+                        trabajo.cancelado, diario):
+                    trabajo.agregar(res)
+                    if res.get("success"):
+                        success += 1
+                    if res.get("omitido"):
+                        omitidos += 1
+                    count += 1
+            except Exception:
+                if diario is not None:
+                    diario.terminar("error")
+                raise
+            self._terminar_diario(diario, trabajo)
+            return self._resumen(count, success, omitidos)
+        return {"success": True,
+                "job_id": self._trabajos.iniciar(ejecutar, total=None if escaneo else 1),
+                "diario_id": diario.id if diario is not None else None}
+
+    def vigilar_carpeta(self, path, modo_fecha, fecha_manual, hora_manual, tipo_carpeta=None,
+                        recursivo=False, incluir=None, excluir=None, asentamiento=2.0,
+                        sondeo=None, procesar_existentes=False):
+        """
+        Modo vigilancia: un trabajo en segundo plano que procesa los archivos
+        que llegan a la carpeta (igual que procesar_auto) hasta que se cancela.
+        Solo se procesan archivos nuevos o modificados, una vez que terminaron
+        de copiarse; las fechas que escribe el propio trabajo no lo disparan.
+        Returns:
+            dict: {success, job_id, metodo ('inotify' o 'sondeo')}
+        """
+        if not os.path.isdir(path):
+            return {"success": False, "msg": "❌ Carpeta no válida."}
+        tipos = (tipo_carpeta,) if tipo_carpeta in ("imagen", "video") else None
+        observador = ObservadorCarpeta(path, tipos, recursivo, incluir, excluir,
+                                       asentamiento=asentamiento, sondeo=sondeo,
+                                       procesar_existentes=procesar_existentes)
+
+        def ejecutar(trabajo):
+            count = 0
+            success = 0
+            omitidos = 0
+            try:
+                while not trabajo.cancelado.is_set():
+                    listos = observador.esperar_listos(timeout=1.0)
+                    if not listos:
+                        continue
+                    for res in self._iter_carpeta_auto(
+                            listos, modo_fecha, fecha_manual, hora_manual, trabajo.cancelado):
+                        observador.marcar_procesado(res["path"])
+                        trabajo.agregar(res)
+                        if res.get("success"):
+                            success += 1
+                        if res.get("omitido"):
+                            omitidos += 1
+                        count += 1
+            finally:
+                observador.cerrar()
+            return self._resumen(count, success, omitidos)
+        return {"success": True, "job_id": self._trabajos.iniciar(ejecutar),
+                "metodo": observador.metodo}
+
+    def estado_trabajo(self, job_id, cursor=0):
+        # Progreso, velocidad, ETA y resultados nuevos desde `cursor`
+        trabajo = self._trabajos.obtener(job_id)
+        if trabajo is None:
+            return {"id": job_id, "error": "Trabajo no encontrado", "terminado": True}
+        return trabajo.estado(cursor)
+
+    def cancelar_trabajo(self, job_id):
+        return {"cancelado": self._trabajos.cancelar(job_id)}
+
+    def _procesar_item_batch_medido(self, par):
+        with tramo("archivo_batch", par[0].get("path")):
+            return self._con_id(par[0], self._procesar_item_batch(*par))
+
+    @staticmethod
+    def _con_id(archivo, res):
+        # Los archivos de un lote de la interfaz traen su id de fila
+        if "id" in archivo:
+            res["id"] = archivo["id"]
+        return res
+
+    def _procesar_item_batch(self, archivo, fechas_actuales=None):
+        path = archivo.get("path")
+        fecha = archivo.get("fecha")
+        hora = archivo.get("hora")
+        accion = archivo.get("accion", "modificar_imagen")
+        base = os.path.splitext(os.path.basename(path))[0]
+        aplicada = None
+        try:
+            # Si la fecha está vacía, usar la fecha actual
+            if not fecha:
+                fecha = datetime.now().strftime('%Y:%m:%d')
+                hora = datetime.now().strftime('%H:%M:%S')
+            # Si la hora está vacía pero la fecha existe, usar hora por defecto
+            if fecha and (not hora or hora.strip() == ""):
+                hora = "12:00:00"
+            datetime_exif = f"{fecha} {hora}"
+            tipo = EXTENSIONES_BATCH.get(os.path.splitext(path)[1].lower())
+            # Extraer un frame no toca el video: la fecha que ya tenga no cuenta
+            if not (tipo == "video" and accion == "extraer_frame") and \
+                    fecha_ya_aplicada(fechas_actuales, datetime_exif, tipo):
+                return {"path": path, "resultado": self._msg_omitido(path), "omitido": True}
+            if tipo == "imagen":
+                try:
+                    with self._planificador.limite("metadata"):
+                        cambiar_metadata_imagen(
+                            path, datetime_exif, self.exiftool_path, reintentar=False)
+                    res = f"✓ Metadatos aplicados a imagen: {path}"
+                    aplicada = datetime_exif
+                except ArchivoOcupado:
+                    raise
+                except Exception as e:
+                    res = f"❌ Error metadatos imagen: {str(e)}"
+            elif tipo == "video":
+                # Si la acción es solo extraer frame, NO modificar el video original
+                if accion == "extraer_frame":
+                    try:
+                        # Guardar el frame en el mismo directorio del video de entrada
+                        output_dir = os.path.dirname(path)
+                        if not os.path.exists(output_dir):
+                            os.makedirs(output_dir)
+                        output_img = os.path.join(
+                            output_dir, f"{base}.jpg")
+                        # Un solo paso: el JPEG sale de ffmpeg y se guarda ya
+                        # con las fechas EXIF, sin pasar por exiftool
+                        with self._planificador.limite("ffmpeg"):
+                            extraer_frame_con_fecha(
+                                path, output_img, datetime_exif, self.ffmpeg_path)
+                        res = f"✓ Frame extraído y metadatos aplicados: {output_img}"
+                    except ArchivoOcupado:
+                        raise
+                    except Exception as e:
+                        res = f"❌ Error extrayendo frame: {str(e)}"
+                else:
+                    video_error = None
+                    try:
+                        with self._planificador.limite("metadata"):
+                            cambiar_metadata_video(
+                                path, datetime_exif, self.exiftool_path, reintentar=False)
+                        res = f"✓ Metadatos aplicados a video: {path}"
+                        aplicada = datetime_exif
+                    except ArchivoOcupado:
+                        raise
+                    except Exception as e:
+                        video_error = str(e)
+                        res = f"⚠️ No se pudieron modificar los metadatos del video: {video_error}"
+            else:
+                res = f"Tipo de archivo no soportado: {path}"
+        except ArchivoOcupado:
+            # Archivo bloqueado: el planificador lo reintenta más tarde
+            raise
+        except Exception as e:
+            res = f"❌ Error: {str(e)}"
+        resultado = {"path": path, "resultado": res}
+        if aplicada:
+            resultado["datetime"] = aplicada
+        return resultado
+
+    # --- Métricas por etapa (ver metricas) ---
+
+    def obtener_metricas(self, path=None):
+        """
+        Histogramas por etapa (n, media, p50/p95/p99 en ms) y contadores como
+        los reintentos de exiftool; con `path`, además los tramos de ese archivo.
+        """
+        resumen = metricas().resumen()
+        resumen["reintentos"] = self._planificador.estadisticas_reintentos()
+        if path is not None:
+            resumen["tramos"] = metricas().tramos_de(path)
+        return resumen
+
+    def exportar_metricas(self, formato="chrome", destino=None):
+        """
+        Guarda las métricas: 'chrome' para abrir en chrome://tracing o
+        Perfetto, 'json' para el resumen con todos los tramos.
+        Returns:
+            dict: {"path": archivo guardado} o {"error": mensaje}.
+        """
+        try:
+            if destino is None:
+                carpeta = os.path.join(directorio_usuario('datos'), 'metricas')
+                os.makedirs(carpeta, exist_ok=True)
+                sufijo = ".trace.json" if formato == "chrome" else ".json"
+                destino = os.path.join(
+                    carpeta, time.strftime("metricas-%Y%m%d-%H%M%S") + sufijo)
+            return {"path": metricas().exportar(destino, formato)}
+        except OSError as e:
+            return {"error": f"❌ No se pudieron guardar las métricas: {e}"}
+
+    def reiniciar_metricas(self):
+        metricas().reiniciar()
+        return {"reiniciado": True}
+
+    # --- Uso sin interfaz (scripts y línea de comandos) ---
+
+    def escanear(self, rutas, tipo=None, recursivo=False, incluir=None, excluir=None):
+        """
+        Rutas de medios a partir de archivos y carpetas mezclados; las
+        carpetas se recorren con los filtros dados.
+        Yields:
+            str: ruta de cada archivo, a medida que se encuentra.
+        """
+        for ruta in rutas:
+            if os.path.isdir(ruta):
+                yield from self._escanear_carpeta_auto(ruta, tipo, recursivo, incluir, excluir)
+            elif os.path.isfile(ruta):
+                yield ruta
+            else:
+                print(f"❌ Ruta no válida: {ruta}", file=sys.stderr)
+
+    def planificar(self, pendientes, modo_fecha, fecha_manual, hora_manual, accion="escribir"):
+        """
+        Simulación (dry-run) de la escritura de fechas: qué fecha recibiría
+        cada archivo y si se omitiría porque ya la tiene. No escribe nada.
+        Args:
+            accion (str): 'escribir' (fechas en el archivo) o 'extraer_frame'
+                (un JPEG junto a cada video; el video no se toca, así que no
+                se omite aunque ya tenga la fecha).
+        Yields:
+            dict: {path, tipo, datetime, accion} con accion 'escribir',
+            'omitir', 'sin_fecha', 'extraer_frame' (con `destino`) o
+            'no_soportado'.
+        """
+        extraer = accion == "extraer_frame"
+        pares = (((path, None) for path in pendientes) if extraer
+                 else self._con_fechas_actuales(pendientes))
+        for path, fechas in pares:
+            tipo = tipo_por_extension(path)
+            if modo_fecha == 'manual':
+                fecha, hora = fecha_manual, hora_manual
+            else:
+                fecha, hora = extract_datetime_from_filename(path)
+            datetime_exif = f"{fecha} {hora or '12:00:00'}" if fecha else None
+            if tipo is None or (extraer and tipo != "video"):
+                decision = "no_soportado"
+            elif extraer:
+                # Sin fecha se usa la actual, como al extraer de verdad
+                yield {"path": path, "tipo": tipo, "datetime": datetime_exif,
+                       "accion": "extraer_frame",
+                       "destino": os.path.splitext(path)[0] + ".jpg"}
+                continue
+            elif datetime_exif is None:
+                decision = "sin_fecha"
+            elif fecha_ya_aplicada(fechas, datetime_exif, tipo):
+                decision = "omitir"
+            else:
+                decision = "escribir"
+            yield {"path": path, "tipo": tipo, "datetime": datetime_exif, "accion": decision}
+
+    def esperar_trabajo(self, job_id, intervalo=0.2):
+        """
+        Sigue un trabajo en segundo plano hasta que termine.
+        Yields:
+            dict: cada resultado en cuanto está disponible.
+        """
+        cursor = 0
+        while True:
+            estado = self.estado_trabajo(job_id, cursor)
+            for res in estado.get("resultados", []):
+                yield res
+            cursor = estado.get("cursor", cursor)
+            if estado.get("terminado"):
+                return
+            time.sleep(intervalo)
+
+    def cerrar(self):
+        # Cancela los trabajos y termina los procesos exiftool
+        self._trabajos.cancelar_todos()
+        self._planificador.cerrar()
+        cerrar_pool()
+        if self._indice:
+            self._indice.cerrar()
+
+
+# --- Línea de comandos ---
+
+def _salida(res, json_lines):
+    if json_lines:
+        print(json.dumps(res, ensure_ascii=False), flush=True)
+    else:
+        print(res.get("msg") or res.get("resultado") or res, flush=True)
+
+
+def _fallo(res):
+    if "success" in res:
+        return not res["success"]
+    return "resultado" in res and not str(res["resultado"]).startswith("✓")
+
+
+def _argumentos():
+    import argparse
+    from media_index import CONSULTAS
+    # Las opciones generales valen antes o después del comando
+    generales = argparse.ArgumentParser(add_help=False, argument_default=argparse.SUPPRESS)
+    generales.add_argument("--json", action="store_true",
+                           help="una línea JSON por archivo (JSON Lines)")
+    generales.add_argument("--workers-metadata", type=int,
+                           help="escrituras de metadatos en paralelo")
+    generales.add_argument("--workers-ffmpeg", type=int,
+                           help="extracciones de frames en paralelo")
+    generales.add_argument("--exiftool", help="ruta de exiftool")
+    generales.add_argument("--ffmpeg", help="ruta de ffmpeg")
+    generales.add_argument("--traza", metavar="ARCHIVO",
+                           help="guarda los tiempos por etapa en formato de trazas de Chrome")
+    parser = argparse.ArgumentParser(
+        prog="python -m media_engine", parents=[generales],
+        description="Editor de fechas de fotos y videos sin interfaz gráfica.")
+    parser.set_defaults(json=False, workers_metadata=None, workers_ffmpeg=None,
+                        exiftool=None, ffmpeg=None, traza=None)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    def filtros(p):
+        p.add_argument("rutas", nargs="+", help="archivos o carpetas")
+        p.add_argument("-r", "--recursivo", action="store_true")
+        p.add_argument("--tipo", choices=("imagen", "video"), default=None)
+        p.add_argument("--incluir", action="append", default=None, metavar="GLOB")
+        p.add_argument("--excluir", action="append", default=None, metavar="GLOB")
+
+    def fecha(p):
+        p.add_argument("--fecha", default=None,
+                       help="AAAA:MM:DD para todos; sin ella se usa la del nombre")
+        p.add_argument("--hora", default=None, help="HH:MM:SS (por defecto 12:00:00)")
+        p.add_argument("--dry-run", action="store_true",
+                       help="muestra lo que se haría sin modificar archivos")
+        p.add_argument("--no-omitir", action="store_true",
+                       help="reescribe también los archivos que ya tienen la fecha")
+        p.add_argument("--sin-diario", action="store_true",
+                       help="no guarda el diario para reanudar/revertir")
+        p.add_argument("--sin-indice", action="store_true",
+                       help="no actualiza el índice de medios")
+
+    filtros(comandos.add_parser("escanear", parents=[generales], help="lista los medios encontrados"))
+    filtros(comandos.add_parser("fechas", parents=[generales], help="fecha y hora extraídas del nombre"))
+    p = comandos.add_parser("aplicar", parents=[generales], help="escribe la fecha en los metadatos")
+    filtros(p)
+    fecha(p)
+    p = comandos.add_parser("frames", parents=[generales], help="extrae un frame de cada video con su fecha")
+    filtros(p)
+    fecha(p)
+    p = comandos.add_parser("vigilar", parents=[generales],
+                            help="procesa los archivos que van llegando a una carpeta")
+    p.add_argument("carpeta")
+    p.add_argument("-r", "--recursivo", action="store_true")
+    p.add_argument("--tipo", choices=("imagen", "video"), default=None)
+    p.add_argument("--incluir", action="append", default=None, metavar="GLOB")
+    p.add_argument("--excluir", action="append", default=None, metavar="GLOB")
+    p.add_argument("--fecha", default=None,
+                   help="AAAA:MM:DD para todos; sin ella se usa la del nombre")
+    p.add_argument("--hora", default=None, help="HH:MM:SS (por defecto 12:00:00)")
+    p.add_argument("--no-omitir", action="store_true",
+                   help="reescribe también los archivos que ya tienen la fecha")
+    p.add_argument("--asentamiento", type=float, default=2.0, metavar="SEGUNDOS",
+                   help="tiempo sin cambios para dar un archivo por copiado")
+    p.add_argument("--sondeo", action="store_true",
+                   help="revisa la carpeta periódicamente en vez de usar inotify")
+    p.add_argument("--existentes", action="store_true",
+                   help="procesa también los archivos que ya estaban en la carpeta")
+    p = comandos.add_parser("indexar", parents=[generales],
+                            help="pone al día el índice de medios de una carpeta")
+    filtros(p)
+    p.add_argument("--sin-fechas", action="store_true",
+                   help="solo recorre la carpeta, sin leer las fechas embebidas")
+    p = comandos.add_parser("consultar", parents=[generales], help="busca en el índice de medios")
+    p.add_argument("consulta", choices=tuple(CONSULTAS))
+    p.add_argument("carpeta", nargs="?", default=None)
+    p.add_argument("--desde", default=None, help="AAAA:MM:DD (inclusive)")
+    p.add_argument("--hasta", default=None, help="AAAA:MM:DD (inclusive)")
+    p.add_argument("--por-nombre", action="store_true",
+                   help="el rango se aplica a la fecha del nombre en vez de la embebida")
+    p.add_argument("--limite", type=int, default=1000)
+    comandos.add_parser("diarios", parents=[generales], help="lista los batch guardados")
+    p = comandos.add_parser("reanudar", parents=[generales], help="continúa un batch interrumpido")
+    p.add_argument("diario_id")
+    p = comandos.add_parser("revertir", parents=[generales], help="restaura las fechas que cambió un batch")
+    p.add_argument("diario_id")
+    return parser.parse_args()
+
+
+def main():
+    args = _argumentos()
+    if args.comando in ("escanear", "fechas"):
+        # No hace falta el motor (ni exiftool) para leer nombres y carpetas
+        for ruta in args.rutas:
+            if os.path.isdir(ruta):
+                archivos = ((e.path, e.tipo) for e in escanear_carpeta(
+                    ruta, (args.tipo,) if args.tipo else None, args.recursivo,
+                    args.incluir, args.excluir))
+            else:
+                archivos = [(ruta, tipo_por_extension(ruta))]
+            for path, tipo in archivos:
+                if args.comando == "escanear":
+                    res = {"path": path, "tipo": tipo, "msg": path}
+                else:
+                    fecha, hora = extract_datetime_from_filename(path)
+                    res = {"path": path, "fecha": fecha, "hora": hora,
+                           "msg": f"{path} -> fecha: {fecha}, hora: {hora}"}
+                _salida(res, args.json)
+        return 0
+    if args.comando == "consultar":
+        from media_index import IndiceMedios
+        indice = IndiceMedios()
+        try:
+            res = indice.consultar(args.consulta, args.carpeta, True, args.desde, args.hasta,
+                                   "nombre" if args.por_nombre else "actual", args.limite)
+        finally:
+            indice.cerrar()
+        for fila in res["filas"]:
+            _salida(dict(fila, msg=(
+                f"{fila['path']}  nombre: {fila['fecha_nombre'] or '-'} "
+                f"{fila['hora_nombre'] or ''}  actual: {fila['fecha_actual'] or '-'}")),
+                args.json)
+        if not args.json:
+            print(f"{len(res['filas'])} de {res['total']} archivos", file=sys.stderr)
+        return 0
+
+    motor = MotorMedios(args.exiftool or buscar_ejecutable('exiftool'),
+                        args.ffmpeg or buscar_ejecutable('ffmpeg'),
+                        args.workers_metadata, args.workers_ffmpeg,
+                        usar_diario=not getattr(args, "sin_diario", False),
+                        usar_indice=not getattr(args, "sin_indice", False))
+    if getattr(args, "no_omitir", False):
+        motor.omitir_correctos = False
+    fallidos = 0
+    try:
+        if args.comando == "diarios":
+            for resumen in motor.listar_trabajos_guardados():
+                _salida(dict(resumen, msg=(
+                    f"{resumen['id']}  {resumen['tipo']}  {resumen['estado']}  "
+                    f"completados {resumen['completados']}/{resumen['planificados']}, "
+                    f"fallidos {resumen['fallidos']}, omitidos {resumen['omitidos']}")),
+                    args.json)
+            return 0
+        if args.comando in ("reanudar", "revertir"):
+            if args.comando == "reanudar":
+                inicio = motor.reanudar_trabajo(args.diario_id)
+            else:
+                inicio = motor.revertir_trabajo(args.diario_id)
+            if not inicio.get("job_id"):
+                _salida(inicio, args.json)
+                return 1
+            resultados = motor.esperar_trabajo(inicio["job_id"])
+        elif args.comando == "vigilar":
+            inicio = motor.vigilar_carpeta(
+                args.carpeta, "manual" if args.fecha else "extraida", args.fecha, args.hora,
+                args.tipo, args.recursivo, args.incluir, args.excluir, args.asentamiento,
+                sondeo=args.sondeo or None, procesar_existentes=args.existentes)
+            if not inicio.get("job_id"):
+                _salida(inicio, args.json)
+                return 1
+            print(f"Vigilando {args.carpeta} ({inicio['metodo']}), Ctrl+C para terminar",
+                  file=sys.stderr, flush=True)
+            resultados = motor.esperar_trabajo(inicio["job_id"], intervalo=1.0)
+        elif args.comando == "indexar":
+            resultados = _indexar(motor, args)
+        elif args.dry_run:
+            modo = "manual" if args.fecha else "extraida"
+            tipo = "video" if args.comando == "frames" else args.tipo
+            pendientes = motor.escanear(args.rutas, tipo, args.recursivo, args.incluir, args.excluir)
+            accion = "extraer_frame" if args.comando == "frames" else "escribir"
+            resultados = (dict(plan, msg=f"{plan['accion']}: {plan['path']} -> "
+                                         f"{plan.get('destino', plan['datetime'])}")
+                          for plan in motor.planificar(pendientes, modo, args.fecha, args.hora,
+                                                       accion))
+        elif args.comando == "frames":
+            archivos = []
+            for path in motor.escanear(args.rutas, "video", args.recursivo,
+                                       args.incluir, args.excluir):
+                fecha, hora = ((args.fecha, args.hora) if args.fecha
+                               else extract_datetime_from_filename(path))
+                archivos.append({"path": path, "fecha": fecha, "hora": hora,
+                                 "accion": "extraer_frame"})
+            diario = motor._crear_diario("batch", {"archivos": archivos})
+            resultados = motor.esperar_trabajo(motor._lanzar_batch(archivos, diario)["job_id"])
+        else:
+            resultados = _aplicar(motor, args)
+        for res in resultados:
+            _salida(res, args.json)
+            fallidos += _fallo(res)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        motor.cerrar()
+        if args.traza:
+            res = motor.exportar_metricas("chrome", args.traza)
+            print(res.get("error") or f"Traza guardada en {res['path']}", file=sys.stderr)
+    return 1 if fallidos else 0
+
+
+def _indexar(motor, args):
+    for ruta in args.rutas:
+        inicio = motor.indexar_carpeta(os.path.abspath(ruta), args.tipo, args.recursivo,
+                                       args.incluir, args.excluir, not args.sin_fechas)
+        if not inicio.get("job_id"):
+            yield dict(inicio, path=ruta)
+            continue
+        yield from motor.esperar_trabajo(inicio["job_id"])
+        resumen = motor.estado_trabajo(inicio["job_id"]).get("resumen")
+        if resumen:
+            print(resumen, file=sys.stderr)
+
+
+def _aplicar(motor, args):
+    # Un diario por ruta, con los mismos parámetros que guarda la interfaz,
+    # para poder reanudar cada una con `reanudar`
+    modo = "manual" if args.fecha else "extraida"
+    for ruta in map(os.path.abspath, args.rutas):
+        parametros = {"path": ruta, "modo_fecha": modo, "fecha_manual": args.fecha,
+                      "hora_manual": args.hora, "tipo_carpeta": args.tipo,
+                      "recursivo": args.recursivo, "incluir": args.incluir,
+                      "excluir": args.excluir}
+        pendientes = motor.escanear([ruta], args.tipo, args.recursivo, args.incluir, args.excluir)
+        diario = motor._crear_diario("auto", parametros)
+        try:
+            yield from motor._iter_carpeta_auto(
+                pendientes, modo, args.fecha, args.hora, diario=diario)
+        except BaseException:
+            # Cortado (Ctrl+C o error): el diario queda reanudable
+            if diario is not None:
+                diario.terminar("cancelado")
+            raise
+        if diario is not None:
+            diario.terminar()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,429 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from media_utils import directorio_usuario, parse_many, ETIQUETAS_FECHA
+from folder_scan import escanear_carpeta, tipo_por_extension
+
+# Consultas predefinidas sobre el índice (condición SQL de cada una)
+CONSULTAS = {
+    "todos": "1",
+    # Ya se leyeron sus metadatos y no tienen ninguna fecha embebida
+    "sin_fecha": "fechas_leidas = 1 AND fecha_actual IS NULL",
+    "sin_fecha_nombre": "fecha_nombre IS NULL",
+    # La fecha del nombre no coincide con la embebida (la hora solo se
+    # compara si el nombre la trae)
+    "distinta": ("fecha_nombre IS NOT NULL AND fecha_actual IS NOT NULL AND "
+                 "(substr(fecha_actual, 1, 10) != fecha_nombre OR "
+                 "(hora_nombre IS NOT NULL AND substr(fecha_actual, 12, 8) != hora_nombre))"),
+    "sin_leer": "fechas_leidas = 0",
+}
+
+# Acciones anotadas que se guardan juntas, en una transacción
+TANDA_ACCIONES = 200
+
+_COLUMNAS = ("path", "tipo", "size", "mtime_ns", "fecha_nombre", "hora_nombre", "fecha_actual",
+             "fechas", "fechas_leidas", "ultima_accion", "ultima_fecha", "ultima_msg",
+             "ultima_accion_en")
+
+
+def _fecha_principal(fechas, tipo):
+    # La fecha que se muestra como "actual": la de captura si existe
+    if not fechas:
+        return None
+    orden = (("CreateDate", "DateTimeOriginal", "ModifyDate") if tipo == "video"
+             else ("DateTimeOriginal", "CreateDate", "ModifyDate"))
+    for etiqueta in orden:
+        valor = fechas.get(etiqueta)
+        # exiftool informa las fechas vacías de QuickTime como 0000:00:00
+        if valor and not valor.startswith("0000"):
+            return valor[:19]
+    return None
+
+
+def _rango_carpeta(carpeta):
+    # Rango de paths bajo `carpeta` (incluidas subcarpetas) para usar el
+    # índice de la clave primaria: prefijo <= path < prefijo con el separador + 1
+    base = carpeta.rstrip(os.sep)
+    return base + os.sep, base + chr(ord(os.sep) + 1)
+
+
+class IndiceMedios:
+    """
+    Índice persistente (SQLite) de los medios vistos: tamaño y mtime_ns del
+    archivo, fecha/hora sacadas del nombre, las fechas embebidas (EXIF o
+    QuickTime) y la última acción aplicada. Se actualiza por cambios de stat:
+    un archivo con el mismo tamaño y mtime no se vuelve a analizar, así que
+    reabrir una biblioteca grande cuesta lo que un recorrido de la carpeta.
+    """
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(directorio_usuario('datos'), 'indice.sqlite3')
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._lock_acciones = threading.Lock()
+        self._acciones = []
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS medios (
+                path TEXT PRIMARY KEY,
+                carpeta TEXT NOT NULL,
+                tipo TEXT,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                fecha_nombre TEXT,
+                hora_nombre TEXT,
+                fecha_actual TEXT,
+                fechas TEXT,
+                fechas_leidas INTEGER NOT NULL DEFAULT 0,
+                ultima_accion TEXT,
+                ultima_fecha TEXT,
+                ultima_msg TEXT,
+                ultima_accion_en REAL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_medios_carpeta ON medios (carpeta)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_medios_fecha_actual ON medios (fecha_actual)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_medios_fecha_nombre ON medios (fecha_nombre)")
+        # Solo los que faltan leer: se mantiene chico aunque la tabla sea enorme
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_medios_sin_leer ON medios (path) "
+            "WHERE fechas_leidas = 0")
+        self._conn.commit()
+
+    # --- Actualización por stat ---
+
+    def _actualizar(self, entradas):
+        # entradas: [(path, st)] ya con su stat. Inserta los nuevos y
+        # reinicia los que cambiaron (nombre y fechas se vuelven a analizar);
+        # devuelve (nuevos, cambiados)
+        if not entradas:
+            return 0, 0
+        guardados = {}
+        paths = [path for path, _ in entradas]
+        for i in range(0, len(paths), 500):
+            parte = paths[i:i + 500]
+            guardados.update((fila[0], fila[1:]) for fila in self._conn.execute(
+                f"SELECT path, size, mtime_ns FROM medios WHERE path IN "
+                f"({','.join('?' * len(parte))})", parte))
+        cambiados = [(path, st) for path, st in entradas
+                     if guardados.get(path) != (st.st_size, st.st_mtime_ns)]
+        if not cambiados:
+            return 0, 0
+        nombres = parse_many([path for path, _ in cambiados])
+        self._conn.executemany("""
+            INSERT INTO medios (path, carpeta, tipo, size, mtime_ns, fecha_nombre, hora_nombre)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                size = excluded.size, mtime_ns = excluded.mtime_ns,
+                fecha_nombre = excluded.fecha_nombre, hora_nombre = excluded.hora_nombre,
+                fecha_actual = NULL, fechas = NULL, fechas_leidas = 0""",
+            [(path, os.path.dirname(path), tipo_por_extension(path), st.st_size,
+              st.st_mtime_ns, fecha or None, hora or None)
+             for (path, st), (fecha, hora) in zip(cambiados, nombres)])
+        nuevos = sum(1 for path, _ in cambiados if path not in guardados)
+        return nuevos, len(cambiados) - nuevos
+
+    def sincronizar(self, carpeta, tipos=None, recursivo=False, incluir=None, excluir=None,
+                    cancelado=None):
+        """
+        Pone al día el índice de una carpeta: agrega los archivos nuevos,
+        marca para releer los que cambiaron de tamaño o mtime y borra los
+        que ya no existen. No lee metadatos (ver pendientes_de_leer).
+        Returns:
+            dict: {archivos, nuevos, cambiados, borrados, sin_leer, segundos}
+        """
+        inicio = time.monotonic()
+        carpeta = os.path.abspath(carpeta)
+        nuevos = cambiados = archivos = 0
+        vistos = set()
+        tanda = []
+
+        def guardar():
+            with self._lock:
+                n, c = self._actualizar(tanda)
+                self._conn.commit()
+            tanda.clear()
+            return n, c
+
+        for encontrado in escanear_carpeta(carpeta, tipos, recursivo, incluir, excluir):
+            if cancelado is not None and cancelado.is_set():
+                break
+            try:
+                st = encontrado.stat()
+            except OSError:
+                continue
+            archivos += 1
+            vistos.add(encontrado.path)
+            tanda.append((encontrado.path, st))
+            if len(tanda) >= 5000:
+                n, c = guardar()
+                nuevos += n
+                cambiados += c
+        n, c = guardar()
+        nuevos += n
+        cambiados += c
+
+        borrados = 0
+        if cancelado is None or not cancelado.is_set():
+            # Los que no aparecieron: se borran solo si de verdad no existen
+            # (los que quedaron fuera por los filtros se conservan)
+            with self._lock:
+                if recursivo:
+                    guardados = self._conn.execute(
+                        "SELECT path FROM medios WHERE path >= ? AND path < ?",
+                        _rango_carpeta(carpeta)).fetchall()
+                else:
+                    guardados = self._conn.execute(
+                        "SELECT path FROM medios WHERE carpeta = ?", (carpeta,)).fetchall()
+            faltantes = [(path,) for path, in guardados
+                         if path not in vistos and not os.path.lexists(path)]
+            if faltantes:
+                with self._lock:
+                    self._conn.executemany("DELETE FROM medios WHERE path = ?", faltantes)
+                    self._conn.commit()
+                borrados = len(faltantes)
+        return {"archivos": archivos, "nuevos": nuevos, "cambiados": cambiados,
+                "borrados": borrados,
+                "sin_leer": len(self.pendientes_de_leer(carpeta, recursivo)),
+                "segundos": round(time.monotonic() - inicio, 3)}
+
+    def pendientes_de_leer(self, carpeta=None, recursivo=True, limite=None):
+        """Paths cuyas fechas embebidas faltan leer (nuevos o modificados)."""
+        self.guardar_acciones()
+        sql = "SELECT path FROM medios WHERE fechas_leidas = 0"
+        parametros = []
+        if carpeta is not None:
+            carpeta = os.path.abspath(carpeta)
+            if recursivo:
+                sql += " AND path >= ? AND path < ?"
+                parametros += _rango_carpeta(carpeta)
+            else:
+                sql += " AND carpeta = ?"
+                parametros.append(carpeta)
+        sql += " ORDER BY path"
+        if limite is not None:
+            sql += f" LIMIT {int(limite)}"
+        with self._lock:
+            return [path for path, in self._conn.execute(sql, parametros)]
+
+    def guardar_fechas(self, paths, fechas):
+        """
+        Guarda las fechas embebidas leídas con leer_fechas_lote. Los paths
+        que no aparecen en `fechas` quedan leídos y sin fecha (se releen
+        recién si el archivo cambia).
+        """
+        filas = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            leidas = fechas.get(path)
+            tipo = tipo_por_extension(path)
+            filas.append((path, os.path.dirname(path), tipo, st.st_size, st.st_mtime_ns,
+                          _fecha_principal(leidas, tipo),
+                          json.dumps(leidas) if leidas else None))
+        if not filas:
+            return
+        nombres = parse_many([fila[0] for fila in filas])
+        with self._lock:
+            # Si el archivo cambió desde el último recorrido, los datos del
+            # nombre se recalculan igual que en _actualizar
+            self._conn.executemany("""
+                INSERT INTO medios (path, carpeta, tipo, size, mtime_ns, fecha_actual, fechas,
+                                    fechas_leidas, fecha_nombre, hora_nombre)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size, mtime_ns = excluded.mtime_ns,
+                    fecha_actual = excluded.fecha_actual, fechas = excluded.fechas,
+                    fechas_leidas = 1,
+                    fecha_nombre = excluded.fecha_nombre, hora_nombre = excluded.hora_nombre""",
+                [fila + (fecha or None, hora or None) for fila, (fecha, hora) in zip(filas, nombres)])
+            self._conn.commit()
+
+    def registrar_accion(self, path, accion, datetime_exif=None, msg=None):
+        """
+        Anota la última acción aplicada a un archivo ('fecha_escrita',
+        'omitido', 'frame_extraido', 'fechas_restauradas' o 'error'). Con
+        'fecha_escrita' las fechas embebidas pasan a ser `datetime_exif`
+        sin volver a leer el archivo; tras otra escritura se releen.
+        Las acciones se juntan y se guardan de a TANDA_ACCIONES en una sola
+        transacción (ver guardar_acciones); las consultas y cerrar() guardan
+        antes las pendientes.
+        """
+        with self._lock_acciones:
+            self._acciones.append((path, accion, datetime_exif, msg, time.time()))
+            llena = len(self._acciones) >= TANDA_ACCIONES
+        if llena:
+            self.guardar_acciones()
+
+    def guardar_acciones(self):
+        """Guarda las acciones anotadas con registrar_accion que faltan guardar."""
+        with self._lock_acciones:
+            acciones, self._acciones = self._acciones, []
+        if not acciones:
+            return
+        filas = {}
+        for path, accion, datetime_exif, msg, cuando in acciones:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            tipo = tipo_por_extension(path)
+            fechas = None
+            if accion == "fecha_escrita" and datetime_exif and tipo in ETIQUETAS_FECHA:
+                fechas = dict.fromkeys(ETIQUETAS_FECHA[tipo] + ("FileModifyDate",), datetime_exif)
+            elif accion in ("omitido", "error"):
+                # No cambió nada: se conservan las fechas si el archivo sigue igual
+                fechas = False
+            # Si el mismo archivo aparece dos veces, la última acción manda
+            # (y si no cambió nada, conserva las fechas de la anterior)
+            anterior = filas.pop(path, None)
+            if fechas is False and anterior is not None:
+                fechas = anterior[2]
+            filas[path] = [tipo, st, fechas, accion, datetime_exif, msg, cuando]
+        if not filas:
+            return
+        nombres = dict(zip(filas, parse_many(list(filas))))
+        with self._lock:
+            # Fechas guardadas de los que no cambiaron, en pocas consultas
+            conservar = [path for path, fila in filas.items() if fila[2] is False]
+            guardadas = {}
+            for i in range(0, len(conservar), 500):
+                parte = conservar[i:i + 500]
+                guardadas.update((fila[0], fila[1:]) for fila in self._conn.execute(
+                    f"SELECT path, size, mtime_ns, fechas, fechas_leidas FROM medios "
+                    f"WHERE path IN ({','.join('?' * len(parte))})", parte))
+            valores = []
+            for path, (tipo, st, fechas, accion, datetime_exif, msg, cuando) in filas.items():
+                if fechas is False:
+                    guardada = guardadas.get(path)
+                    if guardada is not None and guardada[:2] == (st.st_size, st.st_mtime_ns):
+                        fechas = json.loads(guardada[2]) if guardada[2] else None
+                        leidas = guardada[3]
+                    else:
+                        fechas, leidas = None, 0
+                else:
+                    leidas = 1 if fechas else 0
+                fecha, hora = nombres[path]
+                valores.append(
+                    (path, os.path.dirname(path), tipo, st.st_size, st.st_mtime_ns,
+                     fecha or None, hora or None, _fecha_principal(fechas, tipo),
+                     json.dumps(fechas) if fechas else None, leidas, accion, datetime_exif, msg,
+                     cuando))
+            self._conn.executemany("""
+                INSERT INTO medios (path, carpeta, tipo, size, mtime_ns, fecha_nombre, hora_nombre,
+                                    fecha_actual, fechas, fechas_leidas, ultima_accion,
+                                    ultima_fecha, ultima_msg, ultima_accion_en)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    size = excluded.size, mtime_ns = excluded.mtime_ns,
+                    fecha_nombre = excluded.fecha_nombre, hora_nombre = excluded.hora_nombre,
+                    fecha_actual = excluded.fecha_actual, fechas = excluded.fechas,
+                    fechas_leidas = excluded.fechas_leidas,
+                    ultima_accion = excluded.ultima_accion, ultima_fecha = excluded.ultima_fecha,
+                    ultima_msg = excluded.ultima_msg, ultima_accion_en = excluded.ultima_accion_en""",
+                valores)
+            self._conn.commit()
+
+    # --- Consultas ---
+
+    def obtener(self, paths):
+        """
+        Filas vigentes de varios archivos: {path: fila} solo para los que no
+        cambiaron desde que se indexaron; los nuevos o modificados se
+        agregan al índice y aparecen con las fechas todavía sin leer.
+        """
+        self.guardar_acciones()
+        entradas = []
+        originales = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            absoluto = os.path.abspath(path)
+            originales[absoluto] = path
+            entradas.append((absoluto, st))
+        with self._lock:
+            self._actualizar(entradas)
+            self._conn.commit()
+            filas = {}
+            for i in range(0, len(entradas), 500):
+                parte = [path for path, _ in entradas[i:i + 500]]
+                for fila in self._conn.execute(
+                        f"SELECT {', '.join(_COLUMNAS)} FROM medios WHERE path IN "
+                        f"({','.join('?' * len(parte))})", parte):
+                    filas[originales[fila[0]]] = self._fila(fila)
+        return filas
+
+    @staticmethod
+    def _fila(fila):
+        datos = dict(zip(_COLUMNAS, fila))
+        datos["fechas"] = json.loads(datos["fechas"]) if datos["fechas"] else None
+        datos["fechas_leidas"] = bool(datos["fechas_leidas"])
+        return datos
+
+    def consultar(self, consulta="todos", carpeta=None, recursivo=True, desde=None, hasta=None,
+                  campo="actual", limite=1000, desplazamiento=0):
+        """
+        Busca en el índice.
+        Args:
+            consulta (str): una de CONSULTAS ('todos', 'sin_fecha',
+                'sin_fecha_nombre', 'distinta', 'sin_leer').
+            carpeta (str, opcional): limita a esa carpeta (y subcarpetas si
+                `recursivo`).
+            desde, hasta (str, opcional): rango de fechas AAAA:MM:DD
+                (inclusive) sobre la fecha embebida (campo='actual') o la
+                del nombre (campo='nombre').
+            limite, desplazamiento (int): paginado, ordenado por path.
+        Returns:
+            dict: {total, filas: [{path, tipo, size, fecha_nombre, ...}]}
+        """
+        if consulta not in CONSULTAS:
+            raise ValueError(f"Consulta no válida: {consulta}")
+        self.guardar_acciones()
+        condiciones = [CONSULTAS[consulta]]
+        parametros = []
+        if carpeta is not None:
+            carpeta = os.path.abspath(carpeta)
+            if recursivo:
+                condiciones.append("path >= ? AND path < ?")
+                parametros += _rango_carpeta(carpeta)
+            else:
+                condiciones.append("carpeta = ?")
+                parametros.append(carpeta)
+        columna = "fecha_nombre" if campo == "nombre" else "fecha_actual"
+        if desde:
+            condiciones.append(f"{columna} >= ?")
+            parametros.append(desde.replace("-", ":"))
+        if hasta:
+            # Inclusive: cualquier hora de ese día
+            condiciones.append(f"{columna} <= ?")
+            parametros.append(hasta.replace("-", ":") + " 99")
+        donde = " AND ".join(f"({c})" for c in condiciones)
+        with self._lock:
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM medios WHERE {donde}", parametros).fetchone()[0]
+            filas = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNAS)} FROM medios WHERE {donde} "
+                f"ORDER BY path LIMIT ? OFFSET ?",
+                parametros + [int(limite), int(desplazamiento)]).fetchall()
+        return {"total": total, "filas": [self._fila(fila) for fila in filas]}
+
+    def resumen(self, carpeta=None):
+        """Cantidad de archivos por consulta predefinida (para la interfaz)."""
+        return {consulta: self.consultar(consulta, carpeta, limite=0)["total"]
+                for consulta in CONSULTAS}
+
+    def cerrar(self):
+        self.guardar_acciones()
+        with self._lock:
+            self._conn.close()
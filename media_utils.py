@@ -1,13 +1,22 @@
 import os
 import sys
 import re
-from datetime import timedelta
+import json
+import mmap
+import time
+import shutil
+import tempfile
+import subprocess
+from datetime import datetime
+from functools import partial
+from operator import itemgetter
 
-try:
-    from persiantools.jdatetime import JalaliDate
-    PERSIAN = True
-except ImportError:
-    PERSIAN = False
+import jalali
+import quicktime_atoms
+from jpeg_exif import fechas_exif, posiciones_fechas, app1_fechas, insertar_app1
+from folder_scan import tipo_por_extension
+from metricas import tramo, contar, esperar_con_cpu
+from batch_engine import Diferir, PoliticaReintentos
 
 
 def is_persian_date(date_str):
@@ -31,19 +40,12 @@ def is_persian_date(date_str):
 
 
 def persian_date_to_gregorian(persian_date_str):
-    if not PERSIAN:
-        return None
-    try:
-        year = int(persian_date_str[:4])
-        month = int(persian_date_str[4:6])
-        day = int(persian_date_str[6:8])
-        gregorian_date = JalaliDate(year, month, day).to_gregorian()
-        if year == 1404 and month == 1:
-            adjusted_date = gregorian_date - timedelta(days=1)
-            return adjusted_date.strftime("%Y:%m:%d")
-        return gregorian_date.strftime("%Y:%m:%d")
-    except Exception:
-        return None
+    return jalali.cadena_a_exif(persian_date_str)
+
+
+def persian_dates_to_gregorian(persian_date_strs):
+    """Versión por lotes de persian_date_to_gregorian (mismo orden de entrada)."""
+    return jalali.convertir_lote(persian_date_strs)
 
 
 def gregorian_date_to_exif_format(gregorian_date_str):
@@ -56,72 +58,298 @@ def gregorian_date_to_exif_format(gregorian_date_str):
         return None
 
 
-def extract_datetime_from_filename(filename):
-    base = os.path.splitext(os.path.basename(filename))[0]
-    # Busca el patrón: cualquier cosa, guion bajo, 8 dígitos, guion bajo
-    match_custom = re.search(r'_(\d{8})_', base)
-    if match_custom:
-        date_str = match_custom.group(1)
-        if is_persian_date(date_str):
-            fecha = persian_date_to_gregorian(date_str)
-        else:
-            fecha = gregorian_date_to_exif_format(date_str)
-        hora = None
-        return fecha, hora
-    # Luego busca cualquier 8 dígitos en el nombre
-    match = re.search(r'(\d{8})', base)
-    if match:
-        date_str = match.group(1)
-        if is_persian_date(date_str):
-            fecha = persian_date_to_gregorian(date_str)
-        else:
-            fecha = gregorian_date_to_exif_format(date_str)
+def _fecha_desde_8_digitos(date_str):
+    # Atajo del caso más común: de 2000 a 2050 is_persian_date siempre da
+    # False (con 4 dígitos, comparar el texto equivale a comparar el número)
+    if "2000" <= date_str[:4] <= "2050":
+        return f"{date_str[:4]}:{date_str[4:6]}:{date_str[6:8]}"
+    if is_persian_date(date_str):
+        return persian_date_to_gregorian(date_str)
+    return gregorian_date_to_exif_format(date_str)
+
+
+_MESES = {'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04',
+          'May': '05', 'Jun': '06', 'Jul': '07', 'Aug': '08',
+          'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'}
+
+
+# Conversiones de las reglas a partir de los textos de sus grupos (ver
+# ReglaNombre.convertir_grupos); la versión con match solo los extrae
+
+class _Fechas8(dict):
+    """
+    (fecha, None) de cada cadena de 8 dígitos: las fechas se repiten mucho
+    entre fotos y _FECHAS_8[digitos] no abre un marco de Python si ya está.
+    Caben todos los días de 1300 a 1500 (persas) y de 1900 a 2100.
+    """
+    __slots__ = ()
+
+    def __missing__(self, digitos):
+        if len(self) >= 1 << 17:
+            self.clear()
+        resultado = self[digitos] = (_fecha_desde_8_digitos(digitos), None)
+        return resultado
+
+
+_FECHAS_8 = _Fechas8()
+_fecha_8_digitos = _FECHAS_8.__getitem__
+
+
+def _hora_6_digitos(grupos):
+    # El patrón ya separa hora, minutos y segundos en grupos de dos dígitos
+    return None, ":".join(grupos)
+
+
+def _fecha_hora_completa(grupos):
+    y, mo, d, h, mi, s = grupos
+    return f"{y}:{mo.zfill(2)}:{d.zfill(2)}", f"{h.zfill(2)}:{mi.zfill(2)}:{s.zfill(2)}"
+
+
+def _fecha_separada(grupos):
+    y, mo, d = grupos
+    return f"{y}:{mo.zfill(2)}:{d.zfill(2)}", None
+
+
+def _fecha_status(grupos):
+    mes, dia, anio = grupos
+    return f"{anio}:{_MESES.get(mes, '01')}:{dia.zfill(2)}", None
+
+
+def _hora_puntos(grupos):
+    h, mi, s = grupos
+    return None, f"{h.zfill(2)}:{mi.zfill(2)}:{s.zfill(2)}"
+
+
+def _con_grupos(convertir_grupos, un_grupo=False):
+    # convertir(match) a partir de convertir_grupos
+    if un_grupo:
+        return lambda m: convertir_grupos(m.group(1))
+    return lambda m: convertir_grupos(m.groups())
+
+
+class ReglaNombre:
+    """
+    Una regla del parser de nombres de archivo.
+    Args:
+        nombre (str): identificador de la regla.
+        patron (str): expresión regular (se compila una sola vez).
+        convertir (callable): convertir(match) -> (fecha, hora).
+        fecha (bool): si la regla asigna la fecha.
+        hora (bool): si la regla asigna la hora.
+        termina (bool): si al coincidir se devuelve el resultado sin
+            evaluar las reglas siguientes.
+        requiere (str, opcional): texto literal sin el cual el patrón no
+            puede coincidir (filtro rápido antes de la regex).
+        con_digito (bool): el patrón no puede coincidir sin algún dígito.
+        por_forma (bool): dónde coincide el patrón depende solo de qué
+            caracteres son dígitos, no de cuáles (usa \\d, nunca un dígito
+            concreto como '2' o [0-3]); ver _FORMA.
+        convertir_grupos (callable, opcional): como convertir, pero recibe
+            los textos de los grupos (el texto si hay un solo grupo, si no
+            una tupla, como operator.itemgetter). En reglas `por_forma` el
+            parser corta los grupos del nombre en las posiciones de su forma
+            sin volver a ejecutar la regex. Si se da, `convertir` puede ser
+            None.
+    """
+    __slots__ = ("nombre", "patron", "convertir", "fecha", "hora", "termina", "requiere",
+                 "con_digito", "por_forma", "convertir_grupos")
+
+    def __init__(self, nombre, patron, convertir, fecha=False, hora=False, termina=False,
+                 requiere="", con_digito=False, por_forma=False, convertir_grupos=None):
+        self.nombre = nombre
+        self.patron = re.compile(patron)
+        if convertir is None:
+            convertir = _con_grupos(convertir_grupos, self.patron.groups == 1)
+        self.convertir_grupos = convertir_grupos
+        # Texto que el patrón necesita sí o sí; si no está, ni se ejecuta la regex
+        self.requiere = requiere
+        self.con_digito = con_digito
+        self.por_forma = por_forma
+        self.convertir = convertir
+        self.fecha = fecha
+        self.hora = hora
+        self.termina = termina
+
+
+# Reglas en orden de prioridad. Las de fecha van primero (las posteriores
+# pueden sobrescribir la fecha de las anteriores); la primera regla de hora
+# que coincide termina el análisis.
+# Todas estas reglas necesitan un dígito y coinciden según la forma del nombre
+# (con_digito=True, por_forma=True)
+REGLAS_NOMBRE = [
+    # cualquier cosa, guion bajo, 8 dígitos, guion bajo (p. ej. IMG_20230115_...)
+    ReglaNombre("custom_8_digitos", r'_(\d{8})_', None,
+                fecha=True, hora=True, termina=True, requiere="_",
+                con_digito=True, por_forma=True, convertir_grupos=_fecha_8_digitos),
+    ReglaNombre("8_digitos", r'(\d{8})', None, fecha=True,
+                con_digito=True, por_forma=True, convertir_grupos=_fecha_8_digitos),
+    ReglaNombre("fecha_hora", r'(\d{4})[-_](\d{1,2})[-_](\d{1,2})[-_](\d{1,2})[.](\d{1,2})[.](\d{1,2})',
+                None, fecha=True, hora=True, termina=True, requiere=".",
+                con_digito=True, por_forma=True, convertir_grupos=_fecha_hora_completa),
+    ReglaNombre("fecha_separada", r'(\d{4})[-_](\d{1,2})[-_](\d{1,2})', None,
+                fecha=True, con_digito=True, por_forma=True, convertir_grupos=_fecha_separada),
+    # Estados de WhatsApp: Status_Jan_5_2023
+    ReglaNombre("whatsapp_status", r'Status_(\w{3})_(\d{1,2})_(\d{4})', None,
+                fecha=True, requiere="Status_", con_digito=True, por_forma=True,
+                convertir_grupos=_fecha_status),
+    ReglaNombre("hora_puntos", r'(\d{1,2})[.](\d{1,2})[.](\d{1,2})', None,
+                hora=True, termina=True, requiere=".", con_digito=True, por_forma=True,
+                convertir_grupos=_hora_puntos),
+    # Hora en los 6 primeros de 9 dígitos al final (mismo patrón que _(\d{9})$)
+    ReglaNombre("hora_9_digitos", r'_(\d\d)(\d\d)(\d\d)\d{3}$', None,
+                hora=True, termina=True, requiere="_", con_digito=True, por_forma=True,
+                convertir_grupos=_hora_6_digitos),
+    # También cubre el antiguo patrón '_(\d{6})-'
+    ReglaNombre("hora_6_digitos", r'_(\d\d)(\d\d)(\d\d)[-\.]', None,
+                hora=True, termina=True, requiere="_", con_digito=True, por_forma=True,
+                convertir_grupos=_hora_6_digitos),
+]
+
+_HAY_DIGITO = re.compile(r'\d')
+
+
+def _compilar_reglas():
+    # Tuplas planas: el bucle caliente no paga búsquedas de atributos
+    return tuple((r.requiere, r.patron.search, r.convertir, r.fecha, r.hora, r.termina)
+                 for r in REGLAS_NOMBRE)
+
+
+_REGLAS_COMPILADAS = _compilar_reglas()
+# Atajo sin regex para nombres sin dígitos: solo si ninguna regla puede coincidir sin uno
+_SOLO_CON_DIGITOS = all(r.con_digito for r in REGLAS_NOMBRE)
+
+# Forma de un nombre ASCII (en bytes, que se traducen mucho más rápido que
+# un str): cada dígito pasa a '0'. Con reglas `por_forma`,
+# qué reglas coinciden y en qué posición es igual para todos los nombres con
+# la misma forma (IMG_20230115_101500 e IMG_20191231_235959 comparten
+# IMG_00000000_000000), así que el recorrido de las reglas se hace una vez
+# por forma (_PLANES). Los grupos de esas reglas también caen en las mismas
+# posiciones, así que para cada nombre solo se cortan esos textos y se
+# convierten, sin regex (o con la regex anclada en su posición, si la regla
+# no tiene convertir_grupos). Los planes son la única cache por nombre: un
+# memo por nombre costaba más al llenarse de lo que ahorraba en frío.
+_FORMA = bytes.maketrans(b"123456789", b"000000000")
+_MAX_PLANES = 1 << 14
+_PLANES = {}
+_POR_FORMA = all(r.por_forma for r in REGLAS_NOMBRE)
+
+
+def registrar_regla(regla, antes_de=None):
+    """
+    Agrega una regla al parser (p. ej. un nuevo formato de cámara o app).
+    Args:
+        regla (ReglaNombre): la regla nueva.
+        antes_de (str, opcional): nombre de la regla delante de la que se
+            inserta; si no se da, va al final.
+    """
+    if antes_de is None:
+        REGLAS_NOMBRE.append(regla)
     else:
-        fecha = None
-    match2 = re.search(
-        r'(\d{4})[-_](\d{1,2})[-_](\d{1,2})[-_](\d{1,2})[.](\d{1,2})[.](\d{1,2})', base)
-    if match2:
-        y, m, d, h, mi, s = match2.groups()
-        fecha = f"{y}:{m.zfill(2)}:{d.zfill(2)}"
-        hora = f"{h.zfill(2)}:{mi.zfill(2)}:{s.zfill(2)}"
-        return fecha, hora
-    match3 = re.search(r'(\d{4})[-_](\d{1,2})[-_](\d{1,2})', base)
-    if match3:
-        y, m, d = match3.groups()
-        fecha = f"{y}:{m.zfill(2)}:{d.zfill(2)}"
-    match4 = re.search(r'Status_(\w{3})_(\d{1,2})_(\d{4})', base)
-    if match4:
-        month_dict = {'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04',
-                      'May': '05', 'Jun': '06', 'Jul': '07', 'Aug': '08',
-                      'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'}
-        month = month_dict.get(match4.group(1), '01')
-        day = match4.group(2).zfill(2)
-        year = match4.group(3)
-        fecha = f"{year}:{month}:{day}"
-    match_hora = re.search(r'(\d{1,2})[.](\d{1,2})[.](\d{1,2})', base)
-    if match_hora:
-        h, mi, s = match_hora.groups()
-        hora = f"{h.zfill(2)}:{mi.zfill(2)}:{s.zfill(2)}"
-        return fecha, hora
-    match_hora2 = re.search(r'_(\d{9})$', base)
-    if match_hora2:
-        t = match_hora2.group(1)
-        hora = f"{t[:2]}:{t[2:4]}:{t[4:6]}"
-        return fecha, hora
-    match_hora3 = re.search(r'_(\d{6})[-\.]', base)
-    if match_hora3:
-        t = match_hora3.group(1)
-        hora = f"{t[:2]}:{t[2:4]}:{t[4:6]}"
+        nombres = [r.nombre for r in REGLAS_NOMBRE]
+        REGLAS_NOMBRE.insert(nombres.index(antes_de), regla)
+    global _REGLAS_COMPILADAS, _SOLO_CON_DIGITOS, _POR_FORMA
+    _REGLAS_COMPILADAS = _compilar_reglas()
+    _SOLO_CON_DIGITOS = all(r.con_digito for r in REGLAS_NOMBRE)
+    _POR_FORMA = all(r.por_forma for r in REGLAS_NOMBRE)
+    limpiar_cache_nombres()
+
+
+def limpiar_cache_nombres():
+    """Vacía las caches del parser de nombres (planes por forma y fechas)."""
+    _FECHAS_8.clear()
+    _PLANES.clear()
+
+
+def _planificar(forma):
+    # Las reglas que deciden el resultado para esta forma:
+    # [(extraer, convertir, es_fecha, es_hora), ...] donde convertir(extraer(nombre))
+    # da (fecha, hora); extraer corta los grupos o ejecuta la regex anclada
+    forma = forma.decode()
+    plan = []
+    for regla in REGLAS_NOMBRE:
+        if regla.requiere not in forma:
+            continue
+        m = regla.patron.search(forma)
+        if m is None:
+            continue
+        if regla.convertir_grupos is not None:
+            grupos = [slice(*m.span(i)) for i in range(1, regla.patron.groups + 1)]
+            plan.append((itemgetter(*grupos), regla.convertir_grupos, regla.fecha, regla.hora))
+        else:
+            plan.append((partial(regla.patron.match, pos=m.start()), regla.convertir,
+                         regla.fecha, regla.hora))
+        if regla.termina:
+            break
+    return tuple(plan)
+
+
+def _parse_nombre(base):
+    fecha = None
+    hora = None
+    if _POR_FORMA and base.isascii():
+        forma = base.encode().translate(_FORMA)
+        plan = _PLANES.get(forma)
+        if plan is None:
+            if len(_PLANES) >= _MAX_PLANES:
+                _PLANES.clear()
+            plan = _PLANES[forma] = _planificar(forma)
+        for extraer, convertir, es_fecha, es_hora in plan:
+            f, h = convertir(extraer(base))
+            if es_fecha:
+                fecha = f
+            if es_hora:
+                hora = h
         return fecha, hora
-    match_hora4 = re.search(r'_(\d{6})-', base)
-    if match_hora4:
-        t = match_hora4.group(1)
-        hora = f"{t[:2]}:{t[2:4]}:{t[4:6]}"
+    if _SOLO_CON_DIGITOS and not _HAY_DIGITO.search(base):
         return fecha, hora
-    hora = None
+    for requiere, buscar, convertir, es_fecha, es_hora, termina in _REGLAS_COMPILADAS:
+        if requiere not in base:
+            continue
+        m = buscar(base)
+        if m is None:
+            continue
+        f, h = convertir(m)
+        if es_fecha:
+            fecha = f
+        if es_hora:
+            hora = h
+        if termina:
+            return fecha, hora
     return fecha, hora
 
 
+_SEP = os.sep
+_ALTSEP = os.altsep
+
+
+def _nombre_sin_extension(path):
+    # Igual que os.path.splitext(os.path.basename(path))[0], sin sus llamadas extra
+    i = path.rfind(_SEP)
+    if _ALTSEP:
+        i = max(i, path.rfind(_ALTSEP))
+    nombre = path[i + 1:]
+    punto = nombre.rfind('.')
+    if punto > 0:
+        base = nombre[:punto]
+        # Los puntos iniciales no separan extensión ('..jpg' no tiene)
+        if base[0] != '.' or base.lstrip('.'):
+            return base
+    return nombre
+
+
+def extract_datetime_from_filename(filename):
+    return _parse_nombre(_nombre_sin_extension(filename))
+
+
+def parse_many(paths):
+    """
+    Extrae (fecha, hora) de muchos nombres de archivo de una vez.
+    Returns:
+        list: [(fecha, hora), ...] en el mismo orden que `paths`.
+    """
+    return [_parse_nombre(_nombre_sin_extension(p)) for p in paths]
+
+
 def get_bin_path(filename):
     if getattr(sys, 'frozen', False):
         base_path = sys._MEIPASS
@@ -130,29 +358,95 @@ def get_bin_path(filename):
     return os.path.join(base_path, 'bin', filename)
 
 
+def buscar_ejecutable(nombre):
+    """
+    Ruta de una herramienta externa ('ffmpeg', 'exiftool'): primero la de la
+    carpeta bin del proyecto y si no existe la que esté en el PATH.
+    """
+    path = get_bin_path(f"{nombre}.exe")
+    if os.path.exists(path):
+        return path
+    return shutil.which(nombre) or path
+
+
+def directorio_usuario(tipo='cache'):
+    """
+    Carpeta por usuario para datos de la aplicación ('cache' o 'datos'),
+    por ejemplo %LOCALAPPDATA%/EditorMetadatos/cache en Windows o
+    ~/.cache/editor-metadatos en Linux. Se crea si no existe.
+    """
+    if sys.platform == "win32":
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        path = os.path.join(base, 'EditorMetadatos', tipo)
+    elif sys.platform == "darwin":
+        base = os.path.expanduser('~/Library/Caches' if tipo == 'cache'
+                                  else '~/Library/Application Support')
+        path = os.path.join(base, 'EditorMetadatos')
+    else:
+        variable, defecto = (('XDG_CACHE_HOME', '~/.cache') if tipo == 'cache'
+                             else ('XDG_DATA_HOME', '~/.local/share'))
+        base = os.environ.get(variable) or os.path.expanduser(defecto)
+        path = os.path.join(base, 'editor-metadatos')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
 def get_creationflags():
-    import sys
-    import subprocess
     if sys.platform == "win32":
         return getattr(subprocess, "CREATE_NO_WINDOW", 0)
     return 0
 
 
+def _motor_async():
+    # El motor asyncio de la interfaz (async_engine), si está activo. Se mira
+    # en sys.modules para no importar asyncio en la línea de comandos
+    modulo = sys.modules.get("async_engine")
+    return modulo.motor_activo() if modulo is not None else None
+
+
+def ejecutar_exiftool(exiftool_path, args):
+    """
+    Ejecuta exiftool con los argumentos dados (sin el ejecutable).
+    Si hay un pool persistente activo (ver exiftool_pool) el comando se envía
+    a uno de sus procesos; si no, se lanza un proceso nuevo como antes.
+    Returns:
+        subprocess.CompletedProcess: con returncode, stdout y stderr.
+    """
+    # Import local: exiftool_pool importa este módulo
+    from exiftool_pool import pool_activo
+    # El tramo se asocia al archivo cuando el comando es de uno solo
+    path = args[-1] if args and not args[-1].startswith("-") else None
+    with tramo("exiftool", path) as t:
+        pool = pool_activo(exiftool_path)
+        if pool is not None:
+            result = pool.ejecutar(args)
+            if getattr(result, "cpu_s", None) is not None:
+                t["cpu_ms"] = round(result.cpu_s * 1000, 3)
+        elif _motor_async() is not None:
+            # Con la interfaz abierta el proceso pasa por el motor asyncio,
+            # con su límite de procesos exiftool y su tiempo máximo
+            result = _motor_async().ejecutar_sync("exiftool", [exiftool_path] + list(args))
+            result.stdout = result.stdout.decode('utf-8', errors='replace')
+            result.stderr = result.stderr.decode('utf-8', errors='replace')
+        else:
+            result = subprocess.run([exiftool_path] + list(args), capture_output=True,
+                                    text=True, creationflags=get_creationflags())
+        t["returncode"] = result.returncode
+    return result
+
+
 def process_image(input_path, datetime_exif, exiftool_path=None):
-    import subprocess
-    flags = get_creationflags()
     if exiftool_path is None:
         exiftool_path = get_bin_path('exiftool.exe')
     if datetime_exif:
-        result = subprocess.run([
-            exiftool_path,
+        result = ejecutar_exiftool(exiftool_path, [
             f"-AllDates={datetime_exif}",
             f"-FileModifyDate={datetime_exif}",
             "-overwrite_original",
             "-P",
             "-api", "QuickTimeUTC=1",
             input_path
-        ], capture_output=True, text=True, creationflags=flags)
+        ])
         if result.returncode != 0:
             print("Exiftool error:", result.stderr)
             raise RuntimeError(f"Exiftool falló: {result.stderr}")
@@ -160,99 +454,352 @@ def process_image(input_path, datetime_exif, exiftool_path=None):
 
 
 def process_video(input_path, output_path, datetime_exif, exiftool_path=None, ffmpeg_path=None):
-    import subprocess
     flags = get_creationflags()
     if ffmpeg_path is None:
         ffmpeg_path = get_bin_path('ffmpeg.exe')
+    if os.path.splitext(output_path)[1].lower() in (".jpg", ".jpeg"):
+        # Frame JPEG: las fechas se insertan al escribirlo, sin exiftool
+        return extraer_frame_con_fecha(input_path, output_path, datetime_exif, ffmpeg_path)
     if exiftool_path is None:
         exiftool_path = get_bin_path('exiftool.exe')
-    subprocess.run([
+    comando = [
         ffmpeg_path, "-y", "-i", input_path,
         "-vframes", "1", "-q:v", "1", output_path
-    ], check=True, creationflags=flags)
+    ]
+    with tramo("ffmpeg_frame", input_path) as t:
+        proceso = subprocess.Popen(comando, creationflags=flags)
+        try:
+            returncode, cpu = esperar_con_cpu(proceso)
+        except BaseException:
+            proceso.kill()
+            proceso.wait()
+            raise
+        if cpu is not None:
+            t["cpu_ms"] = round(cpu * 1000, 3)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, comando)
     if datetime_exif:
-        result = subprocess.run([
-            exiftool_path,
+        result = ejecutar_exiftool(exiftool_path, [
             f"-AllDates={datetime_exif}",
             f"-FileModifyDate={datetime_exif}",
             "-overwrite_original",
             "-P",
             "-api", "QuickTimeUTC=1",
             output_path
-        ], capture_output=True, text=True, creationflags=flags)
+        ])
         if result.returncode != 0:
             print("Exiftool error:", result.stderr)
             raise RuntimeError(f"Exiftool falló: {result.stderr}")
     return True
 
 
-def cambiar_metadata_imagen(input_path, datetime_exif, exiftool_path=None):
+def _ffmpeg_a_memoria(comando):
+    # Corre ffmpeg leyendo su salida por stdout; devuelve
+    # (bytes, returncode, stderr, segundos de CPU o None)
+    # stderr a un archivo: leyendo solo stdout no hay riesgo de bloqueo
+    with tempfile.TemporaryFile() as errores:
+        proceso = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=errores,
+                                   creationflags=get_creationflags())
+        try:
+            salida = proceso.stdout.read()
+            proceso.stdout.close()
+            returncode, cpu = esperar_con_cpu(proceso)
+        except BaseException:
+            proceso.kill()
+            proceso.wait()
+            raise
+        errores.seek(0)
+        mensaje = errores.read().decode('utf-8', errors='replace')
+    return salida, returncode, mensaje, cpu
+
+
+def _leer_umask():
+    # En Linux se lee sin tocarla; si no, se cambia y se restaura una sola
+    # vez al importar el módulo, antes de que haya hilos creando archivos
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("Umask:"):
+                    return int(linea.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+# La umask es del proceso: nunca se cambia mientras corren los batch
+_UMASK = _leer_umask()
+
+
+def _modo_archivo_nuevo(path):
+    # Permisos que tendría `path` escrito con open(): los del archivo que se
+    # reemplaza o 0o666 menos la umask (mkstemp crea los temporales con 0o600)
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+def extraer_frame_con_fecha(input_path, output_path, datetime_exif, ffmpeg_path=None):
+    """
+    Extrae el primer frame de un video como JPEG con las fechas EXIF ya
+    puestas, en una sola pasada: ffmpeg codifica el frame (mismo codificador
+    y calidad -q:v 1 que antes) hacia un pipe, se le agrega el APP1 con las
+    fechas y el archivo se escribe una vez, de forma atómica (archivo
+    temporal + os.replace) y con la fecha de modificación ya fijada.
+    Args:
+        input_path (str): video de entrada.
+        output_path (str): JPEG de salida; se reemplaza si existe.
+        datetime_exif (str | None): 'AAAA:MM:DD HH:MM:SS'; sin fecha el frame
+            se guarda tal cual.
+        ffmpeg_path (str, opcional): ruta a ffmpeg.
+    Returns:
+        bool: True si la operación fue exitosa, lanza excepción si falla.
+    """
+    if ffmpeg_path is None:
+        ffmpeg_path = get_bin_path('ffmpeg.exe')
+    mtime = None
+    if datetime_exif:
+        if not _FORMATO_DATETIME.match(datetime_exif):
+            raise ValueError(f"Fecha inválida: {datetime_exif}")
+        mtime = time.mktime(time.strptime(datetime_exif, "%Y:%m:%d %H:%M:%S"))
+    comando = [
+        ffmpeg_path, "-v", "error", "-i", input_path,
+        "-frames:v", "1", "-q:v", "1", "-f", "image2pipe", "-c:v", "mjpeg", "pipe:1"
+    ]
+    with tramo("ffmpeg_frame", input_path) as t:
+        motor = _motor_async()
+        if motor is not None:
+            # Con la interfaz abierta: límite de procesos ffmpeg y tiempo
+            # máximo del motor asyncio (sin medición de CPU)
+            result = motor.ejecutar_sync("ffmpeg", comando)
+            jpeg, returncode = result.stdout, result.returncode
+            mensaje = result.stderr.decode('utf-8', errors='replace')
+        else:
+            jpeg, returncode, mensaje, cpu = _ffmpeg_a_memoria(comando)
+            if cpu is not None:
+                t["cpu_ms"] = round(cpu * 1000, 3)
+        t["bytes"] = len(jpeg)
+    if returncode != 0 or not jpeg:
+        raise RuntimeError(f"ffmpeg falló: {mensaje.strip() or returncode}")
+    if datetime_exif:
+        jpeg = insertar_app1(jpeg, app1_fechas(datetime_exif))
+    carpeta, nombre = os.path.split(os.path.abspath(output_path))
+    fd, temporal = tempfile.mkstemp(dir=carpeta, prefix=f".{nombre}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(jpeg)
+        os.chmod(temporal, _modo_archivo_nuevo(output_path))
+        if mtime is not None:
+            os.utime(temporal, (time.time(), mtime))
+        os.replace(temporal, output_path)
+    except BaseException as e:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        if isinstance(e, PermissionError):
+            # Destino abierto por otro programa (Windows): se reintenta más tarde
+            raise ArchivoOcupado(f"No se pudo reemplazar {output_path}: {e}") from e
+        raise
+    return True
+
+
+# Mensajes de exiftool de archivos bloqueados por otro proceso (sincronización
+# en la nube, antivirus, el explorador generando miniaturas...): suelen
+# resolverse solos, así que se reintentan en vez de fallar
+ERRORES_TRANSITORIOS = (
+    "Error renaming temporary file",
+    "GetFileTime error",
+    "Permission denied",
+    "being used by another process",
+    "Sharing violation",
+)
+
+# Reintentos de las llamadas sueltas (fuera de un batch), que sí esperan
+_POLITICA_REINTENTOS = PoliticaReintentos(intentos=4)
+
+
+class ArchivoOcupado(Diferir):
+    """El archivo está bloqueado o todavía no existe; conviene reintentar más tarde."""
+
+
+def es_error_transitorio(mensaje):
+    """Errores de acceso/rename de exiftool que suelen resolverse reintentando."""
+    return any(error in mensaje for error in ERRORES_TRANSITORIOS)
+
+
+def _fallo_exiftool(stderr):
+    # Único punto donde se decide si un error de exiftool se reintenta o no
+    if es_error_transitorio(stderr):
+        raise ArchivoOcupado(f"Archivo ocupado por otro proceso: {stderr.strip()}")
+    print("Exiftool error:", stderr)
+    raise RuntimeError(f"Exiftool falló: {stderr}")
+
+
+def _con_reintentos(fn, *args):
+    # Versión bloqueante de los reintentos del planificador, para un solo archivo
+    for intento in range(_POLITICA_REINTENTOS.intentos):
+        try:
+            return fn(*args, reintentar=False)
+        except ArchivoOcupado:
+            if intento + 1 >= _POLITICA_REINTENTOS.intentos:
+                raise
+            contar("reintentos_exiftool")
+            time.sleep(_POLITICA_REINTENTOS.espera(intento))
+
+
+# EXIF_NATIVO=0 fuerza que todas las escrituras pasen por exiftool
+ESCRITURA_NATIVA = os.environ.get("EXIF_NATIVO", "1") != "0"
+
+_FORMATO_DATETIME = re.compile(r'^\d{4}:\d{2}:\d{2} \d{2}:\d{2}:\d{2}$')
+
+
+def cambiar_fecha_jpeg_nativo(input_path, datetime_exif):
+    """
+    Escribe la fecha en un JPEG sin exiftool: sobrescribe en su lugar los
+    campos ModifyDate, DateTimeOriginal y CreateDate que ya existen (mismo
+    largo, el archivo no se copia) y luego fija la fecha de modificación
+    del archivo, como hace exiftool con -FileModifyDate.
+    Returns:
+        bool: True si se escribió; False si el archivo no se puede tratar así
+        con seguridad (no es JPEG, faltan campos, tiene XMP/IPTC...) y hay
+        que usar exiftool. No modifica nada cuando devuelve False.
+    """
+    if not ESCRITURA_NATIVA or not datetime_exif or not _FORMATO_DATETIME.match(datetime_exif):
+        return False
+    if os.path.splitext(input_path)[1].lower() not in (".jpg", ".jpeg"):
+        return False
+    try:
+        mtime = time.mktime(time.strptime(datetime_exif, "%Y:%m:%d %H:%M:%S"))
+    except (ValueError, OverflowError):
+        return False
+    valor = datetime_exif.encode('ascii') + b'\x00'
+    try:
+        with open(input_path, 'r+b') as f:
+            st = os.fstat(f.fileno())
+            if st.st_size == 0:
+                return False
+            with mmap.mmap(f.fileno(), 0) as datos:
+                posiciones = posiciones_fechas(datos)
+                if posiciones is None:
+                    return False
+                for pos in posiciones:
+                    datos[pos:pos + 20] = valor
+                datos.flush()
+        os.utime(input_path, (st.st_atime, mtime))
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def cambiar_fecha_video_nativo(video_path, datetime_exif):
+    """
+    Escribe la fecha en un MP4/MOV sin exiftool: sobrescribe en su lugar las
+    fechas de creación y modificación de las cajas mvhd, tkhd y mdhd (solo
+    se leen los encabezados de las cajas, nunca el contenido de mdat) y
+    luego fija la fecha de modificación del archivo.
+    Si las pistas tienen fechas propias, distintas de las del mvhd, solo se
+    escribe el mvhd (como -AllDates): el diario guarda únicamente las fechas
+    del mvhd y con ellas no se podrían restaurar las de las pistas.
+    Como con `-api QuickTimeUTC=1`, `datetime_exif` es hora local y se
+    guarda en UTC.
+    Returns:
+        bool: True si se escribió; False si el formato no se puede tratar así
+        (AVI, MKV, WebM, moov comprimido, XMP...) y hay que usar exiftool.
+    """
+    if not ESCRITURA_NATIVA or not datetime_exif or not _FORMATO_DATETIME.match(datetime_exif):
+        return False
+    if os.path.splitext(video_path)[1].lower() not in (".mp4", ".mov", ".m4v", ".3gp"):
+        return False
+    try:
+        segundos = int(time.mktime(time.strptime(datetime_exif, "%Y:%m:%d %H:%M:%S")))
+    except (ValueError, OverflowError):
+        return False
+    try:
+        with open(video_path, 'r+b') as f:
+            st = os.fstat(f.fileno())
+            campos = quicktime_atoms.campos_fecha(f, st.st_size)
+            if campos is None:
+                return False
+            if not quicktime_atoms.fechas_uniformes(f, campos):
+                campos = campos[:1]
+            quicktime_atoms.escribir_fechas(f, campos, segundos)
+        os.utime(video_path, (st.st_atime, segundos))
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def cambiar_fecha_nativo(path, datetime_exif):
+    """Escritura sin exiftool según la extensión (JPEG o MP4/MOV)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jpg", ".jpeg"):
+        return cambiar_fecha_jpeg_nativo(path, datetime_exif)
+    return cambiar_fecha_video_nativo(path, datetime_exif)
+
+
+def cambiar_metadata_imagen(input_path, datetime_exif, exiftool_path=None, reintentar=True):
     """
     Cambia la metadata (fecha/hora) de una imagen usando exiftool.
     Args:
         input_path (str): Ruta al archivo de imagen original.
         datetime_exif (str): Fecha y hora en formato 'YYYY:MM:DD HH:MM:SS'.
         exiftool_path (str, opcional): Ruta a exiftool.exe. Si no se proporciona, se busca automáticamente.
+        reintentar (bool): si el archivo está ocupado, reintenta acá con espera
+            exponencial. Con False hace un solo intento y lanza ArchivoOcupado,
+            para que el planificador del batch lo reintente sin frenar al resto.
     Returns:
         bool: True si la operación fue exitosa, lanza excepción si falla.
     """
-    import subprocess
-    import time
-    flags = get_creationflags()
     if exiftool_path is None:
         exiftool_path = get_bin_path('exiftool.exe')
-    # Espera hasta que el archivo exista y esté liberado
-    intentos = 0
-    max_intentos = 10
-    while not os.path.exists(input_path) and intentos < max_intentos:
-        time.sleep(0.1)
-        intentos += 1
-    # Reintenta aplicar metadatos hasta 3 veces si hay error de acceso
-    for retry in range(3):
-        try:
-            if datetime_exif:
-                result = subprocess.run([
-                    exiftool_path,
-                    f"-AllDates={datetime_exif}",
-                    f"-FileModifyDate={datetime_exif}",
-                    "-overwrite_original",
-                    "-P",
-                    input_path
-                ], capture_output=True, text=True, creationflags=flags)
-                if result.returncode != 0:
-                    # Si es error de acceso/rename, espera y reintenta
-                    if ("Error renaming temporary file" in result.stderr or
-                        "GetFileTime error" in result.stderr or
-                            "Permission denied" in result.stderr):
-                        time.sleep(0.5)
-                        continue
-                    print("Exiftool error:", result.stderr)
-                    raise RuntimeError(f"Exiftool falló: {result.stderr}")
-            return True
-        except Exception as e:
-            if retry < 2:
-                time.sleep(0.5)
-                continue
-            raise
+    if reintentar:
+        return _con_reintentos(cambiar_metadata_imagen, input_path, datetime_exif, exiftool_path)
+    # Un archivo que todavía no existe (p. ej. un frame recién extraído) se
+    # trata como ocupado: se vuelve a intentar más tarde
+    if not os.path.exists(input_path):
+        raise ArchivoOcupado(f"El archivo todavía no existe: {input_path}")
+    # Caso más común (JPEG con las fechas ya presentes): se parchea sin exiftool
+    with tramo("escritura_nativa", input_path) as t:
+        t["aplicada"] = cambiar_fecha_jpeg_nativo(input_path, datetime_exif)
+    if t["aplicada"]:
+        return True
+    if datetime_exif:
+        result = ejecutar_exiftool(exiftool_path, [
+            f"-AllDates={datetime_exif}",
+            f"-FileModifyDate={datetime_exif}",
+            "-overwrite_original",
+            "-P",
+            input_path
+        ])
+        if result.returncode != 0:
+            _fallo_exiftool(result.stderr)
     return True
 
 
-def cambiar_metadata_video(video_path, datetime_exif, exiftool_path=None):
+def cambiar_metadata_video(video_path, datetime_exif, exiftool_path=None, reintentar=True):
     """
     Cambia la metadata (fecha/hora) de un video directamente usando exiftool.
     Args:
         video_path (str): Ruta al archivo de video.
         datetime_exif (str): Fecha y hora en formato 'YYYY:MM:DD HH:MM:SS'.
         exiftool_path (str, opcional): Ruta a exiftool.exe. Si no se proporciona, se busca automáticamente.
+        reintentar (bool): como en cambiar_metadata_imagen.
     Returns:
         bool: True si la operación fue exitosa, lanza excepción si falla.
     """
-    import subprocess
-    flags = get_creationflags()
     if exiftool_path is None:
         exiftool_path = get_bin_path('exiftool.exe')
+    if reintentar:
+        return _con_reintentos(cambiar_metadata_video, video_path, datetime_exif, exiftool_path)
+    # MP4/MOV: se parchean las cajas de fecha sin reescribir el archivo
+    with tramo("escritura_nativa", video_path) as t:
+        t["aplicada"] = cambiar_fecha_video_nativo(video_path, datetime_exif)
+    if t["aplicada"]:
+        return True
     args = [
-        exiftool_path,
         f"-AllDates={datetime_exif}",
         f"-FileModifyDate={datetime_exif}",
         "-overwrite_original",
@@ -260,9 +807,243 @@ def cambiar_metadata_video(video_path, datetime_exif, exiftool_path=None):
         "-api", "QuickTimeUTC=1",
         video_path
     ]
-    result = subprocess.run(args, capture_output=True,
-                            text=True, creationflags=flags)
+    result = ejecutar_exiftool(exiftool_path, args)
+    if result.returncode != 0:
+        _fallo_exiftool(result.stderr)
+    return True
+
+
+def restaurar_fechas(path, fechas, exiftool_path=None):
+    """
+    Vuelve a poner las fechas que tenía un archivo antes de un batch (las
+    que devolvió leer_fechas_lote). Las etiquetas que no existían se borran.
+    Returns:
+        bool: True si se aplicó, lanza excepción si falla.
+    """
+    tipo = tipo_por_extension(path) or "imagen"
+    etiquetas = ETIQUETAS_FECHA[tipo]
+    valores = {fechas.get(e) for e in etiquetas}
+    archivo = fechas.get("FileModifyDate")
+    if len(valores) == 1 and None not in valores and cambiar_fecha_nativo(path, valores.pop()):
+        # Todas las fechas eran iguales: basta la escritura nativa
+        if archivo:
+            mtime = time.mktime(time.strptime(archivo, "%Y:%m:%d %H:%M:%S"))
+            os.utime(path, (os.stat(path).st_atime, mtime))
+        return True
+    if exiftool_path is None:
+        exiftool_path = get_bin_path('exiftool.exe')
+    args = [f"-{e}={fechas.get(e) or ''}" for e in etiquetas]
+    if archivo:
+        args.append(f"-FileModifyDate={archivo}")
+    args += ["-overwrite_original", "-P"] + list(OPCIONES_EXIFTOOL[tipo]) + [path]
+    result = ejecutar_exiftool(exiftool_path, args)
     if result.returncode != 0:
         print("Exiftool error:", result.stderr)
         raise RuntimeError(f"Exiftool falló: {result.stderr}")
     return True
+
+
+# Opciones extra de exiftool según el tipo de archivo (forman parte de la
+# clave de agrupación: solo se juntan en un comando escrituras idénticas)
+OPCIONES_EXIFTOOL = {
+    "imagen": (),
+    "video": ("-api", "QuickTimeUTC=1"),
+}
+
+
+def _errores_por_archivo(stderr, paths):
+    """
+    Asocia cada línea 'Error: <mensaje> - <archivo>' de exiftool con su archivo.
+    Returns:
+        dict: {path: mensaje} solo para los archivos con error.
+    """
+    por_nombre = {}
+    for path in paths:
+        por_nombre[path] = path
+        por_nombre[path.replace('\\', '/')] = path
+    errores = {}
+    for linea in stderr.splitlines():
+        if not linea.startswith("Error"):
+            continue
+        mensaje, sep, nombre = linea.rpartition(" - ")
+        if sep and nombre.strip() in por_nombre:
+            errores[por_nombre[nombre.strip()]] = linea
+    return errores
+
+
+# Etiquetas que escribe -AllDates y que deben coincidir para omitir un archivo.
+# En los videos (QuickTime) no existe DateTimeOriginal.
+ETIQUETAS_FECHA = {
+    "imagen": ("DateTimeOriginal", "CreateDate", "ModifyDate"),
+    "video": ("CreateDate", "ModifyDate"),
+}
+
+
+def _fechas_jpeg(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            return fechas_exif(datos)
+
+
+def _fechas_video(path):
+    with open(path, 'rb') as f:
+        campos = quicktime_atoms.campos_fecha(f, os.fstat(f.fileno()).st_size)
+        if campos is None:
+            return None
+        creacion, modificacion = quicktime_atoms.leer_fechas(f, campos)
+
+    def local(segundos):
+        # Como exiftool con QuickTimeUTC=1: en hora local; 0 es "sin fecha"
+        if segundos <= -quicktime_atoms.EPOCA_QUICKTIME:
+            return None
+        return time.strftime("%Y:%m:%d %H:%M:%S", time.localtime(segundos))
+    return {"DateTimeOriginal": None, "CreateDate": local(creacion),
+            "ModifyDate": local(modificacion)}
+
+
+def _fechas_exiftool(paths, tipo_archivo, exiftool_path):
+    args = ["-json", "-d", "%Y:%m:%d %H:%M:%S"]
+    args += ["-" + etiqueta for etiqueta in ETIQUETAS_FECHA["imagen"]]
+    args += list(OPCIONES_EXIFTOOL[tipo_archivo]) + list(paths)
+    result = ejecutar_exiftool(exiftool_path, args)
+    try:
+        filas = json.loads(result.stdout) if result.stdout.strip() else []
+    except ValueError:
+        return {}
+    por_nombre = {}
+    for path in paths:
+        por_nombre[path] = path
+        por_nombre[path.replace('\\', '/')] = path
+    fechas = {}
+    for fila in filas:
+        path = por_nombre.get(fila.get("SourceFile"))
+        if path is not None:
+            fechas[path] = {e: (str(fila[e]) if e in fila else None)
+                            for e in ETIQUETAS_FECHA["imagen"]}
+    return fechas
+
+
+def leer_fechas_lote(paths, exiftool_path=None):
+    """
+    Lee las fechas actuales de varios archivos de una vez: los JPEG y MP4/MOV
+    con los lectores propios y el resto con un solo `exiftool -json` por tipo.
+    Returns:
+        dict: {path: {'DateTimeOriginal', 'CreateDate', 'ModifyDate',
+        'FileModifyDate'}}; los archivos que no se pudieron leer no aparecen.
+    """
+    if exiftool_path is None:
+        exiftool_path = get_bin_path('exiftool.exe')
+    with tramo("lectura_fechas", archivos=len(paths)):
+        return _leer_fechas_lote(paths, exiftool_path)
+
+
+def _leer_fechas_lote(paths, exiftool_path):
+    fechas = {}
+    por_tipo = {"imagen": [], "video": []}
+    for path in paths:
+        ext = os.path.splitext(path)[1].lower()
+        if ext in (".jpg", ".jpeg"):
+            try:
+                leidas = _fechas_jpeg(path)
+            except (OSError, ValueError):
+                continue
+            # Sin bloque EXIF no hay fechas: -AllDates tendrá que escribirlas
+            fechas[path] = leidas or dict.fromkeys(ETIQUETAS_FECHA["imagen"])
+            continue
+        if ext in (".mp4", ".mov"):
+            try:
+                leidas = _fechas_video(path)
+            except (OSError, ValueError):
+                leidas = None
+            if leidas is not None:
+                fechas[path] = leidas
+                continue
+        tipo = tipo_por_extension(path)
+        if tipo is not None:
+            por_tipo[tipo].append(path)
+    for tipo, pendientes in por_tipo.items():
+        if pendientes:
+            try:
+                fechas.update(_fechas_exiftool(pendientes, tipo, exiftool_path))
+            except Exception as e:
+                print("No se pudieron leer las fechas con exiftool:", e)
+    for path in list(fechas):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            del fechas[path]
+            continue
+        fechas[path]["FileModifyDate"] = datetime.fromtimestamp(mtime).strftime("%Y:%m:%d %H:%M:%S")
+    return fechas
+
+
+def fecha_ya_aplicada(fechas, datetime_exif, tipo_archivo):
+    """
+    True si escribir `datetime_exif` no cambiaría nada: todas las fechas que
+    escribe -AllDates y la fecha de modificación del archivo ya son esas.
+    """
+    if not fechas or not datetime_exif or tipo_archivo not in ETIQUETAS_FECHA:
+        return False
+    if fechas.get("FileModifyDate") != datetime_exif:
+        return False
+    return all(fechas.get(e) == datetime_exif for e in ETIQUETAS_FECHA[tipo_archivo])
+
+
+# Resultado de cambiar_metadata_lote para un archivo cuya escritura no se
+# puede confirmar con la salida de exiftool: hay que aplicarlo solo
+SIN_CONFIRMAR = object()
+
+
+def _nativo_seguro(path, datetime_exif):
+    # Un archivo que no se puede abrir queda para exiftool, que informa el error
+    try:
+        return cambiar_fecha_nativo(path, datetime_exif)
+    except OSError:
+        return False
+
+
+def cambiar_metadata_lote(paths, datetime_exif, tipo_archivo, exiftool_path=None):
+    """
+    Aplica la misma fecha/hora a varios archivos con un solo comando exiftool.
+    Los que se pueden parchear en el lugar (JPEG, MP4/MOV) se escriben antes
+    sin exiftool y cuentan como aplicados aunque exiftool falle después.
+    Args:
+        paths (list): Rutas de los archivos (mismo tipo de archivo).
+        datetime_exif (str): Fecha y hora en formato 'YYYY:MM:DD HH:MM:SS'.
+        tipo_archivo (str): 'imagen' o 'video' (define las opciones de exiftool).
+        exiftool_path (str, opcional): Ruta a exiftool.exe.
+    Returns:
+        dict: {path: None si se aplicó, el mensaje de error, o SIN_CONFIRMAR
+        si la salida de exiftool no permite saber si ese archivo falló; esos
+        hay que aplicarlos uno a uno}. Siempre trae todos los paths.
+    """
+    if exiftool_path is None:
+        exiftool_path = get_bin_path('exiftool.exe')
+    resultado = {path: None for path in paths if _nativo_seguro(path, datetime_exif)}
+    paths = [path for path in paths if path not in resultado]
+    if not paths:
+        return resultado
+    args = [
+        f"-AllDates={datetime_exif}",
+        f"-FileModifyDate={datetime_exif}",
+        "-overwrite_original",
+        "-P",
+    ] + list(OPCIONES_EXIFTOOL[tipo_archivo]) + list(paths)
+    try:
+        result = ejecutar_exiftool(exiftool_path, args)
+    except Exception as e:
+        # Sin exiftool (no existe, se cayó o no respondió) fallan solo los
+        # archivos que dependían de él
+        resultado.update((path, f"Exiftool falló: {e}") for path in paths)
+        return resultado
+    errores = _errores_por_archivo(result.stderr, paths)
+    m = re.search(r"(\d+) files? weren't updated due to errors", result.stdout)
+    reportados = int(m.group(1)) if m else 0
+    if (result.returncode != 0 and not errores) or reportados != len(errores):
+        resultado.update((path, SIN_CONFIRMAR) for path in paths)
+        return resultado
+    resultado.update((path, f"Exiftool falló: {errores[path]}" if path in errores else None)
+                     for path in paths)
+    return resultado
@@ -0,0 +1,245 @@
+# Instrumentación liviana del proceso: tramos (spans) con la duración de
+# cada etapa por archivo, tiempo de CPU de los subprocesos, contadores de
+# reintentos e histogramas acumulados por etapa. Se consulta desde la
+# interfaz (Api.obtener_metricas) y se exporta a JSON o al formato de
+# trazas de Chrome (chrome://tracing, Perfetto) para analizar sin conexión.
+# METRICAS=0 desactiva el registro de tramos (los histogramas siguen).
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Tramos que se guardan para exportar; los más viejos se descartan
+MAX_TRAMOS = 50000
+
+
+class Histograma:
+    """
+    Histograma de duraciones con cubetas logarítmicas (potencias de 2 en
+    microsegundos): memoria fija y agregar en O(1).
+    """
+    __slots__ = ("cubetas", "n", "total", "minimo", "maximo")
+
+    def __init__(self):
+        self.cubetas = [0] * 40
+        self.n = 0
+        self.total = 0.0
+        self.minimo = None
+        self.maximo = 0.0
+
+    def agregar(self, segundos):
+        us = max(1, int(segundos * 1e6))
+        self.cubetas[min(len(self.cubetas) - 1, us.bit_length() - 1)] += 1
+        self.n += 1
+        self.total += segundos
+        if self.minimo is None or segundos < self.minimo:
+            self.minimo = segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+
+    def percentil(self, p):
+        """Aproximado: el límite superior de la cubeta donde cae el percentil."""
+        if not self.n:
+            return None
+        objetivo = p / 100 * self.n
+        acumulado = 0
+        for i, cantidad in enumerate(self.cubetas):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return min(self.maximo, (2 ** (i + 1)) / 1e6)
+        return self.maximo
+
+    def resumen(self):
+        def ms(valor):
+            return round(valor * 1000, 3) if valor is not None else None
+        return {
+            "n": self.n,
+            "total_ms": ms(self.total),
+            "media_ms": ms(self.total / self.n) if self.n else None,
+            "min_ms": ms(self.minimo),
+            "p50_ms": ms(self.percentil(50)),
+            "p95_ms": ms(self.percentil(95)),
+            "p99_ms": ms(self.percentil(99)),
+            "max_ms": ms(self.maximo),
+            # Cubetas no vacías: {límite superior en µs: cantidad}
+            "cubetas_us": {2 ** (i + 1): c for i, c in enumerate(self.cubetas) if c},
+        }
+
+
+class Metricas:
+    """Colector de tramos, histogramas y contadores; seguro entre hilos."""
+
+    def __init__(self, max_tramos=MAX_TRAMOS):
+        self.registrar_tramos = os.environ.get("METRICAS", "1") != "0"
+        self._lock = threading.Lock()
+        self._tramos = deque(maxlen=max_tramos)
+        self._histogramas = {}
+        self._contadores = {}
+        self._inicio_ns = time.perf_counter_ns()
+
+    def agregar(self, etapa, segundos, path=None, inicio_ns=None, **datos):
+        """Registra una duración ya medida (p. ej. la de un subproceso)."""
+        if inicio_ns is None:
+            inicio_ns = time.perf_counter_ns() - int(segundos * 1e9)
+        with self._lock:
+            histograma = self._histogramas.get(etapa)
+            if histograma is None:
+                histograma = self._histogramas[etapa] = Histograma()
+            histograma.agregar(segundos)
+            if self.registrar_tramos:
+                self._tramos.append((etapa, inicio_ns, int(segundos * 1e9),
+                                     threading.get_ident(), path, datos or None))
+
+    @contextmanager
+    def tramo(self, etapa, path=None, **datos):
+        """
+        Mide el bloque como un tramo de la etapa. Se pueden agregar datos al
+        tramo dentro del bloque: `with tramo("exiftool", p) as t: t["cpu_ms"] = ...`
+        """
+        inicio = time.perf_counter_ns()
+        try:
+            yield datos
+        finally:
+            fin = time.perf_counter_ns()
+            self.agregar(etapa, (fin - inicio) / 1e9, path, inicio, **datos)
+
+    def contar(self, nombre, cantidad=1):
+        with self._lock:
+            self._contadores[nombre] = self._contadores.get(nombre, 0) + cantidad
+
+    def resumen(self):
+        with self._lock:
+            return {
+                "etapas": {e: h.resumen() for e, h in sorted(self._histogramas.items())},
+                "contadores": dict(self._contadores),
+                "tramos_guardados": len(self._tramos),
+            }
+
+    def tramos_de(self, path):
+        """Tramos de un archivo, en orden, con tiempos en ms desde el primero."""
+        with self._lock:
+            propios = sorted((t for t in self._tramos if t[4] == path), key=lambda t: t[1])
+        if not propios:
+            return []
+        base = propios[0][1]
+        return [dict(t[5] or {}, etapa=t[0], inicio_ms=round((t[1] - base) / 1e6, 3),
+                     duracion_ms=round(t[2] / 1e6, 3)) for t in propios]
+
+    def reiniciar(self):
+        with self._lock:
+            self._tramos.clear()
+            self._histogramas.clear()
+            self._contadores.clear()
+            self._inicio_ns = time.perf_counter_ns()
+
+    def a_chrome(self):
+        """Eventos en el formato de trazas de Chrome (Trace Event Format)."""
+        with self._lock:
+            tramos = list(self._tramos)
+            inicio = self._inicio_ns
+        pid = os.getpid()
+        eventos = []
+        for etapa, inicio_ns, duracion_ns, hilo, path, datos in tramos:
+            args = dict(datos or {})
+            if path is not None:
+                args["path"] = path
+            eventos.append({"name": etapa, "cat": etapa.split("_")[0], "ph": "X",
+                            "ts": (inicio_ns - inicio) / 1000, "dur": duracion_ns / 1000,
+                            "pid": pid, "tid": hilo, "args": args})
+        return {"traceEvents": eventos, "displayTimeUnit": "ms"}
+
+    def exportar(self, destino, formato="chrome"):
+        """
+        Guarda las métricas en `destino`: formato 'chrome' (trazas) o 'json'
+        (resumen con histogramas y contadores más todos los tramos).
+        """
+        if formato == "chrome":
+            datos = self.a_chrome()
+        else:
+            with self._lock:
+                tramos = [{"etapa": t[0], "inicio_ns": t[1] - self._inicio_ns,
+                           "duracion_ns": t[2], "hilo": t[3], "path": t[4], "datos": t[5]}
+                          for t in self._tramos]
+            datos = dict(self.resumen(), tramos=tramos)
+        with open(destino, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False)
+        return destino
+
+
+def cpu_proceso(proceso):
+    """
+    Tiempo de CPU (usuario + sistema, en segundos) consumido hasta ahora por
+    un subprocess.Popen que sigue vivo; None si no se puede saber.
+    """
+    try:
+        if sys.platform.startswith("linux"):
+            with open(f"/proc/{proceso.pid}/stat", "rb") as f:
+                campos = f.read().rsplit(b")", 1)[1].split()
+            # utime y stime son los campos 14 y 15 (11 y 12 tras el nombre)
+            return (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+        if sys.platform == "win32":
+            return _cpu_windows(proceso)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+    return None
+
+
+def _cpu_windows(proceso):
+    import ctypes
+    from ctypes import wintypes
+    creacion, salida, kernel, usuario = (wintypes.FILETIME() for _ in range(4))
+    ok = ctypes.windll.kernel32.GetProcessTimes(
+        wintypes.HANDLE(int(proceso._handle)), ctypes.byref(creacion), ctypes.byref(salida),
+        ctypes.byref(kernel), ctypes.byref(usuario))
+    if not ok:
+        return None
+
+    def segundos(ft):
+        return ((ft.dwHighDateTime << 32) | ft.dwLowDateTime) / 1e7
+    return segundos(kernel) + segundos(usuario)
+
+
+def esperar_con_cpu(proceso, timeout=None):
+    """
+    Espera a que termine un subprocess.Popen sin pipes y devuelve
+    (returncode, segundos de CPU o None). En POSIX usa os.wait4, que da el
+    consumo exacto del hijo; en Windows el handle sigue valiendo tras salir.
+    """
+    if hasattr(os, "wait4") and timeout is None:
+        _, estado, uso = os.wait4(proceso.pid, 0)
+        proceso.returncode = _codigo_salida(estado)
+        return proceso.returncode, uso.ru_utime + uso.ru_stime
+    returncode = proceso.wait(timeout)
+    return returncode, cpu_proceso(proceso) if sys.platform == "win32" else None
+
+
+def _codigo_salida(estado):
+    if hasattr(os, "waitstatus_to_exitcode"):
+        return os.waitstatus_to_exitcode(estado)
+    # Python < 3.9
+    if os.WIFSIGNALED(estado):
+        return -os.WTERMSIG(estado)
+    return os.WEXITSTATUS(estado)
+
+
+_metricas = Metricas()
+
+
+def metricas():
+    """El colector global que usan media_utils, exiftool_pool y el motor."""
+    return _metricas
+
+
+def tramo(etapa, path=None, **datos):
+    return _metricas.tramo(etapa, path, **datos)
+
+
+def agregar(etapa, segundos, path=None, **datos):
+    _metricas.agregar(etapa, segundos, path, **datos)
+
+
+def contar(nombre, cantidad=1):
+    _metricas.contar(nombre, cantidad)
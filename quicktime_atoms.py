@@ -0,0 +1,141 @@
+# Lectura y parcheo de las fechas de un MP4/MOV (átomos mvhd, tkhd y mdhd)
+# sin leer el contenido: solo se leen los encabezados de las cajas haciendo
+# seek, así que el trabajo por archivo es de unos pocos KB sea cual sea su tamaño.
+import struct
+
+# Segundos entre 1904-01-01 (época de QuickTime) y 1970-01-01
+EPOCA_QUICKTIME = 2082844800
+
+# Cajas con fechas y las que hay que recorrer para llegar a ellas
+CAJAS_FECHA = (b'mvhd', b'tkhd', b'mdhd')
+_CONTENEDORES = (b'moov', b'trak', b'mdia')
+
+# UUID de la caja con XMP (exiftool también actualizaría sus fechas)
+_UUID_XMP = bytes.fromhex('BE7ACFCB97A942E89C71999491E3AFAC')
+
+
+class CampoFecha:
+    """Posición absoluta de las fechas de creación y modificación de una caja."""
+    __slots__ = ("caja", "pos", "ancho")
+
+    def __init__(self, caja, pos, ancho):
+        self.caja = caja
+        self.pos = pos
+        self.ancho = ancho  # 4 u 8 bytes por fecha
+
+    def formato(self):
+        return '>II' if self.ancho == 4 else '>QQ'
+
+
+def _cajas(f, inicio, fin):
+    """
+    Recorre las cajas entre `inicio` y `fin` leyendo solo sus encabezados.
+    Yields:
+        tuple: (tipo, inicio del contenido, fin de la caja)
+    """
+    pos = inicio
+    while pos + 8 <= fin:
+        f.seek(pos)
+        cabecera = f.read(8)
+        if len(cabecera) < 8:
+            return
+        tamano, tipo = struct.unpack('>I4s', cabecera)
+        contenido = pos + 8
+        if tamano == 1:
+            # Tamaño de 64 bits a continuación del tipo
+            extendido = f.read(8)
+            if len(extendido) < 8:
+                return
+            tamano = struct.unpack('>Q', extendido)[0]
+            contenido = pos + 16
+        elif tamano == 0:
+            # La caja llega hasta el final del archivo (o del contenedor)
+            tamano = fin - pos
+        if tamano < contenido - pos or pos + tamano > fin:
+            raise ValueError(f"Caja '{tipo!r}' con tamaño inválido")
+        yield tipo, contenido, pos + tamano
+        pos += tamano
+
+
+def campos_fecha(f, tamano_archivo):
+    """
+    Ubica los campos de fecha de un MP4/MOV abierto en modo binario.
+    Returns:
+        list | None: [CampoFecha, ...] empezando por el mvhd, o None si el
+        archivo no se puede tratar con seguridad (sin moov/mvhd, moov
+        comprimido, caja con XMP, versión de caja desconocida...).
+    """
+    campos = []
+
+    def recorrer(inicio, fin):
+        for tipo, contenido, fin_caja in _cajas(f, inicio, fin):
+            if tipo in _CONTENEDORES:
+                if not recorrer(contenido, fin_caja):
+                    return False
+            elif tipo in CAJAS_FECHA:
+                f.seek(contenido)
+                version = f.read(1)
+                if version == b'\x00':
+                    ancho = 4
+                elif version == b'\x01':
+                    ancho = 8
+                else:
+                    return False
+                # version (1) + flags (3), luego creación y modificación
+                if contenido + 4 + 2 * ancho > fin_caja:
+                    return False
+                campos.append(CampoFecha(tipo, contenido + 4, ancho))
+            elif tipo == b'uuid':
+                f.seek(contenido)
+                if f.read(16) == _UUID_XMP:
+                    return False
+            elif tipo in (b'udta', b'meta'):
+                # Metadatos de usuario: si hay XMP se deja todo a exiftool
+                f.seek(contenido)
+                if b'XMP_' in f.read(min(fin_caja - contenido, 64 * 1024)):
+                    return False
+        return True
+
+    try:
+        if not recorrer(0, tamano_archivo):
+            return None
+    except (ValueError, struct.error, OSError):
+        return None
+    if not campos or campos[0].caja != b'mvhd':
+        return None
+    return campos
+
+
+def leer_fechas(f, campos):
+    """Devuelve (creación, modificación) del mvhd en segundos desde 1970 (UTC)."""
+    mvhd = campos[0]
+    f.seek(mvhd.pos)
+    creacion, modificacion = struct.unpack(mvhd.formato(), f.read(2 * mvhd.ancho))
+    return creacion - EPOCA_QUICKTIME, modificacion - EPOCA_QUICKTIME
+
+
+def fechas_uniformes(f, campos):
+    """
+    True si creación y modificación valen lo mismo en todas las cajas (el
+    caso de cámaras y teléfonos), o sea, si las fechas del mvhd bastan para
+    volver a dejar el archivo como estaba.
+    """
+    valores = set()
+    for campo in campos:
+        f.seek(campo.pos)
+        valores.update(struct.unpack(campo.formato(), f.read(2 * campo.ancho)))
+    return len(valores) == 1
+
+
+def escribir_fechas(f, campos, segundos_unix):
+    """
+    Sobrescribe creación y modificación de todas las cajas con la misma fecha
+    (segundos desde 1970, UTC). Comprueba antes que entre en los campos de
+    32 bits para no dejar el archivo a medias.
+    """
+    valor = segundos_unix + EPOCA_QUICKTIME
+    if valor < 0 or any(c.ancho == 4 and valor >= 1 << 32 for c in campos):
+        raise ValueError("La fecha no entra en los campos de 32 bits del archivo")
+    for campo in campos:
+        f.seek(campo.pos)
+        f.write(struct.pack(campo.formato(), valor, valor))
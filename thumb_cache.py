@@ -0,0 +1,123 @@
+import os
+import time
+import sqlite3
+import threading
+
+from media_utils import directorio_usuario
+
+
+class CacheMiniaturas:
+    """
+    Cache persistente de miniaturas en SQLite. Cada entrada se guarda por
+    (ruta, ancho, alto) junto con el tamaño y mtime_ns del archivo cuando se
+    generó; si el archivo cambia (por ejemplo tras escribirle la fecha, que
+    modifica su mtime) la entrada deja de ser válida y se regenera.
+    El total se limita a `max_bytes` expulsando las menos usadas (LRU).
+    """
+
+    def __init__(self, db_path=None, max_bytes=None):
+        if db_path is None:
+            db_path = os.path.join(directorio_usuario('cache'), 'miniaturas.sqlite3')
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("THUMB_CACHE_MB", 200)) * 1024 * 1024
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS miniaturas (
+                path TEXT NOT NULL,
+                ancho INTEGER NOT NULL,
+                alto INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                datos BLOB NOT NULL,
+                ultimo_uso REAL NOT NULL,
+                PRIMARY KEY (path, ancho, alto)
+            )""")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_miniaturas_uso ON miniaturas (ultimo_uso)")
+        self._conn.commit()
+        self._total = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(datos)), 0) FROM miniaturas").fetchone()[0]
+
+    def obtener(self, path, tamano, st=None):
+        """
+        Devuelve los bytes de la miniatura si está en cache y el archivo no
+        cambió desde que se generó; si no, None.
+        """
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+        ancho, alto = tamano
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT size, mtime_ns, datos FROM miniaturas "
+                "WHERE path = ? AND ancho = ? AND alto = ?",
+                (path, ancho, alto)).fetchone()
+            if fila is None:
+                return None
+            size, mtime_ns, datos = fila
+            if size != st.st_size or mtime_ns != st.st_mtime_ns:
+                # El archivo cambió: la miniatura guardada ya no vale
+                self._conn.execute(
+                    "DELETE FROM miniaturas WHERE path = ? AND ancho = ? AND alto = ?",
+                    (path, ancho, alto))
+                self._conn.commit()
+                self._total -= len(datos)
+                return None
+            self._conn.execute(
+                "UPDATE miniaturas SET ultimo_uso = ? WHERE path = ? AND ancho = ? AND alto = ?",
+                (time.time(), path, ancho, alto))
+            self._conn.commit()
+            return datos
+
+    def guardar(self, path, tamano, datos, st=None):
+        if st is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return
+        ancho, alto = tamano
+        with self._lock:
+            anterior = self._conn.execute(
+                "SELECT LENGTH(datos) FROM miniaturas WHERE path = ? AND ancho = ? AND alto = ?",
+                (path, ancho, alto)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO miniaturas "
+                "(path, ancho, alto, size, mtime_ns, datos, ultimo_uso) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, ancho, alto, st.st_size, st.st_mtime_ns,
+                 sqlite3.Binary(datos), time.time()))
+            self._total += len(datos) - (anterior[0] if anterior else 0)
+            if self._total > self.max_bytes:
+                self._expulsar()
+            self._conn.commit()
+
+    def _expulsar(self):
+        # Borra las menos usadas hasta quedar en el 90% del límite
+        objetivo = int(self.max_bytes * 0.9)
+        filas = self._conn.execute(
+            "SELECT rowid, LENGTH(datos) FROM miniaturas ORDER BY ultimo_uso")
+        borrar = []
+        for rowid, largo in filas:
+            if self._total <= objetivo:
+                break
+            borrar.append((rowid,))
+            self._total -= largo
+        self._conn.executemany("DELETE FROM miniaturas WHERE rowid = ?", borrar)
+
+    def invalidar(self, path):
+        with self._lock:
+            self._conn.execute("DELETE FROM miniaturas WHERE path = ?", (path,))
+            self._conn.commit()
+            self._total = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(datos)), 0) FROM miniaturas").fetchone()[0]
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,267 @@
+import io
+import os
+import mmap
+import time
+
+from jpeg_exif import miniatura_exif
+from folder_scan import EXTENSIONES_IMAGEN, EXTENSIONES_VIDEO
+
+TAMANO_MINIATURA = (120, 80)
+
+
+def _a_jpeg(img, tamano):
+    img.thumbnail(tamano)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def miniatura_imagen(path, tamano=TAMANO_MINIATURA):
+    """
+    Genera la miniatura JPEG de una imagen por el camino más barato posible:
+      1. la miniatura EXIF embebida (si es al menos del tamaño pedido),
+      2. decodificación reducida de JPEG con `draft()` (escalado DCT 1/2..1/8),
+      3. decodificación completa para el resto de formatos.
+    El archivo se lee a través de un mmap, sin copiarlo entero a memoria.
+    Returns:
+        tuple: (bytes JPEG, método usado, milisegundos)
+    """
+    from PIL import Image
+    inicio = time.perf_counter()
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            es_jpeg = datos[:2] == b'\xff\xd8'
+            if es_jpeg:
+                embebida = miniatura_exif(datos)
+                if embebida is not None:
+                    try:
+                        with Image.open(io.BytesIO(embebida)) as img:
+                            if img.width >= tamano[0] and img.height >= tamano[1]:
+                                jpeg = _a_jpeg(img, tamano)
+                                return jpeg, "exif", (time.perf_counter() - inicio) * 1000
+                    except Exception:
+                        pass
+            with Image.open(datos) as img:
+                if es_jpeg and img.format == "JPEG":
+                    img.draft("RGB", tamano)
+                    metodo = "draft"
+                else:
+                    metodo = "completa"
+                jpeg = _a_jpeg(img, tamano)
+    return jpeg, metodo, (time.perf_counter() - inicio) * 1000
+
+
+# Color de relleno para llevar cada frame a un tamaño fijo; después se recorta
+COLOR_RELLENO = (0x00, 0xFE, 0x01)
+
+
+def _comando_previews(paths, tamano, ffmpeg_path):
+    """
+    Un solo ffmpeg para uno o varios videos: decodifica solo keyframes
+    (-skip_frame nokey), toma el primero de cada entrada, lo escala y rellena
+    a `tamano` y los apila verticalmente en un único frame rgb24 por stdout.
+    """
+    ancho, alto = tamano
+    args = [ffmpeg_path, "-v", "error", "-nostdin"]
+    for path in paths:
+        args += ["-skip_frame", "nokey", "-i", path]
+    relleno = "0x%02X%02X%02X" % COLOR_RELLENO
+    filtros = []
+    for i in range(len(paths)):
+        filtros.append(
+            f"[{i}:v:0]setpts=PTS-STARTPTS,"
+            f"scale={ancho}:{alto}:force_original_aspect_ratio=decrease:flags=bilinear,"
+            f"format=rgb24,pad={ancho}:{alto}:(ow-iw)/2:(oh-ih)/2:color={relleno}[v{i}]")
+    if len(paths) > 1:
+        filtros.append("".join(f"[v{i}]" for i in range(len(paths))) +
+                       f"vstack=inputs={len(paths)}[salida]")
+        salida = "[salida]"
+    else:
+        salida = "[v0]"
+    args += ["-filter_complex", ";".join(filtros), "-map", salida,
+             "-frames:v", "1", "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"]
+    return args
+
+
+def _frame_a_jpeg(crudo, tamano):
+    from PIL import Image, ImageChops
+    img = Image.frombytes("RGB", tamano, crudo)
+    # Quita el relleno para conservar la proporción original del video
+    caja = ImageChops.difference(img, Image.new("RGB", tamano, COLOR_RELLENO)).getbbox()
+    if caja is not None:
+        img = img.crop(caja)
+    return _a_jpeg(img, tamano)
+
+
+def miniaturas_video(paths, tamano=TAMANO_MINIATURA, ffmpeg_path=None, timeout=60):
+    """
+    Genera las miniaturas de varios videos con un solo proceso ffmpeg, leyendo
+    los frames crudos por un pipe (sin pasar por MJPEG). Si la corrida
+    conjunta falla (un archivo dañado o sin video), se repite uno por uno.
+    Returns:
+        list: (bytes JPEG o None, método, milisegundos, error) por video.
+    """
+    import subprocess
+    from media_utils import buscar_ejecutable, get_creationflags
+    if ffmpeg_path is None:
+        ffmpeg_path = buscar_ejecutable('ffmpeg')
+    inicio = time.perf_counter()
+    tam_frame = tamano[0] * tamano[1] * 3
+    try:
+        result = subprocess.run(_comando_previews(paths, tamano, ffmpeg_path),
+                                capture_output=True, timeout=timeout,
+                                creationflags=get_creationflags())
+        error = result.stderr.decode('utf-8', errors='replace').strip()
+        ok = result.returncode == 0 and len(result.stdout) == tam_frame * len(paths)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        ok, error = False, str(e)
+    if not ok:
+        if len(paths) > 1:
+            resultados = []
+            for path in paths:
+                resultados.extend(miniaturas_video([path], tamano, ffmpeg_path, timeout))
+            return resultados
+        return [(None, None, (time.perf_counter() - inicio) * 1000,
+                 error or "ffmpeg no devolvió ningún frame")]
+    ms = (time.perf_counter() - inicio) * 1000 / len(paths)
+    metodo = "ffmpeg-lote" if len(paths) > 1 else "ffmpeg"
+    return [(_frame_a_jpeg(result.stdout[i * tam_frame:(i + 1) * tam_frame], tamano),
+             metodo, ms, None) for i in range(len(paths))]
+
+
+def miniatura_video(path, tamano=TAMANO_MINIATURA):
+    """
+    Genera la miniatura JPEG del primer keyframe de un video, solo en memoria.
+    Returns:
+        tuple: (bytes JPEG, método usado, milisegundos)
+    """
+    datos, metodo, ms, error = miniaturas_video([path], tamano)[0]
+    if datos is None:
+        raise RuntimeError(f"ffmpeg falló: {error}")
+    return datos, metodo, ms
+
+
+EXTENSIONES_VIDEO_MINIATURA = EXTENSIONES_VIDEO
+EXTENSIONES_IMAGEN_MINIATURA = EXTENSIONES_IMAGEN
+
+
+def generar_miniatura(path, tamano=TAMANO_MINIATURA):
+    """
+    Genera la miniatura de una imagen o video. Es la función que corre en los
+    procesos del pool, por eso nunca lanza excepciones: los errores vuelven
+    como texto.
+    Returns:
+        dict: {path, datos (bytes o None), metodo, ms, error}
+    """
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext in EXTENSIONES_VIDEO_MINIATURA:
+            datos, metodo, ms = miniatura_video(path, tamano)
+        elif ext in EXTENSIONES_IMAGEN_MINIATURA:
+            datos, metodo, ms = miniatura_imagen(path, tamano)
+        else:
+            return {"path": path, "datos": None, "metodo": None, "ms": None,
+                    "error": f"Extensión no soportada: {ext}"}
+    except Exception as e:
+        return {"path": path, "datos": None, "metodo": None, "ms": None, "error": str(e)}
+    return {"path": path, "datos": datos, "metodo": metodo, "ms": ms, "error": None}
+
+
+def generar_miniaturas_video(paths, tamano=TAMANO_MINIATURA):
+    """Como generar_miniatura pero para un grupo de videos en un solo ffmpeg."""
+    try:
+        generados = miniaturas_video(paths, tamano)
+    except Exception as e:
+        generados = [(None, None, None, str(e))] * len(paths)
+    return [{"path": path, "datos": datos, "metodo": metodo, "ms": ms, "error": error}
+            for path, (datos, metodo, ms, error) in zip(paths, generados)]
+
+
+class GeneradorMiniaturas:
+    """
+    Genera miniaturas bajo demanda en un pool de procesos (decodificar es
+    trabajo de CPU y el GIL no lo reparte entre hilos). Consulta primero la
+    cache en disco y guarda ahí lo que genera. Solo se procesan las rutas
+    pedidas, así la memoria depende del tamaño de la página y no de la
+    selección completa.
+    """
+
+    def __init__(self, cache=None, workers=None, videos_por_lote=4):
+        if workers is None:
+            try:
+                workers = int(os.environ.get("THUMB_WORKERS", 0))
+            except ValueError:
+                workers = 0
+            workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.cache = cache
+        self.workers = workers
+        self.videos_por_lote = videos_por_lote
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def obtener(self, paths, tamano=TAMANO_MINIATURA):
+        """
+        Devuelve las miniaturas de `paths` en el mismo orden.
+        Returns:
+            list: dicts como los de generar_miniatura (metodo 'cache' si vino de la cache).
+        """
+        resultados = [None] * len(paths)
+        stats = [None] * len(paths)
+        faltantes = []
+        for i, path in enumerate(paths):
+            try:
+                stats[i] = os.stat(path)
+            except OSError:
+                pass
+            if self.cache is not None and stats[i] is not None:
+                inicio = time.perf_counter()
+                datos = self.cache.obtener(path, tamano, stats[i])
+                if datos is not None:
+                    resultados[i] = {"path": path, "datos": datos, "metodo": "cache",
+                                     "ms": (time.perf_counter() - inicio) * 1000,
+                                     "error": None}
+                    continue
+            faltantes.append(i)
+        if faltantes:
+            # Las imágenes van una por tarea; los videos en grupos por ffmpeg
+            videos = [i for i in faltantes
+                      if os.path.splitext(paths[i])[1].lower() in EXTENSIONES_VIDEO_MINIATURA]
+            en_videos = set(videos)
+            otros = [i for i in faltantes if i not in en_videos]
+            grupos = [videos[j:j + self.videos_por_lote]
+                      for j in range(0, len(videos), self.videos_por_lote)]
+            orden = otros + [i for grupo in grupos for i in grupo]
+            try:
+                pool = self._pool()
+                futuros = [pool.submit(generar_miniatura, paths[i], tamano) for i in otros]
+                futuros_video = [pool.submit(generar_miniaturas_video,
+                                             [paths[i] for i in grupo], tamano)
+                                 for grupo in grupos]
+                generados = [f.result() for f in futuros]
+                for f in futuros_video:
+                    generados.extend(f.result())
+            except Exception as e:
+                # Sin pool de procesos (p. ej. proceso caído): en este hilo
+                print("Pool de miniaturas no disponible:", e)
+                self._executor = None
+                generados = [generar_miniatura(paths[i], tamano) for i in otros]
+                for grupo in grupos:
+                    generados.extend(generar_miniaturas_video([paths[i] for i in grupo], tamano))
+            faltantes = orden
+            for i, res in zip(faltantes, generados):
+                resultados[i] = res
+                if res["datos"] is not None and self.cache is not None and stats[i] is not None:
+                    self.cache.guardar(paths[i], tamano, res["datos"], stats[i])
+        return resultados
+
+    def cerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -1,7 +1,7 @@
 // --- Limpiar tabla batch y restaurar UI principal ---
 function limpiarBatchTable() {
   // Vacía la variable global
-  window.batchMeta = [];
+  window.batchMeta = null;
 
   // Limpia el contenido de la tabla
   const batchDiv = document.getElementById("archivos-table-div");
@@ -48,17 +48,202 @@ function setManualEnabled(enabled) {
 let selectedFilePath = null;
 let selectedFolderPath = null;
 
-// Variable global para mantener el batch actual
-window.batchMeta = [];
+// Variable global para mantener el batch actual (un LoteMedios)
+window.batchMeta = null;
+
+// Estados de cada archivo al procesar (ver lote.py)
+const ESTADO_APLICADO = 1;
+const ESTADO_OMITIDO = 2;
+const MENSAJES_ESTADO = {
+  1: "Metadatos aplicados",
+  2: "Sin cambios, la fecha ya era correcta",
+};
+
+// Lote en columnas que devuelve la Api (LoteMedios.columnas): las rutas se
+// arman con su carpeta y cada valor repetido llega una sola vez. Las
+// miniaturas de las filas visibles se guardan aparte, por id de fila.
+class LoteMedios {
+  constructor(columnas) {
+    Object.assign(this, columnas);
+    this.length = columnas.nombre.length;
+    this.miniaturas = new Map();
+    this.acciones = new Map();
+    this.fechasActuales = new Map();
+  }
+
+  path(i) {
+    return this.carpetas[this.carpeta[i]] + this.nombre[i];
+  }
+
+  // "imagen", "video" o undefined según la tabla de extensiones del motor
+  tipo(i) {
+    const nombre = this.nombre[i];
+    const punto = nombre.lastIndexOf(".");
+    return punto < 0 ? undefined : this.tipos[nombre.slice(punto).toLowerCase()];
+  }
+
+  // Vista de la fila i con los campos que usan las celdas de la tabla
+  fila(i) {
+    const miniatura = this.miniaturas.get(i);
+    return {
+      path: this.path(i),
+      tipo: this.tipo(i),
+      fecha: this.fechas[this.fecha[i]] || "",
+      hora: this.horas[this.hora[i]] || "",
+      fecha_actual: this.fechasActuales.has(i)
+        ? this.fechasActuales.get(i)
+        : this.actuales[this.actual[i]],
+      thumb: miniatura ? miniatura.thumb : null,
+      thumb_log: miniatura ? miniatura.log : "",
+      thumb_pendiente: !miniatura,
+      accion: this.acciones.get(i),
+    };
+  }
+}
+
+// Llama un método de la Api como tarea del motor asyncio (Api.enviar): la
+// llamada vuelve al instante y el resultado se espera aparte, así otros
+// pedidos (miniaturas, consultas) no quedan detrás de uno largo
+async function llamarEnSegundoPlano(metodo, ...args) {
+  const inicio = await window.pywebview.api.enviar(metodo, args);
+  if (!inicio.tarea_id) throw new Error(inicio.error);
+  while (true) {
+    const res = await window.pywebview.api.resultado_tarea(inicio.tarea_id, 0.25);
+    if (res.terminado) {
+      if (res.error) throw new Error(res.error);
+      return res.resultado;
+    }
+  }
+}
 
 $("select-file-btn").addEventListener("click", async function () {
   const paths = await window.pywebview.api.get_file_path(); // ahora retorna lista
   if (paths && Array.isArray(paths) && paths.length > 0) {
-    window.batchMeta = await window.pywebview.api.extraer_metadata_batch(paths);
+    // La Api ya tiene la selección del diálogo: las rutas no vuelven a viajar
+    window.batchMeta = new LoteMedios(await llamarEnSegundoPlano("extraer_metadata_batch"));
     renderBatchTable(window.batchMeta);
   }
 });
 
+// HTML de la celda de preview de un archivo (imagen o video)
+function renderPreviewCell(item) {
+  const esVideo = item.tipo === "video";
+  const icono = esVideo ? "fa-video" : "fa-image";
+  const thumbPath = item.thumb || "";
+  let thumbTitle = item.thumb_log || "";
+
+  if (thumbPath) {
+    let src = thumbPath.startsWith("data:")
+      ? thumbPath
+      : `file:///${thumbPath.replace(/\\/g, "/")}`;
+    const onError = esVideo
+      ? ` onerror="this.onerror=null;this.src='data:image/svg+xml;base64,PHN2ZyB4bWxucz0naHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmcnIHdpZHRoPSc2MCcgaGVpZ2h0PSc0MCc+PHJlY3Qgd2lkdGg9JzEwMCUnIGhlaWdodD0nMTAwJScgZmlsbD0nI2VlZScvPjx0ZXh0IHg9JzUwJScgeT0nNTAlJyBmb250LXNpemU9JzEwJyB0ZXh0LWFuY2hvcj0nbWlkZGxlJyBmaWxsPSIjODg4IiBkeT0nLjNlbSc+U2luIG1pbmlhdHVyYTwvdGV4dD48L3N2Zz4=';"`
+      : "";
+    return `
+      <div class="preview-container">
+        <img src="${src}" title="${thumbTitle}" class="preview-thumbnail"${onError}>
+        <div class="preview-type-badge ${esVideo ? "video" : "image"}-badge">
+          <i class="fa-solid ${icono}"></i>
+        </div>
+      </div>`;
+  }
+  if (item.thumb_pendiente) {
+    // Se carga cuando la fila entra en pantalla
+    return `
+      <div class="preview-container no-preview">
+        <i class="fa-solid fa-spinner fa-spin"></i>
+      </div>`;
+  }
+  return `
+    <div class="preview-container no-preview" title="${thumbTitle}">
+      <i class="fa-solid ${icono}"></i>
+      <span>${esVideo ? "Sin miniatura" : "Sin preview"}</span>
+    </div>`;
+}
+
+// Celda con la fecha embebida actual (del índice); se resalta si no
+// coincide con la fecha del nombre
+function renderFechaActualCell(item, idx) {
+  const actual = item.fecha_actual || "";
+  const distinta =
+    actual && item.fecha && actual.slice(0, 10) !== item.fecha ? " distinta" : "";
+  const titulo = actual
+    ? "Fecha guardada en el archivo"
+    : item.thumb_pendiente
+    ? "Leyendo..."
+    : "El archivo no tiene fecha";
+  return `<td id="fecha-actual-${idx}" class="fecha-actual-td${distinta}" title="${titulo}">${
+    actual || "—"
+  }</td>`;
+}
+
+// --- Miniaturas bajo demanda: solo se piden las de las filas visibles ---
+let observadorMiniaturas = null;
+let miniaturasPorPedir = new Set();
+let temporizadorMiniaturas = null;
+
+function observarMiniaturas() {
+  if (observadorMiniaturas) observadorMiniaturas.disconnect();
+  miniaturasPorPedir = new Set();
+  const contenedor = document.querySelector(".archivos-table-wrapper");
+  observadorMiniaturas = new IntersectionObserver(
+    (entradas) => {
+      entradas.forEach((entrada) => {
+        const idx = Number(entrada.target.dataset.idx);
+        const lote = window.batchMeta;
+        if (!lote || idx >= lote.length) return;
+        if (entrada.isIntersecting) {
+          if (!lote.miniaturas.has(idx)) miniaturasPorPedir.add(idx);
+        } else {
+          miniaturasPorPedir.delete(idx);
+          if (lote.miniaturas.has(idx)) {
+            // Fuera de pantalla: se libera y se vuelve a pedir al volver
+            lote.miniaturas.delete(idx);
+            entrada.target.innerHTML = renderPreviewCell(lote.fila(idx));
+          }
+        }
+      });
+      clearTimeout(temporizadorMiniaturas);
+      temporizadorMiniaturas = setTimeout(pedirMiniaturas, 80);
+    },
+    { root: contenedor, rootMargin: "200px 0px" }
+  );
+  document
+    .querySelectorAll(".preview-cell")
+    .forEach((celda) => observadorMiniaturas.observe(celda));
+}
+
+async function pedirMiniaturas() {
+  if (miniaturasPorPedir.size === 0) return;
+  const indices = Array.from(miniaturasPorPedir).slice(0, 24);
+  indices.forEach((idx) => miniaturasPorPedir.delete(idx));
+  const batch = window.batchMeta;
+  try {
+    const miniaturas = await llamarEnSegundoPlano("obtener_miniaturas", batch.id, indices);
+    if (batch !== window.batchMeta) return;
+    miniaturas.forEach((m) => {
+      const idx = m.id;
+      batch.miniaturas.set(idx, {
+        thumb: m.thumb,
+        log: m.thumb
+          ? `Imagen lista para previsualizar (${m.metodo}, ${m.ms} ms).`
+          : m.error
+          ? `❌ Error leyendo imagen: ${m.error}`
+          : "",
+      });
+      batch.fechasActuales.set(idx, m.fecha_actual);
+      const item = batch.fila(idx);
+      const celda = document.querySelector(`.preview-cell[data-idx="${idx}"]`);
+      if (celda) celda.innerHTML = renderPreviewCell(item);
+      const actual = document.getElementById(`fecha-actual-${idx}`);
+      if (actual) actual.outerHTML = renderFechaActualCell(item, idx);
+    });
+  } catch (error) {
+    console.error("Error obteniendo miniaturas:", error);
+  }
+  if (miniaturasPorPedir.size > 0) pedirMiniaturas();
+}
+
 // Renderiza una tabla editable más estética para el batch
 function renderBatchTable() {
   const batchDiv = document.getElementById("archivos-table-div");
@@ -97,6 +282,7 @@ function renderBatchTable() {
               <th>Archivo</th>
               <th>Fecha extraída</th>
               <th>Hora extraída</th>
+              <th>Fecha actual</th>
               <th>Fecha nueva</th>
               <th>Hora nueva</th>
               <th>Acción</th>
@@ -104,36 +290,17 @@ function renderBatchTable() {
           </thead>
           <tbody>`;
 
-  window.batchMeta.forEach((item, idx) => {
+  const lote = window.batchMeta;
+  for (let idx = 0; idx < lote.length; idx++) {
+    const item = lote.fila(idx);
     const ext = item.path.split(".").pop().toLowerCase();
     const fileName = item.path.split(/[\\/]/).pop();
     let actionCell = "";
     let previewCell = "";
 
     // Generar celdas según el tipo de archivo
-    if (["mp4", "mov", "avi"].includes(ext)) {
-      const thumbPath = item.thumb || "";
-      let thumbTitle = item.thumb_log || "";
-
-      if (thumbPath) {
-        let src = thumbPath.startsWith("data:")
-          ? thumbPath
-          : `file:///${thumbPath.replace(/\\/g, "/")}`;
-        previewCell = `
-          <div class="preview-container">
-            <img src="${src}" title="${thumbTitle}" class="preview-thumbnail" 
-              onerror="this.onerror=null;this.src='data:image/svg+xml;base64,PHN2ZyB4bWxucz0naHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmcnIHdpZHRoPSc2MCcgaGVpZ2h0PSc0MCc+PHJlY3Qgd2lkdGg9JzEwMCUnIGhlaWdodD0nMTAwJScgZmlsbD0nI2VlZScvPjx0ZXh0IHg9JzUwJScgeT0nNTAlJyBmb250LXNpemU9JzEwJyB0ZXh0LWFuY2hvcj0nbWlkZGxlJyBmaWxsPSIjODg4IiBkeT0nLjNlbSc+U2luIG1pbmlhdHVyYTwvdGV4dD48L3N2Zz4=';">
-            <div class="preview-type-badge video-badge">
-              <i class="fa-solid fa-video"></i>
-            </div>
-          </div>`;
-      } else {
-        previewCell = `
-          <div class="preview-container no-preview" title="${thumbTitle}">
-            <i class="fa-solid fa-video"></i>
-            <span>Sin miniatura</span>
-          </div>`;
-      }
+    if (item.tipo === "video") {
+      previewCell = `<div class="preview-cell" data-idx="${idx}">${renderPreviewCell(item)}</div>`;
 
       actionCell = `
         <select id="accion-${idx}" class="action-select">
@@ -144,29 +311,9 @@ function renderBatchTable() {
             item.accion === "extraer_frame" ? "selected" : ""
           }>Extraer frame</option>
         </select>`;
-    } else if (["jpg", "jpeg", "png", "bmp", "gif"].includes(ext)) {
+    } else if (item.tipo === "imagen") {
       // Mostrar preview para imágenes
-      const thumbPath = item.thumb || "";
-      let thumbTitle = item.thumb_log || "";
-
-      if (thumbPath) {
-        let src = thumbPath.startsWith("data:")
-          ? thumbPath
-          : `file:///${thumbPath.replace(/\\/g, "/")}`;
-        previewCell = `
-          <div class="preview-container">
-            <img src="${src}" title="${thumbTitle}" class="preview-thumbnail">
-            <div class="preview-type-badge image-badge">
-              <i class="fa-solid fa-image"></i>
-            </div>
-          </div>`;
-      } else {
-        previewCell = `
-          <div class="preview-container no-preview" title="${thumbTitle}">
-            <i class="fa-solid fa-image"></i>
-            <span>Sin preview</span>
-          </div>`;
-      }
+      previewCell = `<div class="preview-cell" data-idx="${idx}">${renderPreviewCell(item)}</div>`;
 
       actionCell = `
         <div class="action-label">
@@ -191,7 +338,7 @@ function renderBatchTable() {
         <td class="archivo-nombre-td" title="${fileName}">
           <div class="file-name-container">
             <div class="file-icon">
-              <i class="fa-solid ${getFileIcon(ext)}"></i>
+              <i class="fa-solid ${getFileIcon(ext, item.tipo)}"></i>
             </div>
             <div class="file-name">${fileName}</div>
           </div>
@@ -206,6 +353,7 @@ function renderBatchTable() {
       item.hora || ""
     }" class="hora-input" readonly>
         </td>
+        ${renderFechaActualCell(item, idx)}
         <td>
           <input type="date" id="fecha-${idx}" value="${
       item.fecha && item.fecha.length === 10
@@ -220,7 +368,7 @@ function renderBatchTable() {
         </td>
         <td>${actionCell}</td>
       </tr>`;
-  });
+  }
 
   html += `
         </tbody>
@@ -236,6 +384,7 @@ function renderBatchTable() {
     </div>`;
 
   batchDiv.innerHTML = html;
+  observarMiniaturas();
 
   // Asigna el event listener cada vez que se renderiza
   document
@@ -250,49 +399,44 @@ function renderBatchTable() {
     .addEventListener("click", async function () {
       // Estado visual: poner todos los resultados en "procesando"
       mostrarBatchLoading();
-      // Lee el valor de cada selector de acción
-      window.batchMeta.forEach((item, idx) => {
+      // Solo viajan las filas que el usuario cambió: el resto se procesa
+      // con la fecha y hora extraídas del nombre que ya tiene la Api
+      const cambios = {};
+      for (let idx = 0; idx < lote.length; idx++) {
+        const item = lote.fila(idx);
         const accionSel = document.getElementById(`accion-${idx}`);
-        if (accionSel) item.accion = accionSel.value;
-      });
+        const accion = accionSel ? accionSel.value : undefined;
+        if (accion) lote.acciones.set(idx, accion);
+        // Lee los valores actuales de los inputs (en formato YYYY:MM:DD)
+        const fecha = document.getElementById(`fecha-${idx}`).value.replace(/-/g, ":");
+        const hora = document.getElementById(`hora-${idx}`).value;
+        // Un input vacío es que el usuario no editó nada: se usa lo extraído
+        const fechaCambiada = fecha && fecha !== item.fecha;
+        const horaCambiada = hora && hora !== item.hora;
+        if (fechaCambiada || horaCambiada || accion === "extraer_frame") {
+          cambios[idx] = [fecha || item.fecha, hora || item.hora, accion || null];
+        }
+      }
 
       // Mostrar cargando
       this.innerHTML =
         '<i class="fa-solid fa-spinner fa-spin"></i> Procesando...';
       this.disabled = true;
 
-      // Recopilar datos
-      let archivos = window.batchMeta.map((item, idx) => {
-        // Lee los valores actuales de los inputs
-        let fecha = document.getElementById(`fecha-${idx}`).value;
-        let hora = document.getElementById(`hora-${idx}`).value;
-        // Si el usuario no editó nada, usar los extraídos
-        if (!fecha) {
-          let extraida = document.getElementById(`fecha-extraida-${idx}`).value;
-          // Convertir a formato YYYY:MM:DD si viene en YYYY-MM-DD
-          fecha = extraida ? extraida.replace(/-/g, ":") : "";
-        } else {
-          // Convertir a formato YYYY:MM:DD
-          fecha = fecha.replace(/-/g, ":");
-        }
-        if (!hora) {
-          hora = document.getElementById(`hora-extraida-${idx}`).value;
-        }
-
-        return {
-          path: item.path,
-          fecha: fecha,
-          hora: hora,
-          accion: item.accion,
-        };
-      });
-
       // Limpiar mensaje de error y procesar
       document.getElementById("batch-error-msg").textContent = "";
       try {
-        const resultados = await window.pywebview.api.procesar_batch(archivos);
+        const { estado, acumulado } = await procesarBatchEnSegundoPlano(lote, cambios);
+        const metricas = await window.pywebview.api.obtener_metricas();
         limpiarBatchLoading();
-        mostrarResultadosBatch(resultados);
+        mostrarResultadosBatch(acumulado.ultimos, {
+          total: estado.procesados,
+          exitosos: acumulado.exitosos,
+          fallidos: acumulado.fallidos,
+          omitidos: acumulado.omitidos,
+          cancelado: estado.cancelado,
+          metricas: metricas,
+        });
       } catch (error) {
         document.getElementById("batch-error-msg").textContent =
           "Error al procesar: " + error.message;
@@ -308,8 +452,189 @@ function renderBatchTable() {
   $("folder-section").style.display = "none";
 }
 
-// Función para mostrar los resultados del procesamiento del batch
-function mostrarResultadosBatch(resultados) {
+// --- Índice de medios: indexar una carpeta y buscar en ella ---
+// Máximo de filas del índice que se cargan en la tabla por búsqueda
+const MAX_FILAS_INDICE = 2000;
+let carpetaIndice = null;
+
+$("indexar-btn").addEventListener("click", async function () {
+  const carpeta = await window.pywebview.api.get_folder_path();
+  if (!carpeta) return;
+  const estadoDiv = $("indice-estado");
+  const inicio = await window.pywebview.api.indexar_carpeta(carpeta);
+  if (!inicio.job_id) {
+    estadoDiv.textContent = inicio.msg;
+    return;
+  }
+  carpetaIndice = carpeta;
+  this.disabled = true;
+  let cursor = 0;
+  let leidos = 0;
+  while (true) {
+    const estado = await window.pywebview.api.estado_trabajo(inicio.job_id, cursor);
+    cursor = estado.cursor;
+    (estado.resultados || []).forEach((res) => {
+      if (res.archivos && res.success) leidos += res.archivos;
+    });
+    if (estado.terminado) {
+      estadoDiv.textContent = estado.error || estado.resumen || "";
+      break;
+    }
+    estadoDiv.textContent = `Indexando... ${leidos} archivos leídos`;
+    await new Promise((resolve) => setTimeout(resolve, 500));
+  }
+  this.disabled = false;
+});
+
+$("indice-buscar-btn").addEventListener("click", async function () {
+  const aFecha = (valor) => (valor ? valor.replace(/-/g, ":") : null);
+  const res = await llamarEnSegundoPlano(
+    "cargar_indice",
+    $("indice-consulta").value,
+    carpetaIndice,
+    aFecha($("indice-desde").value),
+    aFecha($("indice-hasta").value),
+    "actual",
+    MAX_FILAS_INDICE
+  );
+  if (res.error) {
+    $("indice-estado").textContent = res.error;
+    return;
+  }
+  window.batchMeta = new LoteMedios(res.lote);
+  $("indice-estado").textContent =
+    res.total > window.batchMeta.length
+      ? `Mostrando ${window.batchMeta.length} de ${res.total} archivos`
+      : `${res.total} archivo(s) encontrados`;
+  renderBatchTable(window.batchMeta);
+});
+
+// Máximo de resultados que se guardan para mostrar al final del batch
+const MAX_RESULTADOS_VISIBLES = 500;
+
+function esResultadoExitoso(resultado) {
+  if (resultado.success !== undefined) return resultado.success;
+  return (
+    !resultado.error &&
+    resultado.resultado &&
+    !resultado.resultado.includes("Error")
+  );
+}
+
+// Inicia el batch del lote como trabajo en segundo plano y consulta su
+// progreso hasta que termina; cada resultado llega como [id, estado, detalle]
+// y solo se guardan los últimos
+async function procesarBatchEnSegundoPlano(lote, cambios) {
+  // Las métricas por etapa que se muestran al final son solo de este batch
+  await window.pywebview.api.reiniciar_metricas();
+  const inicio = await window.pywebview.api.iniciar_procesar_lote(lote.id, cambios);
+  if (!inicio.job_id) throw new Error(inicio.error);
+  window.batchJobId = inicio.job_id;
+  const acumulado = { ultimos: [], exitosos: 0, fallidos: 0, omitidos: 0 };
+  let cursor = 0;
+  while (true) {
+    const estado = await window.pywebview.api.estado_trabajo(
+      inicio.job_id,
+      cursor
+    );
+    if (estado.error && !estado.resultados) throw new Error(estado.error);
+    cursor = estado.cursor;
+    estado.resultados.forEach(([id, codigo, detalle]) => {
+      const resultado = {
+        path: lote.path(id),
+        success: codigo === ESTADO_APLICADO || codigo === ESTADO_OMITIDO,
+        omitido: codigo === ESTADO_OMITIDO,
+        msg: detalle || MENSAJES_ESTADO[codigo],
+      };
+      if (esResultadoExitoso(resultado)) acumulado.exitosos++;
+      else acumulado.fallidos++;
+      if (resultado.omitido) acumulado.omitidos++;
+      acumulado.ultimos.push(resultado);
+      if (acumulado.ultimos.length > MAX_RESULTADOS_VISIBLES) {
+        acumulado.ultimos.shift();
+      }
+    });
+    mostrarProgresoBatch(estado);
+    if (estado.terminado) {
+      window.batchJobId = null;
+      return { estado, acumulado };
+    }
+    await new Promise((resolve) => setTimeout(resolve, 400));
+  }
+}
+
+// Tabla con los tiempos por etapa del último batch (ver Api.obtener_metricas)
+function htmlMetricas(metricas) {
+  if (!metricas || !metricas.etapas) return "";
+  const filas = Object.entries(metricas.etapas)
+    .map(
+      ([etapa, h]) => `
+        <tr>
+          <td>${etapa}</td>
+          <td>${h.n}</td>
+          <td>${h.p50_ms}</td>
+          <td>${h.p95_ms}</td>
+          <td>${h.max_ms}</td>
+        </tr>`
+    )
+    .join("");
+  if (!filas) return "";
+  const contadores = metricas.contadores;
+  const diferidos = contadores.reintentos_diferidos || 0;
+  return `
+      <details class="results-metrics">
+        <summary><i class="fa-solid fa-stopwatch"></i> Tiempos por etapa</summary>
+        <table>
+          <thead>
+            <tr><th>Etapa</th><th>Veces</th><th>p50 ms</th><th>p95 ms</th><th>máx ms</th></tr>
+          </thead>
+          <tbody>${filas}</tbody>
+        </table>
+        <div class="results-note">
+          ${diferidos} reintentos por archivos ocupados
+          (${contadores.reintentos_recuperados || 0} recuperados,
+          ${contadores.reintentos_agotados || 0} sin éxito) ·
+          <a href="#" id="exportar-metricas-btn">Exportar traza (chrome://tracing)</a>
+        </div>
+      </details>`;
+}
+
+function formatearEta(segundos) {
+  if (segundos === null || segundos === undefined) return "calculando...";
+  const s = Math.round(segundos);
+  if (s < 60) return `${s}s`;
+  return `${Math.floor(s / 60)}m ${s % 60}s`;
+}
+
+// Muestra avance, velocidad y ETA en la zona de estado del batch
+function mostrarProgresoBatch(estado) {
+  const statusZone = document.getElementById("batch-status-zone");
+  if (!statusZone) return;
+  const total = estado.total !== null ? estado.total : "?";
+  statusZone.innerHTML = `
+    <span class="batch-status batch-status-processing batch-status-zone">
+      <i class="fa-solid fa-spinner fa-spin"></i>
+      ${estado.cancelado ? "Cancelando" : "Procesando"} ${estado.procesados}/${total}
+      · ${estado.archivos_por_s} archivos/s · ETA ${formatearEta(estado.eta_s)}
+    </span>
+    <button id="cancelar-batch-btn" class="control-btn" ${
+      estado.cancelado ? "disabled" : ""
+    }>
+      <i class="fa-solid fa-stop"></i> Cancelar
+    </button>`;
+  document
+    .getElementById("cancelar-batch-btn")
+    .addEventListener("click", function () {
+      if (window.batchJobId) {
+        window.pywebview.api.cancelar_trabajo(window.batchJobId);
+      }
+      this.disabled = true;
+    });
+}
+
+// Función para mostrar los resultados del procesamiento del batch.
+// `totales` (opcional) trae los contadores cuando `resultados` son solo los últimos
+function mostrarResultadosBatch(resultados, totales) {
   const batchDiv = document.getElementById("archivos-table-div");
   if (!batchDiv) return;
 
@@ -320,7 +645,11 @@ function mostrarResultadosBatch(resultados) {
           <i class="fa-solid fa-check-circle"></i> 
           Resultados del procesamiento
         </h3>
-        <span class="results-count">${resultados.length} archivos procesados</span>
+        <span class="results-count">${
+          totales ? totales.total : resultados.length
+        } archivos procesados${
+          totales && totales.cancelado ? " (cancelado)" : ""
+        }</span>
       </div>
       
       <ul class="results-list">`;
@@ -328,16 +657,15 @@ function mostrarResultadosBatch(resultados) {
   // Contadores para estadísticas
   let exitosos = 0;
   let fallidos = 0;
+  let omitidos = 0;
 
   resultados.forEach((resultado) => {
     const fileName = resultado.path.split(/[\\/]/).pop();
-    const esExitoso =
-      !resultado.error &&
-      resultado.resultado &&
-      !resultado.resultado.includes("Error");
+    const esExitoso = esResultadoExitoso(resultado);
 
     if (esExitoso) exitosos++;
     else fallidos++;
+    if (resultado.omitido) omitidos++;
 
     html += `
       <li class="result-item ${esExitoso ? "success" : "error"}">
@@ -359,8 +687,19 @@ function mostrarResultadosBatch(resultados) {
       </li>`;
   });
 
+  if (totales) {
+    exitosos = totales.exitosos;
+    fallidos = totales.fallidos;
+    omitidos = totales.omitidos || 0;
+  }
+
   html += `
       </ul>
+      ${
+        totales && totales.total > resultados.length
+          ? `<div class="results-note">Mostrando los últimos ${resultados.length} resultados</div>`
+          : ""
+      }
       
       <div class="results-summary">
         <div class="summary-stat success">
@@ -371,7 +710,15 @@ function mostrarResultadosBatch(resultados) {
             fallidos > 0 ? "times-circle" : "check-circle"
           }"></i> ${fallidos} fallidos
         </div>
+        ${
+          omitidos > 0
+            ? `<div class="summary-stat">
+          <i class="fa-solid fa-forward"></i> ${omitidos} sin cambios (ya tenían la fecha)
+        </div>`
+            : ""
+        }
       </div>
+      ${totales ? htmlMetricas(totales.metricas) : ""}
       
       <div class="results-actions">
         <button id="limpiar-batch-btn" class="primary-btn">
@@ -381,7 +728,16 @@ function mostrarResultadosBatch(resultados) {
     </div>`;
 
   batchDiv.innerHTML = html;
-  window.batchMeta = [];
+  window.batchMeta = null;
+
+  const exportarBtn = document.getElementById("exportar-metricas-btn");
+  if (exportarBtn) {
+    exportarBtn.addEventListener("click", async function (e) {
+      e.preventDefault();
+      const res = await window.pywebview.api.exportar_metricas("chrome");
+      this.textContent = res.error || `Traza guardada en ${res.path}`;
+    });
+  }
 
   // Asignar evento al botón de limpiar
   document
@@ -396,13 +752,14 @@ function mostrarResultadosBatch(resultados) {
   $("folder-section").style.display = "";
 }
 
-// Función auxiliar para obtener el icono adecuado según la extensión del archivo
-function getFileIcon(extension) {
+// Función auxiliar para obtener el icono adecuado según el tipo (de la tabla
+// de extensiones del motor) o, para lo que no es medio, la extensión
+function getFileIcon(extension, tipo) {
   const ext = extension.toLowerCase();
 
-  if (["jpg", "jpeg", "png", "bmp", "gif", "tiff", "webp"].includes(ext)) {
+  if (tipo === "imagen") {
     return "fa-file-image";
-  } else if (["mp4", "mov", "avi", "mkv", "wmv", "flv", "webm"].includes(ext)) {
+  } else if (tipo === "video") {
     return "fa-file-video";
   } else if (["mp3", "wav", "ogg", "flac", "aac"].includes(ext)) {
     return "fa-file-audio";
@@ -441,5 +798,5 @@ window.addEventListener("DOMContentLoaded", function() {
       </div>`;
   }
   // Asegura que la variable global esté vacía al inicio
-  window.batchMeta = [];
+  window.batchMeta = null;
 });